@@ -1,9 +1,10 @@
 # app.py - Flask后端服务 (火山引擎AI搜索版)
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response, stream_with_context
 from flask_cors import CORS
 import os
-import requests
 import json
+import functools
+import multiprocessing
 import random
 from datetime import datetime
 
@@ -12,9 +13,47 @@ CORS(app)
 
 # 导入配置
 from config import (
-    VOLCENGINE_ACCESS_KEY, VOLCENGINE_SECRET_KEY,
-    VOLCENGINE_ENDPOINT, VOLCENGINE_MODEL_SEARCH, VOLCENGINE_MODEL_DEEP
+    INGEST_ENABLED, INGEST_MAX_AGE, CRAWL_ARTICLES, SEARCH_MAX_TOKENS, REWRITE_AUTO_DEEP,
+    REWRITE_LATENCY_TARGET_MS, NEWS_DEADLINE_MS, REWRITE_DEADLINE_MS
 )
+from llm_client import call_volcano_api, stream_volcano_api, get_llm_client, resolve_model
+from async_llm import call_volcano_api_async, async_llm_stats, get_llm_loop
+from batch import BatchError, expand_tasks, run_batch, to_ndjson
+from sse import sse_rewrite_stream
+from rewrite_cache import rewrite_cache, rewrite_cache_key
+from news_cache import news_cache, news_cache_key
+from news_store import news_store
+from dedup import story_index, merge_clusters
+from scheduler import IngestScheduler
+from crawler import crawler
+from extract import news_id, normalize_url
+from parse_pool import parse_pool
+from prompt_budget import estimate_tokens, source_budget, compress_text, truncate_to_tokens
+from model_router import model_router
+from resilience import breaker_stats, rate_limiter
+from deadline import deadline_scope, remaining, request_deadline
+import metrics
+import timing
+import json_response
+from timing import span
+from templates import registry as template_registry
+from static_assets import static_assets
+
+# /api/* 请求耗时写入 Prometheus 指标
+metrics.install(app)
+# 各阶段耗时写入 Server-Timing 响应头，按配置采样分析
+timing.install(app)
+# JSON 响应不转义中文，较大的响应按 Accept-Encoding 压缩（在 Server-Timing 之前执行，计入 compress 阶段）
+json_response.install(app)
+
+# 新闻源配置
+NEWS_SOURCES = [
+    {'id': 'weibo', 'name': '微博汽车', 'icon': '📱', 'category': '微博热榜'},
+    {'id': 'all', 'name': '全网', 'icon': '🌐', 'category': '全网搜索'},
+    {'id': 'autohome', 'name': '汽车之家', 'icon': '🚗', 'category': '权威汽车媒体'},
+    {'id': 'dongche', 'name': '懂车帝', 'icon': '🏎️', 'category': '字节跳动汽车'},
+    {'id': 'yiche', 'name': '易车', 'icon': '🚙', 'category': '汽车垂直平台'}
+]
 
 # 风格配置
 WRITING_STYLES = {
@@ -25,7 +64,9 @@ WRITING_STYLES = {
 2. 适当加入语气词和感叹
 3. 就像在和观众聊天一样
 4. 保持内容的真实性
-5. 长度控制在100-300字'''
+5. 长度控制在100-300字''',
+        # 输出上限（token），short 为 100-300 字，long 为 500-1500 字
+        'max_tokens': {'short': 512, 'long': 2048}
     },
     'review': {
         'name': '专业评测风',
@@ -34,7 +75,8 @@ WRITING_STYLES = {
 2. 适当加入数据和专业术语
 3. 像老司机分享经验一样
 4. 分析产品的优缺点
-5. 长度控制在100-300字'''
+5. 长度控制在100-300字''',
+        'max_tokens': {'short': 512, 'long': 2560}
     },
     'push': {
         'name': '种草安利风',
@@ -43,7 +85,8 @@ WRITING_STYLES = {
 2. 突出产品的亮点和优势
 3. 适当使用夸张的表达
 4. 激发读者的购买欲望
-5. 长度控制在100-300字'''
+5. 长度控制在100-300字''',
+        'max_tokens': {'short': 512, 'long': 2048}
     },
     'news': {
         'name': '新闻报道风',
@@ -52,62 +95,13 @@ WRITING_STYLES = {
 2. 保持客观中立
 3. 突出新闻价值点
 4. 使用规范的新闻语言
-5. 长度控制在100-300字'''
+5. 长度控制在100-300字''',
+        'max_tokens': {'short': 384, 'long': 1536}
     }
 }
 
-def call_volcano_api(prompt, model='lite'):
-    """调用火山引擎API"""
-    if not VOLCENGINE_ACCESS_KEY:
-        print("错误: 未配置 VOLCENGINE_ACCESS_KEY 环境变量")
-        return None
-
-    url = f"https://{VOLCENGINE_ENDPOINT}/api/v3/chat/completions"
-
-    # 选择模型
-    if model == 'deep':
-        model_name = VOLCENGINE_MODEL_DEEP
-    else:
-        model_name = VOLCENGINE_MODEL_SEARCH
-
-    print(f"调用火山引擎 - 模型: {model_name}")
-
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': f'Bearer {VOLCENGINE_ACCESS_KEY}'
-    }
-
-    payload = {
-        'model': model_name,
-        'messages': [
-            {'role': 'user', 'content': prompt}
-        ],
-        'max_tokens': 4096,
-        'temperature': 0.8
-    }
-
-    try:
-        response = requests.post(url, headers=headers, json=payload, timeout=60)
-
-        if response.ok:
-            data = response.json()
-            print(f"火山引擎响应成功")
-            if 'choices' in data and len(data['choices']) > 0:
-                return data['choices'][0]['message']['content']
-            elif 'content' in data:
-                return data['content']
-        else:
-            print(f"火山引擎API错误: {response.status_code} - {response.text}")
-            return None
-    except Exception as e:
-        print(f"调用火山引擎出错: {e}")
-        return None
-
-
-def search_news_with_ai(sources, time_range):
-    """使用火山引擎AI搜索最新汽车新闻"""
-
-    # 构建搜索提示词
+def build_search_prompt(sources):
+    """构建搜索提示词"""
     source_names = {
         'weibo': '微博汽车热榜',
         'all': '全网',
@@ -139,8 +133,78 @@ def search_news_with_ai(sources, time_range):
 
 只返回JSON数组，不要其他内容。"""
 
-    # 调用AI搜索
-    result = call_volcano_api(search_prompt, model='lite')
+    return search_prompt
+
+
+def search_news_with_ai(sources, time_range, meta=None):
+    """使用火山引擎AI搜索最新汽车新闻"""
+    with span('search'):
+        result = call_volcano_api(build_search_prompt(sources), model='lite', max_tokens=SEARCH_MAX_TOKENS)
+        with span('search-parse'):
+            return parse_search_result(result, sources, meta)
+
+
+async def search_news_with_ai_async(sources, time_range, meta=None):
+    """使用火山引擎AI搜索最新汽车新闻（异步）"""
+    with span('search'):
+        result = await call_volcano_api_async(build_search_prompt(sources), model='lite', max_tokens=SEARCH_MAX_TOKENS)
+        with span('search-parse'):
+            return parse_search_result(result, sources, meta)
+
+
+def load_news(sources, time_range):
+    """在共享事件循环上执行一次搜索，返回结果为 (新闻, 是否可缓存) 的 Future"""
+    async def load():
+        meta = {}
+        news = await search_news_with_ai_async(sources, time_range, meta=meta)
+        # 降级为模拟数据时不缓存，下次请求继续尝试AI搜索
+        return news, not meta.get('fallback')
+
+    return get_llm_loop().submit(load())
+
+
+def ingest_source(source_id):
+    """后台采集单个新闻源：直接抓取网页 + AI搜索"""
+    news, report = crawler.fetch_with_report([source_id])
+    if CRAWL_ARTICLES:
+        # 只有新出现的新闻需要抓文章页
+        crawler.fetch_articles(news)
+
+    meta = {}
+    ai_news = search_news_with_ai([source_id], 1, meta=meta)
+    # AI搜索降级为模拟数据时不写入存储；与直接抓取一样只保留新出现的新闻
+    if not meta.get('fallback'):
+        news.extend(crawler.is_new(ai_news))
+    elif all(entry['outcome'] != 'ok' for entry in report.values()):
+        # 两种方式都失败时不刷新存储时间，/api/news 到期后改为实时搜索
+        raise RuntimeError('直接抓取和AI搜索均失败')
+
+    # 与其他新闻源的近似重复新闻归为同一簇，读取时合并；写入存储成功后由调度器记为已输出
+    return story_index.assign(news)
+
+
+def read_news_store(sources):
+    """从本地存储读取采集结果；请求的新闻源都在 INGEST_MAX_AGE 内刷新过才返回，
+    否则返回 (None, None) 改走实时搜索，采集一直失败的新闻源不会从结果中悄悄消失"""
+    now = datetime.now().timestamp()
+    feeds = {
+        source: feed for source, feed in news_store.load_feeds(sources).items()
+        if now - feed[1] < INGEST_MAX_AGE
+    }
+    if not feeds or len(feeds) < len(set(sources)):
+        return None, None
+
+    news = [item for items, _ in feeds.values() for item in items]
+    news.sort(key=lambda x: x.get('publishTime') or '', reverse=True)
+    news = merge_clusters(news)
+    refreshed_at = min(refreshed for _, refreshed in feeds.values())
+    return news, refreshed_at
+
+
+def parse_search_result(result, sources, meta=None):
+    """解析AI搜索结果，失败时返回模拟数据"""
+    if meta is not None:
+        meta['fallback'] = True
 
     if not result:
         # 如果AI调用失败，返回模拟数据
@@ -158,17 +222,22 @@ def search_news_with_ai(sources, time_range):
 
         # 转换为标准格式
         formatted_news = []
-        for idx, item in enumerate(news_list):
+        for item in news_list:
+            url = item.get('url') or '#'
+            if url.startswith(('http://', 'https://')):
+                url = normalize_url(url)
             formatted_news.append({
-                'id': f"ai_{datetime.now().timestamp()}_{idx}",
+                'id': news_id('ai', url if url != '#' else item.get('title', '')),
                 'title': item.get('title', ''),
                 'summary': item.get('summary', ''),
-                'url': item.get('url', '#'),
+                'url': url,
                 'source': sources[0] if sources else 'ai',
                 'source_name': 'AI搜索',
                 'publishTime': item.get('publishTime') or datetime.now().isoformat()
             })
 
+        if meta is not None:
+            meta['fallback'] = False
         return formatted_news[:5]
 
     except Exception as e:
@@ -176,66 +245,80 @@ def search_news_with_ai(sources, time_range):
         return generate_mock_news()
 
 
+# 模拟新闻只有 id 和发布时间随请求变化，其余字段导入时构建一次
+MOCK_NEWS = (
+    {
+        'title': '比亚迪秦L DM-i正式上市 售价7.98万起',
+        'summary': '比亚迪官方宣布，秦L DM-i正式上市，共推出5款车型，售价区间7.98-12.98万元。新车搭载第五代DM-i混动技术，NEDC工况下综合续航可达2000km。',
+        'url': 'https://example.com/news/1'
+    },
+    {
+        'title': '特斯拉Model Y新版车型申报 续航提升至600km',
+        'summary': '工信部最新申报信息显示，特斯拉Model Y将推出新版本车型，配备更大容量电池组，续航里程提升至600km以上，预计年内上市。',
+        'url': 'https://example.com/news/2'
+    },
+    {
+        'title': '小米SU7订单突破10万 创最快交付纪录',
+        'summary': '小米汽车官方数据显示，SU7上市仅7天大定订单突破10万台，创下新能源车最快交付纪录。目前已开启全国交付。',
+        'url': 'https://example.com/news/3'
+    },
+    {
+        'title': '全新宝马5系正式发布 搭载最新iDrive 8.5系统',
+        'summary': '宝马官方正式发布全新一代5系轿车，内饰全面升级，配备最新iDrive 8.5操作系统，提供燃油和纯电两种动力版本。',
+        'url': 'https://example.com/news/4'
+    },
+    {
+        'title': '理想汽车销量突破20万 新款L6将于下月发布',
+        'summary': '理想汽车宣布累计交付量突破20万台，同时透露全新车型L6将于下月正式发布，定位中大型SUV，预售价25万元起。',
+        'url': 'https://example.com/news/5'
+    }
+)
+
+
 def generate_mock_news():
     """生成模拟新闻数据（备用）"""
-    templates = [
-        {
-            'title': '比亚迪秦L DM-i正式上市 售价7.98万起',
-            'summary': '比亚迪官方宣布，秦L DM-i正式上市，共推出5款车型，售价区间7.98-12.98万元。新车搭载第五代DM-i混动技术，NEDC工况下综合续航可达2000km。',
-            'url': 'https://example.com/news/1'
-        },
-        {
-            'title': '特斯拉Model Y新版车型申报 续航提升至600km',
-            'summary': '工信部最新申报信息显示，特斯拉Model Y将推出新版本车型，配备更大容量电池组，续航里程提升至600km以上，预计年内上市。',
-            'url': 'https://example.com/news/2'
-        },
-        {
-            'title': '小米SU7订单突破10万 创最快交付纪录',
-            'summary': '小米汽车官方数据显示，SU7上市仅7天大定订单突破10万台，创下新能源车最快交付纪录。目前已开启全国交付。',
-            'url': 'https://example.com/news/3'
-        },
-        {
-            'title': '全新宝马5系正式发布 搭载最新iDrive 8.5系统',
-            'summary': '宝马官方正式发布全新一代5系轿车，内饰全面升级，配备最新iDrive 8.5操作系统，提供燃油和纯电两种动力版本。',
-            'url': 'https://example.com/news/4'
-        },
-        {
-            'title': '理想汽车销量突破20万 新款L6将于下月发布',
-            'summary': '理想汽车宣布累计交付量突破20万台，同时透露全新车型L6将于下月正式发布，定位中大型SUV，预售价25万元起。',
-            'url': 'https://example.com/news/5'
-        }
-    ]
-
-    news = []
-    for idx, item in enumerate(templates):
-        news.append({
-            'id': f"mock_{datetime.now().timestamp()}_{idx}",
-            'title': item['title'],
-            'summary': item['summary'],
-            'url': item['url'],
-            'source': 'ai',
-            'source_name': 'AI搜索',
-            'publishTime': datetime.now().isoformat()
-        })
-
-    return news
+    metrics.MOCK_FALLBACKS.labels('news').inc()
+    now = datetime.now()
+    timestamp, publish_time = now.timestamp(), now.isoformat()
+    return [{
+        'id': f"mock_{timestamp}_{idx}",
+        'title': item['title'],
+        'summary': item['summary'],
+        'url': item['url'],
+        'source': 'ai',
+        'source_name': 'AI搜索',
+        'publishTime': publish_time
+    } for idx, item in enumerate(MOCK_NEWS)]
 
 
 @app.route('/')
 def index():
-    # 返回前端页面
-    import os
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    index_path = os.path.join(base_dir, 'index.html')
-    with open(index_path, 'r', encoding='utf-8') as f:
-        return f.read(), 200, {'Content-Type': 'text/html'}
+    # 返回前端页面（第一次请求时读入内存并预压缩）
+    return static_assets.response('index.html')
+
+
+@app.route('/js/<path:filename>')
+def serve_js(filename):
+    # index.html 引用的是带内容哈希的地址，可以永久缓存
+    return static_assets.response('js/' + filename)
+
+
+@app.route('/css/<path:filename>')
+def serve_css(filename):
+    return static_assets.response('css/' + filename)
+
+
+@app.route('/assets/<path:filename>')
+def serve_assets(filename):
+    return static_assets.response('assets/' + filename)
 
 
 @app.route('/api/news')
 def get_news():
-    """AI搜索新闻API"""
+    """AI搜索新闻API；deadlineMs 毫秒内搜不到结果时先返回模拟数据"""
     sources = request.args.get('sources', '').split(',')
     time_range = int(request.args.get('timeRange', 1))
+    deadline = request_deadline(request.args.get('deadlineMs'), NEWS_DEADLINE_MS)
 
     sources = [s.strip() for s in sources if s.strip()]
 
@@ -243,11 +326,34 @@ def get_news():
         sources = ['all']
 
     try:
-        news = search_news_with_ai(sources, time_range)
+        # 后台采集过的新闻源直接读本地存储
+        news, refreshed_at = read_news_store(sources)
+        if news is not None:
+            return jsonify({
+                'success': True,
+                'data': news,
+                'count': len(news),
+                'cache': 'store',
+                'fetchedAt': datetime.fromtimestamp(refreshed_at).isoformat()
+            })
+
+        try:
+            # 截止时间只限制本次请求的等待：合并的上游搜索不受单个请求的截止时间影响，
+            # 超时后在后台继续，完成后写入缓存供后续请求使用
+            news, cache_state, fetched_at = news_cache.get(
+                news_cache_key(sources, time_range),
+                lambda: load_news(sources, time_range),
+                timeout=deadline.remaining() if deadline else None
+            )
+        except TimeoutError:
+            print(f"新闻搜索超过截止时间 {deadline.budget:.1f}s，先返回模拟数据")
+            news, cache_state, fetched_at = generate_mock_news(), 'deadline', datetime.now().timestamp()
         return jsonify({
             'success': True,
             'data': news,
-            'count': len(news)
+            'count': len(news),
+            'cache': cache_state,
+            'fetchedAt': datetime.fromtimestamp(fetched_at).isoformat()
         })
     except Exception as e:
         print(f"搜索出错: {e}")
@@ -257,17 +363,88 @@ def get_news():
         }), 500
 
 
+@app.route('/api/news/search')
+def search_news():
+    """检索采集过的历史新闻：q 关键词（空格分隔，全部匹配），since 起始发布时间（ISO 格式），
+    sources 逗号分隔的新闻源，limit 每页条数，cursor 上一页返回的 nextCursor"""
+    query = request.args.get('q', '').strip()
+    since = request.args.get('since', '').strip() or None
+    sources = [s.strip() for s in request.args.get('sources', '').split(',') if s.strip()]
+    cursor = request.args.get('cursor') or None
+
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+        if since:
+            since = datetime.fromisoformat(since).isoformat()
+        news, next_cursor = news_store.search(query, since, sources, limit, cursor)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': f'参数错误: {e}'}), 400
+
+    return jsonify({
+        'success': True,
+        'data': news,
+        'count': len(news),
+        'nextCursor': next_cursor
+    })
+
+
 @app.route('/api/sources')
 def get_sources():
     """获取新闻源列表"""
-    sources = [
-        {'id': 'weibo', 'name': '微博汽车', 'icon': '📱', 'category': '微博热榜'},
-        {'id': 'all', 'name': '全网', 'icon': '🌐', 'category': '全网搜索'},
-        {'id': 'autohome', 'name': '汽车之家', 'icon': '🚗', 'category': '权威汽车媒体'},
-        {'id': 'dongche', 'name': '懂车帝', 'icon': '🏎️', 'category': '字节跳动汽车'},
-        {'id': 'yiche', 'name': '易车', 'icon': '🚙', 'category': '汽车垂直平台'}
-    ]
-    return jsonify({'success': True, 'data': sources})
+    return jsonify({'success': True, 'data': NEWS_SOURCES})
+
+
+@app.route('/api/ingest/status')
+def get_ingest_status():
+    """后台采集状态"""
+    status = ingest_scheduler.status()
+    status['enabled'] = INGEST_ENABLED
+    status['feeds'] = news_store.feed_status()
+    status['dedup'] = story_index.stats()
+    return jsonify({'success': True, 'data': status})
+
+
+@app.route('/api/crawler/stats')
+def get_crawler_stats():
+    """各新闻源的抓取耗时和结果、解析进程池状态，以及页面缓存节省的流量"""
+    data = {
+        'sources': crawler.stats(),
+        'articles': crawler.article_stats(),
+        'parsePool': parse_pool.stats(),
+        'seenUrls': crawler.seen_stats()
+    }
+    if crawler.page_cache is not None:
+        data['httpCache'] = crawler.page_cache.stats()
+    return jsonify({'success': True, 'data': data})
+
+
+@app.route('/api/llm/stats')
+def get_llm_stats():
+    """LLM连接池统计，各模型最近的延迟分位数、错误率和在途请求数，以及熔断器和限流状态"""
+    stats = get_llm_client().pool_stats()
+    stats['async'] = async_llm_stats()
+    stats['models'] = model_router.stats()
+    stats['breakers'] = breaker_stats()
+    stats['rateLimiter'] = rate_limiter.stats()
+    return jsonify({'success': True, 'data': stats})
+
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus 指标"""
+    body, content_type = metrics.render()
+    if body is None:
+        return 'prometheus_client 未安装\n', 503, {'Content-Type': 'text/plain; charset=utf-8'}
+    return Response(body, content_type=content_type)
+
+
+@app.route('/api/cache/stats')
+def get_cache_stats():
+    """缓存命中统计"""
+    return jsonify({'success': True, 'data': {
+        'rewrite': rewrite_cache.stats(),
+        'news': news_cache.stats()
+    }})
 
 
 @app.route('/api/rewrite', methods=['POST'])
@@ -278,15 +455,24 @@ def rewrite_news():
     format_type = data.get('format', 'short')
     style = data.get('style', 'vlog')
     use_deep = data.get('deep', False)
+    fresh = data.get('fresh', False)
 
     if not news_item:
         return jsonify({'success': False, 'error': '新闻内容不能为空'}), 400
 
     try:
-        result = rewrite_with_ai(news_item, format_type, style, use_deep)
+        meta = {}
+        with deadline_scope(request_deadline(data.get('deadlineMs'), REWRITE_DEADLINE_MS)):
+            result = rewrite_with_ai_loop(
+                news_item, format_type, style, use_deep, meta=meta, fresh=fresh,
+                target_ms=latency_target(data, REWRITE_LATENCY_TARGET_MS)
+            )
         return jsonify({
             'success': True,
-            'data': result
+            'data': result,
+            'cached': meta.get('cached', False),
+            'fallback': meta.get('fallback', False),
+            'routing': meta.get('routing')
         })
     except Exception as e:
         print(f"改写出错: {e}")
@@ -296,13 +482,132 @@ def rewrite_news():
         }), 500
 
 
-def rewrite_with_ai(news_item, format_type, style, use_deep=False):
-    """使用火山引擎API改写新闻"""
+@app.route('/api/rewrite/batch', methods=['POST'])
+def rewrite_news_batch():
+    """批量AI改写API（NDJSON 流式返回，每完成一条输出一行）"""
+    data = request.json or {}
+    use_deep = data.get('deep', False)
+
+    try:
+        tasks = expand_tasks(
+            data.get('news', []),
+            data.get('styles'),
+            data.get('formats'),
+            WRITING_STYLES
+        )
+    except BatchError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    # 批量改写不是交互式请求，只有显式给出 latencyTarget 时才按延迟选择模型
+    rewrite_fn = functools.partial(rewrite_with_ai, target_ms=latency_target(data, None))
+    results = run_batch(rewrite_fn, tasks, use_deep, data.get('fresh', False))
+    return Response(
+        stream_with_context(to_ndjson(results)),
+        mimetype='application/x-ndjson',
+        headers={'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/api/rewrite/stream', methods=['POST'])
+def rewrite_news_stream():
+    """AI改写API（SSE 流式返回生成片段）"""
+    data = request.json or {}
+    news_item = data.get('news', {})
+    format_type = data.get('format', 'short')
+    style = data.get('style', 'vlog')
+    use_deep = data.get('deep', False)
+    fresh = data.get('fresh', False)
+
+    if not news_item:
+        return jsonify({'success': False, 'error': '新闻内容不能为空'}), 400
+
+    meta = {}
+    deltas = rewrite_with_ai_stream(
+        news_item, format_type, style, use_deep, meta=meta, fresh=fresh,
+        target_ms=latency_target(data, REWRITE_LATENCY_TARGET_MS),
+        deadline=request_deadline(data.get('deadlineMs'), REWRITE_DEADLINE_MS)
+    )
+    return Response(
+        stream_with_context(sse_rewrite_stream(deltas, meta)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+def latency_target(data, default):
+    """请求体中的 latencyTarget（毫秒），没有时用默认值；0 或负数表示不按延迟选择模型"""
+    try:
+        target = float(data.get('latencyTarget', default) or 0)
+    except (TypeError, ValueError):
+        target = 0
+    return target if target > 0 else None
+
+
+def build_rewrite_cache_key(news_item, format_type, style, plan):
+    """改写缓存键：标题、素材内容、风格提示词、格式、实际使用的模型"""
+    style_config = WRITING_STYLES.get(style, WRITING_STYLES['vlog'])
+    return rewrite_cache_key(
+        news_item.get('title', ''),
+        news_item.get('content') or news_item.get('summary', ''),
+        style_config['prompt'],
+        'short' if format_type == 'short' else 'long',
+        plan['model_name']
+    )
+
+
+def lookup_rewrite_cache(cache_key, fresh, meta):
+    """查询改写缓存，fresh 为 True 时跳过缓存以生成新版本"""
+    cached = None if fresh else rewrite_cache.get(cache_key)
+    if meta is not None:
+        meta['cached'] = cached is not None
+        meta['fallback'] = False
+    return cached
+
+
+def plan_rewrite(news_item, format_type, style, use_deep=False, meta=None, target_ms=None):
+    """安排一次改写：按风格和格式设输出上限；素材放不进 lite 模型时首选 deep；
+    有延迟目标时由 model_router 决定是否换用另一个模型；最后按所选模型的上下文截断素材"""
+    budget = remaining()
+    if budget is not None:
+        # 截止时间的剩余时间比延迟目标更紧时，按剩余时间选择模型
+        target_ms = min(target_ms or float('inf'), budget * 1000)
+
+    style_config = WRITING_STYLES.get(style, WRITING_STYLES['vlog'])
+    max_tokens = style_config['max_tokens']['short' if format_type == 'short' else 'long']
+
+    # 采集时抓到文章正文的用正文作素材，否则用摘要
+    source = compress_text(news_item.get('content') or news_item.get('summary', ''))
+    overhead = estimate_tokens(build_rewrite_prompt(news_item, format_type, style, source=''))
+
+    lite_budget = source_budget(resolve_model('lite'), overhead, max_tokens)
+    auto_deep = (not use_deep and REWRITE_AUTO_DEEP and estimate_tokens(source) > lite_budget
+                 and source_budget(resolve_model('deep'), overhead, max_tokens) > lite_budget)
+    preferred = 'deep' if use_deep or auto_deep else 'lite'
+    alternative = 'lite' if preferred == 'deep' else 'deep'
+
+    model_name, routing = model_router.choose(resolve_model(preferred), resolve_model(alternative), target_ms)
+    model = preferred if model_name == resolve_model(preferred) else alternative
+
+    fitted = truncate_to_tokens(source, source_budget(model_name, overhead, max_tokens))
+    routing.update({'model': model_name, 'autoDeep': auto_deep, 'truncated': fitted != source})
+    if meta is not None:
+        meta['routing'] = routing
+
+    return {
+        'prompt': build_rewrite_prompt(news_item, format_type, style, source=fitted),
+        'model': model,
+        'model_name': model_name,
+        'max_tokens': max_tokens
+    }
+
+
+def build_rewrite_prompt(news_item, format_type, style, source=None):
+    """构建改写提示词；source 为预算内的素材，不传时用原始正文或摘要"""
     style_config = WRITING_STYLES.get(style, WRITING_STYLES['vlog'])
     prompt = style_config['prompt']
 
     title = news_item.get('title', '')
-    summary = news_item.get('summary', '')
+    summary = source if source is not None else news_item.get('content') or news_item.get('summary', '')
 
     if format_type == 'short':
         length_hint = "长度控制在100-300字"
@@ -319,48 +624,138 @@ def rewrite_with_ai(news_item, format_type, style, use_deep=False):
 
 请按照以上风格要求进行改写。"""
 
-    full_prompt = prompt + "\n\n" + user_message
-    model = 'deep' if use_deep else 'lite'
+    return prompt + "\n\n" + user_message
+
+
+def rewrite_with_ai(news_item, format_type, style, use_deep=False, meta=None, fresh=False, target_ms=None):
+    """使用火山引擎API改写新闻"""
+    with span('plan'):
+        plan = plan_rewrite(news_item, format_type, style, use_deep, meta, target_ms)
+        cache_key = build_rewrite_cache_key(news_item, format_type, style, plan)
+    with span('cache'):
+        cached = lookup_rewrite_cache(cache_key, fresh, meta)
+    if cached is not None:
+        return cached
+
+    result = call_volcano_api(plan['prompt'], plan['model'], plan['max_tokens'])
 
-    result = call_volcano_api(full_prompt, model)
+    if meta is not None:
+        meta['fallback'] = not result
 
     if result:
+        rewrite_cache.set(cache_key, result)
         return result
     else:
-        return generate_mock_rewrite(news_item, style)
+        with span('mock'):
+            return generate_mock_rewrite(news_item, style)
 
 
-def generate_mock_rewrite(news_item, style):
-    """生成模拟改写结果"""
-    title = news_item.get('title', '')
-    summary = news_item.get('summary', '')
+def rewrite_with_ai_loop(news_item, format_type, style, use_deep=False, meta=None, fresh=False, target_ms=None):
+    """使用火山引擎API改写新闻：模型调用交给共享事件循环，请求线程只等待结果"""
+    with span('plan'):
+        plan = plan_rewrite(news_item, format_type, style, use_deep, meta, target_ms)
+        cache_key = build_rewrite_cache_key(news_item, format_type, style, plan)
+    with span('cache'):
+        cached = lookup_rewrite_cache(cache_key, fresh, meta)
+    if cached is not None:
+        return cached
+
+    future = get_llm_loop().submit(call_volcano_api_async(plan['prompt'], plan['model'], plan['max_tokens']))
+    try:
+        # 模型调用在并发上限前排队的时间也算在截止时间内
+        result = future.result(remaining())
+    except TimeoutError:
+        future.cancel()
+        print("改写超过截止时间，返回模拟结果")
+        result = None
+
+    if meta is not None:
+        meta['fallback'] = not result
+
+    if result:
+        rewrite_cache.set(cache_key, result)
+        return result
+    else:
+        with span('mock'):
+            return generate_mock_rewrite(news_item, style)
+
+
+def rewrite_with_ai_stream(news_item, format_type, style, use_deep=False, meta=None, fresh=False, target_ms=None,
+                           deadline=None):
+    """使用火山引擎API流式改写新闻，逐段产出文本；生成器在请求处理函数返回后才执行，截止时间需显式传入"""
+    with span('plan'), deadline_scope(deadline):
+        plan = plan_rewrite(news_item, format_type, style, use_deep, meta, target_ms)
+        cache_key = build_rewrite_cache_key(news_item, format_type, style, plan)
+    with span('cache'):
+        cached = lookup_rewrite_cache(cache_key, fresh, meta)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    try:
+        for delta in stream_volcano_api(plan['prompt'], plan['model'], plan['max_tokens'], deadline=deadline):
+            parts.append(delta)
+            yield delta
+    except Exception as e:
+        # 已经输出过内容时无法再降级，交给调用方报告错误
+        if parts:
+            raise
+        print(f"调用火山引擎出错: {e}")
+
+    if meta is not None:
+        meta['fallback'] = not parts
+
+    if parts:
+        # 只有完整生成的结果才写入缓存，客户端中途断开时不会执行到这里
+        rewrite_cache.set(cache_key, ''.join(parts))
+    else:
+        with span('mock'):
+            mock = generate_mock_rewrite(news_item, style)
+        yield mock
 
-    templates = {
-        'vlog': f'''哇塞！兄弟们，最新消息来了！{title}
 
-讲真，看完这个我整个人都激动了。{summary[:60]}...
+# 模型不可用时的模拟改写文案，字段同 writer.py 的模板
+MOCK_REWRITE_TEMPLATES = {
+    'vlog': '''哇塞！兄弟们，最新消息来了！{title}
+
+讲真，看完这个我整个人都激动了。{summary:.60}...
 
 兄弟们，你们觉得这车怎么样？评论区聊聊！🚗💨''',
-        'review': f'''【新车快讯】{title}
+    'review': '''【新车快讯】{title}
 
 {summary}
 
 从专业角度来看，这次更新确实很有诚意。产品力提升明显，无论是配置还是价格都很有竞争力。建议感兴趣的朋友可以关注一下实车表现。''',
-        'push': f'''🔥重磅推荐！{title}！
+    'push': '''🔥重磅推荐！{title}！
 
 {summary}
 
 真的！这次太给力了！宝子们，这波绝对不能错过！
 
 私我了解详情，还有额外福利！先到先得！冲鸭！🎉''',
-        'news': f'''【汽车资讯】{title}
+    'news': '''【汽车资讯】{title}
 
 {summary}
 
 记者了解到，该车型/技术的推出将进一步丰富消费者的选择空间。具体售价及配置信息，请关注官方后续报道。'''
-    }
+}
+template_registry.register('mock', MOCK_REWRITE_TEMPLATES, default='vlog')
+
+
+def generate_mock_rewrite(news_item, style):
+    """生成模拟改写结果"""
+    metrics.MOCK_FALLBACKS.labels('rewrite').inc()
+    title = news_item.get('title', '')
+    return template_registry.render('mock', style, {'title': title, 'summary': news_item.get('summary', '')}, key=title)
+
 
-    return templates.get(style, templates['vlog'])
+ingest_scheduler = IngestScheduler([s['id'] for s in NEWS_SOURCES], ingest_source, news_store,
+                                   on_stored=crawler.mark_seen)
+# 解析进程池以 spawn 方式启动时，子进程会重新导入入口脚本（python app.py 时即本模块）；
+# gunicorn 的 worker 是 fork 出来的，没有 multiprocessing 父进程，只有解析子进程会跳过采集
+if INGEST_ENABLED and multiprocessing.parent_process() is None:
+    ingest_scheduler.start()
 
 
 if __name__ == '__main__':
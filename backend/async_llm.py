@@ -0,0 +1,306 @@
+# async_llm.py - 火山引擎异步客户端（asyncio + 并发上限）
+import asyncio
+import os
+import threading
+
+import requests
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from config import (
+    VOLCENGINE_ACCESS_KEY, VOLCENGINE_ENDPOINT, VOLCENGINE_SCHEME,
+    LLM_TIMEOUT, LLM_ASYNC_MAX_CONCURRENCY, LLM_CONNECT_TIMEOUT, LLM_MAX_RETRIES, LLM_RATE_MAX_WAIT,
+    LLM_HEDGE_ENABLED, LLM_HEDGE_PERCENTILE, LLM_HEDGE_MIN_DELAY_MS
+)
+from llm_client import get_llm_client, resolve_model, build_payload, extract_content
+from model_router import model_router
+from deadline import current_deadline
+from timing import span
+from resilience import CallRejected, RETRYABLE_STATUSES, get_breaker, rate_limiter, retry_delay, hedge_budget
+
+# 连接没建立起来、或复用的空闲连接已被服务端关闭的错误可以放心重试；
+# ClientTimeout 只设置了 sock_connect，ServerTimeoutError 只会是连接超时（同步客户端的 ConnectTimeout）
+_CONNECT_ERRORS = (requests.ConnectionError,) + (
+    (aiohttp.ClientConnectorError, aiohttp.ServerDisconnectedError, aiohttp.ClientOSError,
+     aiohttp.ServerTimeoutError) if aiohttp else ()
+)
+
+
+class AsyncLLMClient:
+    """异步客户端：一个事件循环内共享连接池，信号量限制同时在途的模型调用数"""
+
+    def __init__(self, endpoint=VOLCENGINE_ENDPOINT, api_key=VOLCENGINE_ACCESS_KEY,
+                 max_concurrency=LLM_ASYNC_MAX_CONCURRENCY, timeout=LLM_TIMEOUT):
+        self.url = f"{VOLCENGINE_SCHEME}://{endpoint}/api/v3/chat/completions"
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.inflight = 0
+        self.waiting = 0
+        self.completed = 0
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            # HTTP/1.1 下每个在途请求占用一条连接，连接上限与并发上限一致
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                keepalive_timeout=60
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={
+                    'Content-Type': 'application/json',
+                    'Authorization': f'Bearer {self.api_key}'
+                }
+            )
+        return self._session
+
+    async def chat(self, payload, timeout=None):
+        """发送请求，返回 (status, data, text, headers)"""
+        self.waiting += 1
+        async with self.semaphore:
+            self.waiting -= 1
+            self.inflight += 1
+            try:
+                if aiohttp is None:
+                    # 未安装 aiohttp 时退回线程池中的同步连接池
+                    loop = asyncio.get_running_loop()
+                    response = await loop.run_in_executor(
+                        None, lambda: get_llm_client().chat(payload, timeout)
+                    )
+                    data = response.json() if response.ok else None
+                    return response.status_code, data, response.text, response.headers
+
+                client_timeout = aiohttp.ClientTimeout(
+                    total=timeout or self.timeout, sock_connect=LLM_CONNECT_TIMEOUT
+                )
+                session = self._get_session()
+                async with session.post(self.url, json=payload, timeout=client_timeout) as response:
+                    text = await response.text()
+                    data = await response.json(content_type=None) if response.status < 400 else None
+                    return response.status, data, text, response.headers
+            finally:
+                self.inflight -= 1
+                self.completed += 1
+
+    def stats(self):
+        return {
+            'backend': 'aiohttp' if aiohttp else 'threadpool',
+            'max_concurrency': self.max_concurrency,
+            'inflight': self.inflight,
+            'waiting': self.waiting,
+            'completed': self.completed
+        }
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+class LLMEventLoop:
+    """进程内专用事件循环线程，所有异步模型调用都在这里执行"""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.loop = asyncio.new_event_loop()
+        self.client = None
+        self._ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='llm-event-loop', daemon=True)
+        self.thread.start()
+        self._ready.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.client = AsyncLLMClient()
+        self._ready.set()
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """从任意线程提交协程，返回 concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+
+_llm_loop = None
+_llm_loop_lock = threading.Lock()
+
+
+def get_llm_loop():
+    """获取当前进程的共享事件循环（gunicorn fork 后按 pid 重建）"""
+    global _llm_loop
+    llm_loop = _llm_loop
+    if llm_loop is not None and llm_loop.pid == os.getpid():
+        return llm_loop
+
+    with _llm_loop_lock:
+        if _llm_loop is None or _llm_loop.pid != os.getpid():
+            _llm_loop = LLMEventLoop()
+        return _llm_loop
+
+
+async def run_on_llm_loop(coro):
+    """在共享事件循环上执行协程，并在调用方的事件循环中等待结果"""
+    llm_loop = get_llm_loop()
+    try:
+        current = asyncio.get_running_loop()
+    except RuntimeError:
+        current = None
+
+    if current is llm_loop.loop:
+        return await coro
+    return await asyncio.wrap_future(llm_loop.submit(coro))
+
+
+async def _send_with_retries(client, payload, model_name, deadline=None):
+    """llm_client.send_with_retries 的异步版本，返回 (status, data, text)"""
+    breaker = get_breaker(model_name)
+    if deadline is not None and deadline.expired():
+        raise CallRejected('已到请求截止时间')
+    if not breaker.allow():
+        raise CallRejected(f'模型 {model_name} 熔断中')
+
+    result = None
+    headers = None
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        delay = rate_limiter.reserve(deadline.timeout(LLM_RATE_MAX_WAIT) if deadline else LLM_RATE_MAX_WAIT)
+        if delay is None:
+            breaker.release()
+            raise CallRejected('超出模型调用配额')
+
+        timeout = deadline.timeout(client.timeout) if deadline else client.timeout
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+            result = await client.chat(payload, timeout=max(timeout - delay, 0.01))
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except _CONNECT_ERRORS as e:
+            reason = f'连接失败: {type(e).__name__}'
+            result = headers = None
+        except (asyncio.TimeoutError, requests.Timeout):
+            if timeout < client.timeout:
+                breaker.release()
+            else:
+                breaker.record_failure('读取超时')
+            raise
+        except Exception as e:
+            breaker.record_failure(type(e).__name__)
+            raise
+        else:
+            status, data, text, headers = result
+            result = status, data, text
+            if data is not None:
+                breaker.record_success()
+                return result
+            if status not in RETRYABLE_STATUSES:
+                breaker.release()
+                return result
+            reason = f'HTTP {status}'
+
+        if attempt < LLM_MAX_RETRIES:
+            wait = retry_delay(attempt, headers.get('Retry-After') if headers is not None else None)
+            if deadline is not None and wait >= deadline.remaining():
+                break
+            print(f"火山引擎{reason}，{wait:.2f}s 后重试")
+            await asyncio.sleep(wait)
+
+    breaker.record_failure(reason)
+    if result is None:
+        raise ConnectionError(reason)
+    return result
+
+
+async def _attempt(client, payload, model_name, deadline):
+    """一次计入 model_router 统计的模型请求，失败时返回 None"""
+    with model_router.track(model_name) as call:
+        try:
+            with span('llm', model_name):
+                status, data, text = await _send_with_retries(client, payload, model_name, deadline)
+            if data is not None:
+                print("火山引擎响应成功")
+                call['ok'] = True
+                return extract_content(data)
+            print(f"火山引擎API错误: {status} - {text}")
+            return None
+        except asyncio.CancelledError:
+            call['skip'] = True
+            raise
+        except CallRejected as e:
+            call['skip'] = True
+            print(f"{e}，直接降级")
+            return None
+        except Exception as e:
+            print(f"调用火山引擎出错: {e!r}")
+            return None
+
+
+def hedge_delay(model_name):
+    """原请求等待多久后发出对冲请求（秒）；未启用或延迟样本不足时返回 None"""
+    if not LLM_HEDGE_ENABLED:
+        return None
+    latency_ms = model_router.latency_percentile(model_name, LLM_HEDGE_PERCENTILE)
+    if latency_ms is None:
+        return None
+    return max(latency_ms, LLM_HEDGE_MIN_DELAY_MS) / 1000
+
+
+async def _call_volcano_api(prompt, model, max_tokens=None, deadline=None):
+    model_name = resolve_model(model)
+
+    print(f"调用火山引擎(async) - 模型: {model_name}")
+
+    payload = build_payload(prompt, model_name, max_tokens)
+    client = get_llm_loop().client
+    deadline = deadline or current_deadline()
+    hedge_budget.record_call()
+
+    primary = asyncio.ensure_future(_attempt(client, payload, model_name, deadline))
+    delay = hedge_delay(model_name)
+    if delay is None:
+        return await primary
+
+    pending = {primary}
+    try:
+        # 原请求超过延迟分位数仍未返回时，发出一个相同的请求，谁先返回用谁
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or (deadline is not None and deadline.remaining() <= 0) or not hedge_budget.try_acquire():
+            return await primary
+
+        print(f"{model_name} 超过 {delay * 1000:.0f}ms 未返回，发出对冲请求")
+        hedge = asyncio.ensure_future(_attempt(client, payload, model_name, deadline))
+        pending = {primary, hedge}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                if result:
+                    if task is hedge:
+                        hedge_budget.record_win()
+                    return result
+        return None
+    finally:
+        # 输掉的请求、以及调用方取消（如超过截止时间）时仍在途的请求直接取消，释放并发名额和连接
+        for task in pending:
+            task.cancel()
+
+
+async def call_volcano_api_async(prompt, model='lite', max_tokens=None, deadline=None):
+    """异步调用火山引擎API；deadline 默认取当前请求的截止时间"""
+    if not VOLCENGINE_ACCESS_KEY:
+        print("错误: 未配置 VOLCENGINE_ACCESS_KEY 环境变量")
+        return None
+
+    return await run_on_llm_loop(_call_volcano_api(prompt, model, max_tokens, deadline or current_deadline()))
+
+
+def async_llm_stats():
+    """异步客户端统计"""
+    client = get_llm_loop().client
+    stats = client.stats()
+    stats['hedge'] = hedge_budget.stats()
+    return stats
@@ -0,0 +1,115 @@
+# batch.py - 批量改写（新闻 × 风格 × 格式 并发执行，按完成顺序返回）
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config import REWRITE_BATCH_WORKERS, REWRITE_BATCH_MAX_TASKS
+
+FORMATS = ('short', 'long')
+
+
+class BatchError(ValueError):
+    """批量请求参数错误"""
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_batch_executor():
+    """进程内共享的改写线程池，所有批量请求共用同一个并发上限"""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=REWRITE_BATCH_WORKERS,
+                thread_name_prefix='rewrite-batch'
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def expand_tasks(news_items, styles, formats, valid_styles):
+    """展开为 (序号, 新闻, 风格, 格式) 任务列表"""
+    if not isinstance(news_items, list) or not news_items:
+        raise BatchError('新闻列表不能为空')
+
+    styles = styles or ['vlog']
+    formats = formats or ['short']
+
+    unknown_styles = [s for s in styles if s not in valid_styles]
+    if unknown_styles:
+        raise BatchError(f"不支持的风格: {', '.join(map(str, unknown_styles))}")
+
+    unknown_formats = [f for f in formats if f not in FORMATS]
+    if unknown_formats:
+        raise BatchError(f"不支持的格式: {', '.join(map(str, unknown_formats))}")
+
+    total = len(news_items) * len(styles) * len(formats)
+    if total > REWRITE_BATCH_MAX_TASKS:
+        raise BatchError(f'任务数 {total} 超过上限 {REWRITE_BATCH_MAX_TASKS}')
+
+    tasks = []
+    for idx, news_item in enumerate(news_items):
+        for style in styles:
+            for format_type in formats:
+                tasks.append((idx, news_item, style, format_type))
+    return tasks
+
+
+def _run_task(rewrite_fn, task, use_deep, fresh):
+    idx, news_item, style, format_type = task
+    result = {
+        'index': idx,
+        'newsId': news_item.get('id') if isinstance(news_item, dict) else None,
+        'style': style,
+        'format': format_type
+    }
+    start = time.perf_counter()
+    try:
+        if not isinstance(news_item, dict) or not news_item:
+            raise BatchError('新闻内容不能为空')
+        meta = {}
+        result['data'] = rewrite_fn(news_item, format_type, style, use_deep, meta=meta, fresh=fresh)
+        result['success'] = True
+        result['fallback'] = meta.get('fallback', False)
+        result['cached'] = meta.get('cached', False)
+        result['routing'] = meta.get('routing')
+    except Exception as e:
+        print(f"批量改写出错 [{idx}/{style}/{format_type}]: {e}")
+        result['success'] = False
+        result['error'] = str(e)
+    result['elapsedMs'] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+def run_batch(rewrite_fn, tasks, use_deep=False, fresh=False):
+    """并发执行改写任务，按完成顺序逐条产出结果；生成器被关闭时取消未开始的任务"""
+    executor = get_batch_executor()
+    futures = [executor.submit(_run_task, rewrite_fn, task, use_deep, fresh) for task in tasks]
+    succeeded = 0
+    try:
+        for future in as_completed(futures):
+            result = future.result()
+            if result['success']:
+                succeeded += 1
+            yield result
+    finally:
+        for future in futures:
+            future.cancel()
+
+    yield {
+        'done': True,
+        'total': len(tasks),
+        'succeeded': succeeded,
+        'failed': len(tasks) - succeeded
+    }
+
+
+def to_ndjson(results):
+    """结果流编码为 NDJSON，每行一个结果"""
+    for result in results:
+        yield json.dumps(result, ensure_ascii=False) + '\n'
@@ -0,0 +1 @@
+# bench package - 性能基准测试脚本
@@ -0,0 +1,85 @@
+# bench_json.py - API JSON 响应基准：ASCII 转义 vs UTF-8 直出 vs orjson，以及 gzip / brotli 后的字节数
+# 用法: cd backend && python -m bench.bench_json [--rounds 2000] [--news 50]
+import argparse
+import json
+import time
+
+from compression import ENCODINGS, compress
+from writer import generate_content
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from bench.fake_ark import BRANDS, EVENTS, FILLER
+
+
+def news_payload(count):
+    """/api/news：count 条带摘要的新闻"""
+    news = [{
+        'id': f'news_{i}',
+        'title': f'{BRANDS[i % len(BRANDS)]}新车{i} {EVENTS[i % len(EVENTS)]}',
+        'summary': FILLER,
+        'url': f'https://example.com/news/{i}.html',
+        'source': 'autohome',
+        'source_name': '汽车之家',
+        'publishTime': '2026-10-18T08:00:00'
+    } for i in range(count)]
+    return {'success': True, 'data': news, 'count': len(news), 'cache': 'fresh', 'fetchedAt': '2026-10-18T08:00:00'}
+
+
+def rewrite_payload(format_type):
+    """/api/rewrite：短文案或长文章"""
+    news = {'title': '比亚迪秦L DM-i正式上市 售价7.98万起', 'summary': FILLER, 'source_name': '汽车之家'}
+    return {'success': True, 'data': {'content': generate_content(news, format_type, 'review'),
+                                      'model': 'doubao-lite-4k', 'cached': False}}
+
+
+def codecs():
+    """改造前 jsonify 的输出（ASCII 转义、排序、紧凑分隔符）和改造后的两种编码器"""
+    result = {
+        'ascii': lambda obj: json.dumps(obj, ensure_ascii=True, sort_keys=True, separators=(',', ':')).encode('utf-8'),
+        'utf8': lambda obj: json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8'),
+    }
+    if orjson is not None:
+        result['orjson'] = lambda obj: orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+    return result
+
+
+def timed(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON 响应序列化和压缩基准')
+    parser.add_argument('--rounds', type=int, default=2000)
+    parser.add_argument('--news', type=int, default=50, help='新闻列表条数')
+    args = parser.parse_args()
+
+    payloads = {
+        f'news x{args.news}': news_payload(args.news),
+        'rewrite short': rewrite_payload('short'),
+        'rewrite long': rewrite_payload('long'),
+    }
+    if orjson is None:
+        print('未安装 orjson，跳过 orjson 对比')
+
+    for name, payload in payloads.items():
+        print(f"\n{name}")
+        for codec, dumps in codecs().items():
+            body = dumps(payload)
+            cost = timed(lambda: dumps(payload), args.rounds)
+            sizes = [f'{len(body):7d}B']
+            for encoding in ENCODINGS:
+                data = compress(body, encoding)
+                compress_cost = timed(lambda: compress(body, encoding), max(args.rounds // 10, 1))
+                sizes.append(f'{encoding} {len(data):6d}B {compress_cost:7.1f}µs')
+            print(f"  {codec:<7} 序列化 {cost:7.1f}µs  " + '  '.join(sizes))
+
+
+if __name__ == '__main__':
+    main()
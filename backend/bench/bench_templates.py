@@ -0,0 +1,63 @@
+# bench_templates.py - 文案模板渲染基准：每次构建全部风格的 f-string vs 注册表只渲染选中的一条
+# 用法: cd backend && python -m bench.bench_templates [--rounds 20000]
+import argparse
+import time
+
+from templates import TemplateRegistry, VARIANT_MODES
+from writer import SHORT_TEMPLATES, LONG_TEMPLATES
+
+NEWS = {
+    'title': '比亚迪秦L DM-i正式上市 售价7.98万起',
+    'summary': '比亚迪官方宣布，秦L DM-i正式上市，共推出5款车型，售价区间7.98-12.98万元。'
+               '新车搭载第五代DM-i混动技术，NEDC工况下综合续航可达2000km。',
+    'source': '汽车之家'
+}
+
+
+def build_eager(templates):
+    """还原改造前的写法：函数体内的 dict 里每个风格的每个变体都是 f-string，调用一次全部格式化"""
+    items = ', '.join(
+        f"{style!r}: [{', '.join('f' + repr(text) for text in variants)}]"
+        for style, variants in templates.items()
+    )
+    code = f"def render(title, summary, source, style):\n    options = {{{items}}}\n    return options.get(style, options['vlog'])[0]\n"
+    namespace = {}
+    exec(compile(code, '<eager>', 'exec'), namespace)
+    return namespace['render']
+
+
+def timed(fn, rounds):
+    start = time.perf_counter()
+    for i in range(rounds):
+        fn(i)
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='模板渲染基准')
+    parser.add_argument('--rounds', type=int, default=20000)
+    args = parser.parse_args()
+
+    title, summary, source = NEWS['title'], NEWS['summary'], NEWS['source']
+    styles = list(SHORT_TEMPLATES)
+    for kind, templates in (('short', SHORT_TEMPLATES), ('long', LONG_TEMPLATES)):
+        eager = build_eager(templates)
+        registries = {}
+        for mode in VARIANT_MODES:
+            registries[mode] = TemplateRegistry(mode)
+            registries[mode].register(kind, templates, default='vlog')
+        # 结果一致才有比较意义
+        for style in styles:
+            assert eager(title, summary, source, style) == registries['first'].render(kind, style, NEWS)
+
+        total = sum(len(v) for v in templates.values())
+        print(f"{kind}（{len(templates)} 种风格，共 {total} 条模板）每次渲染耗时:")
+        base = timed(lambda i: eager(title, summary, source, styles[i % len(styles)]), args.rounds)
+        print(f"  全部构建后取一条     {base:8.2f} µs")
+        for mode, registry in registries.items():
+            cost = timed(lambda i: registry.render(kind, styles[i % len(styles)], NEWS, key=title), args.rounds)
+            print(f"  注册表 {mode:<12}  {cost:8.2f} µs  ({base / cost:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+# fake_ark.py - 本地模拟火山方舟 chat/completions 接口（压测用，不消耗真实配额）
+# 用法: cd backend && python -m bench.fake_ark --port 18080 --latency 0.8 --tokens-per-sec 80 --error-rate 0.02
+# 应用侧设置 VOLCENGINE_SCHEME=http VOLCENGINE_ENDPOINT=127.0.0.1:18080
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BRANDS = ['比亚迪', '特斯拉', '小米', '理想', '蔚来', '小鹏', '吉利', '问界', '极氪', '长安']
+EVENTS = ['正式上市', '开启预售', '官图发布', '申报信息曝光', '销量突破十万辆', '推出限时优惠']
+# 生成改写文本用的字，每个字按一个 token 计
+FILLER = '这款新车的外观设计更加运动，内饰用料扎实，续航表现也令人满意。智能驾驶辅助系统覆盖城市道路，售价很有竞争力。'
+
+
+class FakeArk:
+    """模拟接口的行为参数和计数"""
+
+    def __init__(self, latency=0.5, jitter=0.2, tokens_per_sec=80, error_rate=0.0, output_tokens=300):
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_sec = tokens_per_sec
+        self.error_rate = error_rate
+        self.output_tokens = output_tokens
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def first_token_delay(self):
+        """首 token 延迟：latency 上下浮动 jitter 比例"""
+        return max(self.latency * random.uniform(1 - self.jitter, 1 + self.jitter), 0)
+
+    def reply(self, prompt, max_tokens):
+        """搜索提示词返回 JSON 新闻数组，其余返回改写文本"""
+        if 'JSON' in prompt:
+            news = [{
+                'title': f"{random.choice(BRANDS)}新车{random.randint(1, 9999)} {random.choice(EVENTS)}",
+                'summary': FILLER[:40],
+                'url': f'https://example.com/news/{uuid.uuid4().hex[:12]}.html',
+                'publishTime': time.strftime('%Y-%m-%dT%H:%M:%S')
+            } for _ in range(5)]
+            return json.dumps(news, ensure_ascii=False)
+        count = min(max_tokens or self.output_tokens, self.output_tokens)
+        return (FILLER * (count // len(FILLER) + 1))[:count]
+
+    def count(self, error=False):
+        with self._lock:
+            self.requests += 1
+            if error:
+                self.errors += 1
+
+
+def make_handler(ark):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            if self.path != '/api/v3/chat/completions':
+                self._send_json(404, {'error': {'message': 'not found'}})
+                return
+
+            if random.random() < ark.error_rate:
+                ark.count(error=True)
+                status = random.choice([429, 500, 503])
+                time.sleep(ark.first_token_delay() / 4)
+                self._send_json(status, {'error': {'code': str(status), 'message': 'fake error'}},
+                                {'Retry-After': '1'} if status == 429 else None)
+                return
+            ark.count()
+
+            prompt = ''.join(m.get('content', '') for m in body.get('messages', []))
+            text = ark.reply(prompt, body.get('max_tokens'))
+            usage = {'prompt_tokens': len(prompt), 'completion_tokens': len(text), 'total_tokens': len(prompt) + len(text)}
+            time.sleep(ark.first_token_delay())
+
+            if body.get('stream'):
+                self._stream(body, text, usage)
+                return
+
+            time.sleep(len(text) / ark.tokens_per_sec if ark.tokens_per_sec > 0 else 0)
+            self._send_json(200, {
+                'id': uuid.uuid4().hex,
+                'model': body.get('model'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+                'usage': usage
+            })
+
+        def _stream(self, body, text, usage):
+            """按 tokens_per_sec 的速度分块输出 SSE"""
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            step = 4
+            for i in range(0, len(text), step):
+                piece = text[i:i + step]
+                self._chunk({'model': body.get('model'), 'choices': [{'index': 0, 'delta': {'content': piece}}]})
+                if ark.tokens_per_sec > 0:
+                    time.sleep(len(piece) / ark.tokens_per_sec)
+            self._chunk({'model': body.get('model'), 'choices': [], 'usage': usage})
+            self._write(b'data: [DONE]\n\n')
+            self.wfile.write(b'0\r\n\r\n')
+
+        def _chunk(self, payload):
+            self._write(('data: ' + json.dumps(payload, ensure_ascii=False) + '\n\n').encode('utf-8'))
+
+        def _write(self, data):
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+            self.wfile.flush()
+
+    return Handler
+
+
+def serve(port, ark, host='127.0.0.1'):
+    server = ThreadingHTTPServer((host, port), make_handler(ark))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='模拟火山方舟 chat/completions 接口')
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--latency', type=float, default=0.5, help='首 token 延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.2, help='延迟浮动比例')
+    parser.add_argument('--tokens-per-sec', type=float, default=80, help='生成速度，0 表示一次返回')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回 429/500/503 的比例')
+    parser.add_argument('--output-tokens', type=int, default=300, help='改写输出 token 数上限')
+    args = parser.parse_args()
+
+    ark = FakeArk(args.latency, args.jitter, args.tokens_per_sec, args.error_rate, args.output_tokens)
+    print(f"模拟方舟接口: http://127.0.0.1:{args.port}/api/v3/chat/completions")
+    serve(args.port, ark).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
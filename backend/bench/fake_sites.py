@@ -0,0 +1,120 @@
+# fake_sites.py - 模拟汽车之家、易车列表页和文章页的本地站点（压测用）
+# 用法: cd backend && python -m bench.fake_sites --port 18090 --latency 0.05 --new-per-request 3
+# 列表页: /autohome/list、/yiche/list；文章页: /article/<n>.html；支持 ETag / If-None-Match
+import argparse
+import hashlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bench.fake_ark import BRANDS, EVENTS, FILLER
+
+# 与真实站点一样，两个站点的列表条目用不同的 class
+LIST_CLASSES = {'autohome': 'article-item', 'yiche': 'news-item'}
+# 接近门户列表页的体量：大段脚本和导航在新闻列表之前
+PAGE_HEAD = (
+    '<html><head><meta charset="utf-8">' + ('<script>var cfg = "' + 'x' * 1024 + '";</script>') * 60 + '</head><body>'
+    + '<ul class="menu">' + ''.join(f'<li class="nav"><a href="/channel/{i}">频道{i}</a></li>' for i in range(300)) + '</ul>'
+)
+PAGE_FOOT = ''.join(f'<p class="footer">版权信息 {i}</p>' for i in range(100)) + '</body></html>'
+
+
+class FakeSites:
+    """列表页每被请求一次滚动出 new_per_request 条新新闻，模拟站点持续更新"""
+
+    def __init__(self, latency=0.05, items=60, new_per_request=3, paragraphs=12):
+        self.latency = latency
+        self.items = items
+        self.new_per_request = new_per_request
+        self.paragraphs = paragraphs
+        self._lock = threading.Lock()
+        self._offsets = {source: 0 for source in LIST_CLASSES}
+
+    def list_page(self, source):
+        with self._lock:
+            offset = self._offsets[source]
+            self._offsets[source] += self.new_per_request
+        items = ''.join(
+            f'<div class="{LIST_CLASSES[source]}"><img src="/img/{n}.jpg">'
+            f'<a href="/article/{n}.html"> {BRANDS[n % len(BRANDS)]}新车{n} {EVENTS[n % len(EVENTS)]} </a>'
+            f'<span class="time">1小时前</span></div>'
+            for n in range(offset + self.items, offset, -1)
+        )
+        return (PAGE_HEAD + f'<div class="main">{items}</div>' + PAGE_FOOT).encode('utf-8')
+
+    def article_page(self, n):
+        paragraphs = ''.join(f'<p>{FILLER}（第{i}段）</p>' for i in range(self.paragraphs))
+        return (
+            '<html><head><meta charset="utf-8">'
+            f'<meta property="article:published_time" content="{time.strftime("%Y-%m-%dT%H:%M:%S")}">'
+            '</head><body><nav><a href="/">首页</a></nav>'
+            f'<div class="article"><h1>{BRANDS[n % len(BRANDS)]}新车{n}</h1>{paragraphs}</div>'
+            '<footer>版权所有</footer></body></html>'
+        ).encode('utf-8')
+
+
+def make_handler(sites):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            parts = self.path.strip('/').split('/')
+            if len(parts) == 2 and parts[0] in LIST_CLASSES and parts[1] == 'list':
+                body = sites.list_page(parts[0])
+            elif len(parts) == 2 and parts[0] == 'article' and parts[1].endswith('.html'):
+                body = sites.article_page(int(parts[1][:-5] or 0))
+            else:
+                self.send_error(404)
+                return
+
+            time.sleep(sites.latency * random.uniform(0.8, 1.2))
+            etag = '"%s"' % hashlib.md5(body).hexdigest()
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def serve(port, sites, host='127.0.0.1'):
+    server = ThreadingHTTPServer((host, port), make_handler(sites))
+    server.daemon_threads = True
+    return server
+
+
+def source_urls(port, host='127.0.0.1'):
+    """替换 crawler.SOURCE_URLS 用的地址"""
+    return {
+        'autohome': (f'http://{host}:{port}/autohome/list', '汽车之家'),
+        'yiche': (f'http://{host}:{port}/yiche/list', '易车'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='模拟新闻站点')
+    parser.add_argument('--port', type=int, default=18090)
+    parser.add_argument('--latency', type=float, default=0.05, help='响应延迟（秒）')
+    parser.add_argument('--items', type=int, default=60, help='列表页条目数')
+    parser.add_argument('--new-per-request', type=int, default=3, help='每次请求列表页新出现的条目数')
+    args = parser.parse_args()
+
+    sites = FakeSites(args.latency, args.items, args.new_per_request)
+    print(f"模拟新闻站点: http://127.0.0.1:{args.port}/autohome/list")
+    serve(args.port, sites).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
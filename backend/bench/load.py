@@ -0,0 +1,387 @@
+# load.py - 压测：启动模拟方舟接口、模拟新闻站点和 gunicorn 应用，按场景压测，结果写入 JSON
+# 用法: cd backend && python -m bench.load [--scenarios news,news_uncached,rewrite,rewrite_stream,crawler]
+#       [--duration 15] [--concurrency 32] [--workers 2] [--latency 0.5] [--tokens-per-sec 80] [--error-rate 0]
+#       [--out bench/results/xxx.json] [--compare 上次的结果.json]
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'bench', 'results')
+
+# /api/news 轮流请求的新闻源组合，缓存键各不相同
+SOURCE_SETS = ['all', 'weibo', 'autohome', 'yiche', 'dongche', 'autohome,yiche', 'all,weibo']
+STYLES = ['vlog', 'review', 'push', 'news']
+# 新闻场景的截止时间：模拟搜索返回 5 条新闻约 850 字，默认 80 tokens/s 下约 11s，
+# 超过默认的 NEWS_DEADLINE_MS=8000，压测到的就只是模拟数据；放宽到请求超时（60s）以内
+NEWS_DEADLINE_MS = 50000
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url, timeout=30):
+    expires_at = time.monotonic() + timeout
+    while time.monotonic() < expires_at:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f'{url} 未能在 {timeout}s 内就绪')
+
+
+def spawn(args, env=None, log_path=None):
+    """在 backend 目录下启动子进程（模拟服务和应用都放在独立进程，不与压测线程争抢 GIL）"""
+    log = open(log_path, 'w') if log_path else subprocess.DEVNULL
+    return subprocess.Popen([sys.executable] + args, cwd=BACKEND_DIR, env=env,
+                            stdout=log, stderr=subprocess.STDOUT)
+
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def percentiles(values):
+    """毫秒分位数"""
+    if not values:
+        return None
+    values = sorted(values)
+
+    def pick(p):
+        return round(values[min(int(len(values) * p), len(values) - 1)], 1)
+
+    return {'p50': pick(0.5), 'p95': pick(0.95), 'p99': pick(0.99),
+            'max': round(values[-1], 1), 'mean': round(sum(values) / len(values), 1)}
+
+
+def parse_server_timing(header):
+    """Server-Timing 头 -> {阶段: 毫秒}"""
+    stages = {}
+    for part in (header or '').split(','):
+        fields = part.strip().split(';')
+        for field in fields[1:]:
+            if field.startswith('dur='):
+                stages[fields[0]] = float(field[4:])
+    return stages
+
+
+class Recorder:
+    """收集每个请求的延迟、成败、首字节时间、响应字节数和各阶段耗时；降级为模拟数据的响应单独计数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.ttfb = []
+        self.errors = 0
+        self.fallbacks = 0
+        self.sizes = []
+        self.stages = defaultdict(list)
+
+    def record(self, seconds, ok, stages=None, ttfb=None, size=None, fallback=False):
+        with self._lock:
+            self.latencies.append(seconds * 1000)
+            if not ok:
+                self.errors += 1
+            if fallback:
+                self.fallbacks += 1
+            if ttfb is not None:
+                self.ttfb.append(ttfb * 1000)
+            if size is not None:
+                self.sizes.append(size)
+            for name, ms in (stages or {}).items():
+                self.stages[name].append(ms)
+
+    def summary(self, elapsed):
+        result = {
+            'requests': len(self.latencies),
+            'errors': self.errors,
+            'fallbacks': self.fallbacks,
+            'rps': round(len(self.latencies) / elapsed, 2) if elapsed else 0.0,
+            'latencyMs': percentiles(self.latencies),
+            'stagesMs': {name: percentiles(values) for name, values in sorted(self.stages.items())}
+        }
+        if self.ttfb:
+            result['ttfbMs'] = percentiles(self.ttfb)
+        if self.sizes:
+            result['responseBytes'] = round(sum(self.sizes) / len(self.sizes))
+        return result
+
+
+def run_load(request_fn, concurrency, duration):
+    """concurrency 个线程在 duration 秒内循环调用 request_fn(session, 线程号, 序号, recorder)"""
+    recorder = Recorder()
+    stop_at = time.monotonic() + duration
+
+    def worker(index):
+        session = requests.Session()
+        n = 0
+        while time.monotonic() < stop_at:
+            request_fn(session, index, n, recorder)
+            n += 1
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder.summary(time.monotonic() - start)
+
+
+def wire_size(resp):
+    """实际传输的响应体字节数（压缩后）；requests 会自动解压，所以取 Content-Length"""
+    return int(resp.headers.get('Content-Length', len(resp.content)))
+
+
+def is_mock_news(payload):
+    """超过截止时间或搜索失败时应用返回模拟新闻（id 以 mock_ 开头）"""
+    return payload.get('cache') == 'deadline' or any(
+        str(item.get('id', '')).startswith('mock_') for item in payload.get('data') or [])
+
+
+def news_request(base):
+    def request_fn(session, worker, n, recorder):
+        start = time.perf_counter()
+        fallback = False
+        try:
+            resp = session.get(f'{base}/api/news', timeout=60,
+                               params={'sources': SOURCE_SETS[(worker + n) % len(SOURCE_SETS)]})
+            payload = resp.json() if resp.ok else {}
+            # 模拟数据计为失败：否则测到的只是降级路径
+            fallback = is_mock_news(payload)
+            ok = payload.get('success') and not fallback
+            stages = parse_server_timing(resp.headers.get('Server-Timing'))
+            size = wire_size(resp)
+        except (requests.RequestException, ValueError):
+            ok, stages, size = False, None, None
+        recorder.record(time.perf_counter() - start, ok, stages, size=size, fallback=fallback)
+    return request_fn
+
+
+def rewrite_body(worker, n):
+    # 每个请求的标题不同，且 fresh=True 跳过缓存，每次都真正调用模型
+    return {
+        'news': {'title': f'压测新闻 {worker}-{n} 比亚迪新车正式上市', 'summary': '新车搭载第五代混动系统，综合续航超过两千公里。'},
+        'style': STYLES[n % len(STYLES)],
+        'format': 'short',
+        'fresh': True
+    }
+
+
+def rewrite_request(base):
+    def request_fn(session, worker, n, recorder):
+        start = time.perf_counter()
+        try:
+            resp = session.post(f'{base}/api/rewrite', json=rewrite_body(worker, n), timeout=120)
+            payload = resp.json() if resp.ok else {}
+            # 模拟文案计为失败，与新闻场景一致
+            fallback = bool(payload.get('fallback'))
+            ok = payload.get('success') and not fallback
+            stages = parse_server_timing(resp.headers.get('Server-Timing'))
+            size = wire_size(resp)
+        except (requests.RequestException, ValueError):
+            ok, stages, size, fallback = False, None, None, False
+        recorder.record(time.perf_counter() - start, ok, stages, size=size, fallback=fallback)
+    return request_fn
+
+
+def rewrite_stream_request(base):
+    def request_fn(session, worker, n, recorder):
+        start = time.perf_counter()
+        ttfb = None
+        ok = fallback = False
+        event = None
+        try:
+            with session.post(f'{base}/api/rewrite/stream', json=rewrite_body(worker, n), stream=True,
+                              timeout=120) as resp:
+                for line in resp.iter_lines():
+                    if line.startswith(b'event: '):
+                        event = line[7:]
+                        if event == b'delta' and ttfb is None:
+                            ttfb = time.perf_counter() - start
+                    elif line.startswith(b'data: ') and event == b'done':
+                        # done 事件带 fallback 标记，模拟文案计为失败
+                        fallback = bool(json.loads(line[6:]).get('fallback'))
+                        ok = resp.ok and not fallback
+        except (requests.RequestException, ValueError):
+            pass
+        recorder.record(time.perf_counter() - start, ok, ttfb=ttfb, fallback=fallback)
+    return request_fn
+
+
+# 场景：应用的额外环境变量 + 单次请求函数
+SCENARIOS = {
+    'news': ({'NEWS_DEADLINE_MS': str(NEWS_DEADLINE_MS)}, news_request),
+    # 关掉新闻缓存，每个请求都走（合并后的）AI 搜索
+    'news_uncached': ({'NEWS_CACHE_FRESH': '0', 'NEWS_CACHE_MAX_AGE': '0', 'NEWS_DEADLINE_MS': str(NEWS_DEADLINE_MS)},
+                      news_request),
+    'rewrite': ({}, rewrite_request),
+    'rewrite_stream': ({}, rewrite_stream_request),
+}
+
+
+def run_app_scenario(name, args, ark_port, data_dir):
+    extra_env, make_request = SCENARIOS[name]
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        'DATA_DIR': os.path.join(data_dir, name),
+        'VOLCENGINE_ACCESS_KEY': 'bench',
+        'VOLCENGINE_SCHEME': 'http',
+        'VOLCENGINE_ENDPOINT': f'127.0.0.1:{ark_port}',
+        'INGEST_ENABLED': 'false',
+        'REWRITE_CACHE_DB': '',
+        'PROFILE_DIR': '',
+        'WEB_CONCURRENCY': str(args.workers),
+    })
+    env.update(extra_env)
+    app = spawn(['-m', 'gunicorn', 'app:app', '--bind', f'127.0.0.1:{port}'], env,
+                os.path.join(data_dir, f'{name}.log'))
+    try:
+        base = f'http://127.0.0.1:{port}'
+        wait_ready(f'{base}/api/sources')
+        return run_load(make_request(base), args.concurrency, args.duration)
+    finally:
+        stop(app)
+
+
+def run_crawler_scenario(args, sites_port, data_dir):
+    """在本进程内循环抓取模拟站点的列表页和文章页"""
+    os.environ['DATA_DIR'] = os.path.join(data_dir, 'crawler')
+    sys.path.insert(0, BACKEND_DIR)
+    import crawler as crawler_module
+    from bench.fake_sites import source_urls
+
+    crawler_module.SOURCE_URLS.update(source_urls(sites_port))
+    news_crawler = crawler_module.NewsCrawler()
+    recorder = Recorder()
+    start = time.monotonic()
+    while time.monotonic() - start < args.duration:
+        began = time.perf_counter()
+        # 抓取过程的逐条日志不输出
+        with contextlib.redirect_stdout(io.StringIO()):
+            news, report = news_crawler.fetch_with_report(['autohome', 'yiche'])
+            news_crawler.mark_seen(news)
+            articles_start = time.perf_counter()
+            news_crawler.fetch_articles(news)
+        stages = {f'list-{source}': entry['durationMs'] for source, entry in report.items()}
+        stages['articles'] = (time.perf_counter() - articles_start) * 1000
+        ok = all(entry['outcome'] == 'ok' for entry in report.values())
+        recorder.record(time.perf_counter() - began, ok, stages)
+    result = recorder.summary(time.monotonic() - start)
+    result['articles'] = news_crawler.article_stats()
+    return result
+
+
+def git_revision():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, text=True).strip()
+        dirty = bool(subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                             cwd=BACKEND_DIR, text=True).strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+
+
+def compare(old, new):
+    """打印两次结果的吞吐和延迟变化"""
+    print(f"\n对比 {old.get('commit')} -> {new.get('commit')}")
+    for name, result in new['scenarios'].items():
+        before = old.get('scenarios', {}).get(name)
+        if not before or not before.get('latencyMs') or not result.get('latencyMs'):
+            continue
+        rps_change = (result['rps'] - before['rps']) / before['rps'] * 100 if before['rps'] else 0.0
+        p95_change = (result['latencyMs']['p95'] - before['latencyMs']['p95']) / before['latencyMs']['p95'] * 100 \
+            if before['latencyMs']['p95'] else 0.0
+        print(f"  {name:15s} rps {before['rps']:8.1f} -> {result['rps']:8.1f} ({rps_change:+.1f}%)  "
+              f"p95 {before['latencyMs']['p95']:8.1f} -> {result['latencyMs']['p95']:8.1f} ms ({p95_change:+.1f}%)")
+        if before.get('responseBytes') and result.get('responseBytes'):
+            print(f"  {'':15s} 响应 {before['responseBytes']}B -> {result['responseBytes']}B")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地压测（模拟方舟接口和新闻站点）')
+    parser.add_argument('--scenarios', default='news,news_uncached,rewrite,rewrite_stream,crawler')
+    parser.add_argument('--duration', type=float, default=15, help='每个场景压测秒数')
+    parser.add_argument('--concurrency', type=int, default=32, help='并发请求数')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn 工作进程数')
+    parser.add_argument('--latency', type=float, default=0.5, help='模拟模型首 token 延迟（秒）')
+    parser.add_argument('--tokens-per-sec', type=float, default=80, help='模拟模型生成速度')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='模拟模型错误率')
+    parser.add_argument('--site-latency', type=float, default=0.05, help='模拟站点响应延迟（秒）')
+    parser.add_argument('--out', help='结果 JSON 路径，默认 bench/results/<时间>-<commit>.json')
+    parser.add_argument('--compare', help='与之前的结果 JSON 对比')
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS and name != 'crawler']
+    if unknown:
+        parser.error(f"未知场景: {', '.join(unknown)}")
+
+    commit, dirty = git_revision()
+    results = {
+        'commit': commit,
+        'dirty': dirty,
+        'createdAt': datetime.now().isoformat(timespec='seconds'),
+        'params': {key: value for key, value in vars(args).items() if key not in ('out', 'compare')},
+        'scenarios': {}
+    }
+
+    ark_port, sites_port = free_port(), free_port()
+    with tempfile.TemporaryDirectory(prefix='bench-') as data_dir:
+        ark = spawn(['-m', 'bench.fake_ark', '--port', str(ark_port), '--latency', str(args.latency),
+                     '--tokens-per-sec', str(args.tokens_per_sec), '--error-rate', str(args.error_rate)])
+        sites = spawn(['-m', 'bench.fake_sites', '--port', str(sites_port), '--latency', str(args.site_latency)])
+        try:
+            wait_ready(f'http://127.0.0.1:{sites_port}/')
+            wait_ready(f'http://127.0.0.1:{ark_port}/')
+            for name in scenarios:
+                print(f"场景 {name}: 并发 {args.concurrency}，{args.duration:.0f}s ...")
+                if name == 'crawler':
+                    result = run_crawler_scenario(args, sites_port, data_dir)
+                else:
+                    result = run_app_scenario(name, args, ark_port, data_dir)
+                results['scenarios'][name] = result
+                latency = result['latencyMs'] or {}
+                if result['fallbacks']:
+                    print(f"  警告: {result['fallbacks']} 次响应是模拟数据，检查 --error-rate、--tokens-per-sec 和截止时间")
+                print(f"  {result['requests']} 次, 错误 {result['errors']}, {result['rps']} rps, "
+                      f"p50 {latency.get('p50')} / p95 {latency.get('p95')} / p99 {latency.get('p99')} ms"
+                      + (f", 平均响应 {result['responseBytes']}B" if 'responseBytes' in result else ''))
+        finally:
+            stop(ark)
+            stop(sites)
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {out}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+# bloom.py - 持久化的可扩展布隆过滤器（位数组映射到文件，多进程共享）
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+
+# 文件头：魔数、位数、哈希函数个数、容量、已写入条数
+_HEADER = struct.Struct('<4sQIQQ')
+_MAGIC = b'BLM1'
+_COUNT_OFFSET = _HEADER.size - 8
+
+
+def _initialized(path):
+    """文件头已完整写入（其他进程可能正在创建这个分片）"""
+    with open(path, 'rb') as f:
+        return f.read(_HEADER.size)[:len(_MAGIC)] == _MAGIC
+
+
+def _hashes(key):
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+
+class BloomFilter:
+    """固定容量的布隆过滤器，位数组通过 mmap 直接读写文件，进程退出后保留"""
+
+    def __init__(self, path, capacity, error_rate):
+        """文件不存在或文件头没写完时按参数初始化，调用方需持有分片目录的文件锁"""
+        self.path = path
+        fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            header = os.pread(fd, _HEADER.size, 0)
+            if len(header) == _HEADER.size and header[:len(_MAGIC)] != bytes(len(_MAGIC)):
+                magic, self.bits, self.k, self.capacity, _ = _HEADER.unpack(header)
+                if magic != _MAGIC:
+                    raise ValueError(f'不是布隆过滤器文件: {path}')
+            else:
+                self.capacity = capacity
+                self.bits = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+                self.k = max(int(round(self.bits / capacity * math.log(2))), 1)
+                os.ftruncate(fd, _HEADER.size + (self.bits + 7) // 8)
+                os.pwrite(fd, _HEADER.pack(_MAGIC, self.bits, self.k, self.capacity, 0), 0)
+            self._mm = mmap.mmap(fd, 0)
+        finally:
+            os.close(fd)
+
+    @property
+    def count(self):
+        return struct.unpack_from('<Q', self._mm, _COUNT_OFFSET)[0]
+
+    @property
+    def full(self):
+        return self.count >= self.capacity
+
+    def _positions(self, key):
+        h1, h2 = _hashes(key)
+        return [(h1 + i * h2) % self.bits for i in range(self.k)]
+
+    def __contains__(self, key):
+        mm = self._mm
+        base = _HEADER.size
+        return all(mm[base + (p >> 3)] & (1 << (p & 7)) for p in self._positions(key))
+
+    def add(self, key):
+        mm = self._mm
+        base = _HEADER.size
+        for p in self._positions(key):
+            mm[base + (p >> 3)] |= 1 << (p & 7)
+        struct.pack_into('<Q', mm, _COUNT_OFFSET, self.count + 1)
+
+    def flush(self):
+        self._mm.flush()
+
+    def close(self):
+        self._mm.close()
+
+
+class ScalableBloomFilter:
+    """写满后追加容量翻倍、误判率减半的新分片，各分片误判率之和不超过 error_rate；
+    多个进程写同一目录时由文件锁串行化"""
+
+    def __init__(self, directory, initial_capacity, error_rate, growth=2, tightening=0.5):
+        self.directory = directory
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self._lock = threading.Lock()
+        self._slices = []
+        os.makedirs(directory, exist_ok=True)
+        self._lock_fd = os.open(os.path.join(directory, 'seen.lock'), os.O_CREAT | os.O_RDWR, 0o644)
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            self._load()
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _slice_path(self, index):
+        return os.path.join(self.directory, f'seen.{index}.bloom')
+
+    def _open_slice(self, index):
+        return BloomFilter(
+            self._slice_path(index),
+            self.initial_capacity * self.growth ** index,
+            self.error_rate * (1 - self.tightening) * self.tightening ** index
+        )
+
+    def _load(self, locked=True):
+        # 加载其他进程新建的分片；未持有文件锁时跳过还没写好文件头的分片，不能去初始化它
+        while True:
+            path = self._slice_path(len(self._slices))
+            if not os.path.exists(path) or not (locked or _initialized(path)):
+                break
+            self._slices.append(self._open_slice(len(self._slices)))
+        if not self._slices:
+            self._slices.append(self._open_slice(0))
+
+    def __contains__(self, key):
+        with self._lock:
+            self._load(locked=False)
+            return any(key in s for s in self._slices)
+
+    def add(self, key):
+        """加入集合；之前（可能）见过返回 False，确定是新值返回 True"""
+        with self._lock:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                self._load()
+                if any(key in s for s in self._slices):
+                    return False
+                if self._slices[-1].full:
+                    self._slices.append(self._open_slice(len(self._slices)))
+                self._slices[-1].add(key)
+                return True
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def flush(self):
+        with self._lock:
+            for s in self._slices:
+                s.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'slices': len(self._slices),
+                'count': sum(s.count for s in self._slices),
+                'capacity': sum(s.capacity for s in self._slices),
+                'bytes': sum(_HEADER.size + (s.bits + 7) // 8 for s in self._slices)
+            }
@@ -14,9 +14,199 @@ VOLCENGINE_SECRET_KEY = os.environ.get('VOLCENGINE_SECRET_KEY', '')
 VOLCENGINE_ENDPOINT = os.environ.get('VOLCENGINE_ENDPOINT', 'ark.cn-beijing.volces.com')
 VOLCENGINE_MODEL_SEARCH = os.environ.get('VOLCENGINE_MODEL_SEARCH', 'doubao-lite-4k')
 VOLCENGINE_MODEL_DEEP = os.environ.get('VOLCENGINE_MODEL_DEEP', 'doubao-4-8k')
+# 接口协议，本地压测指向模拟服务时设为 http
+VOLCENGINE_SCHEME = os.environ.get('VOLCENGINE_SCHEME', 'https')
 
 # Tavily API
 TAVILY_API_KEY = os.environ.get('TAVILY_API_KEY', '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')
 
 # 搜索配置
 SEARCH_MAX_RESULTS = 10
+
+# LLM连接池配置
+# LLM_POOL_CONNECTIONS: 缓存的主机连接池数量
+# LLM_POOL_MAXSIZE: 每个主机保持的最大连接数
+# LLM_POOL_BLOCK: 连接用满时是否等待（true 时严格限制每主机连接数）
+LLM_POOL_CONNECTIONS = int(os.environ.get('LLM_POOL_CONNECTIONS', 4))
+LLM_POOL_MAXSIZE = int(os.environ.get('LLM_POOL_MAXSIZE', 32))
+LLM_POOL_BLOCK = os.environ.get('LLM_POOL_BLOCK', 'false').lower() in ('1', 'true', 'yes')
+LLM_TIMEOUT = float(os.environ.get('LLM_TIMEOUT', 60))
+
+# 提示词 token 预算
+# LLM_DEFAULT_CONTEXT: 模型名没有 -4k/-32k 之类后缀时假定的上下文长度
+# LLM_MODEL_CONTEXTS: 逐个指定上下文长度，如 "my-endpoint=32768,other=8192"
+# LLM_TOKENS_PER_CJK: 每个中文字符估算的 token 数（偏大更安全）
+# LLM_CONTEXT_RESERVE: 上下文中额外预留的 token 数（消息格式开销、估算误差）
+# LLM_DEFAULT_MAX_TOKENS: 调用方未指定时的输出上限
+# SEARCH_MAX_TOKENS: AI 搜索新闻的输出上限（5 条 JSON）
+# REWRITE_AUTO_DEEP: 素材放不进 lite 模型时自动改用上下文更大的 deep 模型
+LLM_DEFAULT_CONTEXT = int(os.environ.get('LLM_DEFAULT_CONTEXT', 4096))
+LLM_MODEL_CONTEXTS = {
+    name.strip(): int(tokens)
+    for name, _, tokens in (
+        entry.partition('=') for entry in os.environ.get('LLM_MODEL_CONTEXTS', '').split(',') if '=' in entry
+    )
+}
+LLM_TOKENS_PER_CJK = float(os.environ.get('LLM_TOKENS_PER_CJK', 1.0))
+LLM_CONTEXT_RESERVE = int(os.environ.get('LLM_CONTEXT_RESERVE', 64))
+LLM_DEFAULT_MAX_TOKENS = int(os.environ.get('LLM_DEFAULT_MAX_TOKENS', 4096))
+SEARCH_MAX_TOKENS = int(os.environ.get('SEARCH_MAX_TOKENS', 1536))
+REWRITE_AUTO_DEEP = os.environ.get('REWRITE_AUTO_DEEP', 'true').lower() in ('1', 'true', 'yes')
+
+# 按延迟选择模型
+# REWRITE_LATENCY_TARGET_MS: 交互式改写（/api/rewrite、/api/rewrite/stream）默认的延迟目标（毫秒），0 表示不按延迟选择；
+#   请求体中的 latencyTarget 优先。deep 模型预计达不到目标时降级为 lite
+# ROUTER_WINDOW / ROUTER_WINDOW_SECONDS: 每个模型保留最近多少次、多少秒内的调用
+# ROUTER_MIN_SAMPLES: 样本少于该数时不做判断
+# ROUTER_MAX_ERROR_RATE: 错误率超过该值的模型视为不可用
+# ROUTER_INFLIGHT_SCALE: 预计延迟 = p90 × (1 + 在途请求数 / 该值)
+REWRITE_LATENCY_TARGET_MS = float(os.environ.get('REWRITE_LATENCY_TARGET_MS', 8000))
+ROUTER_WINDOW = int(os.environ.get('ROUTER_WINDOW', 200))
+ROUTER_WINDOW_SECONDS = int(os.environ.get('ROUTER_WINDOW_SECONDS', 300))
+ROUTER_MIN_SAMPLES = int(os.environ.get('ROUTER_MIN_SAMPLES', 5))
+ROUTER_MAX_ERROR_RATE = float(os.environ.get('ROUTER_MAX_ERROR_RATE', 0.5))
+ROUTER_INFLIGHT_SCALE = float(os.environ.get('ROUTER_INFLIGHT_SCALE', 32))
+
+# 模型调用保护
+# LLM_CONNECT_TIMEOUT: 建立连接的超时秒数，服务不可达时不必等满 LLM_TIMEOUT
+# LLM_RATE_LIMIT / LLM_RATE_BURST: 每进程每秒调用数和允许的突发数（按 API 配额除以进程数设置，0 表示不限流）
+# LLM_RATE_MAX_WAIT: 等待令牌超过该秒数时直接降级
+# LLM_MAX_RETRIES: 连接失败、429、5xx 时的重试次数；LLM_RETRY_BASE / LLM_RETRY_MAX_DELAY 为退避起点和上限秒数
+# LLM_BREAKER_FAILURES: 同一模型连续失败该次数后熔断，熔断期间直接返回模拟结果
+# LLM_BREAKER_RESET: 熔断多少秒后放行一个探测请求
+LLM_CONNECT_TIMEOUT = float(os.environ.get('LLM_CONNECT_TIMEOUT', 3))
+LLM_RATE_LIMIT = float(os.environ.get('LLM_RATE_LIMIT', 0))
+LLM_RATE_BURST = int(os.environ.get('LLM_RATE_BURST', 10))
+LLM_RATE_MAX_WAIT = float(os.environ.get('LLM_RATE_MAX_WAIT', 2))
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', 2))
+LLM_RETRY_BASE = float(os.environ.get('LLM_RETRY_BASE', 0.5))
+LLM_RETRY_MAX_DELAY = float(os.environ.get('LLM_RETRY_MAX_DELAY', 8))
+LLM_BREAKER_FAILURES = int(os.environ.get('LLM_BREAKER_FAILURES', 5))
+LLM_BREAKER_RESET = float(os.environ.get('LLM_BREAKER_RESET', 30))
+
+# 请求截止时间（毫秒），到期仍未拿到模型结果时返回降级内容；请求参数 deadlineMs 可覆盖，0 表示不限
+# 模型调用、重试等待和抓取的超时都不超过剩余时间
+NEWS_DEADLINE_MS = float(os.environ.get('NEWS_DEADLINE_MS', 8000))
+REWRITE_DEADLINE_MS = float(os.environ.get('REWRITE_DEADLINE_MS', 20000))
+
+# 对冲请求（仅异步调用）：原请求超过该模型最近延迟的 LLM_HEDGE_PERCENTILE 分位数
+# （不低于 LLM_HEDGE_MIN_DELAY_MS 毫秒）仍未返回时，再发一个相同请求，取先返回的结果
+# LLM_HEDGE_MAX_RATIO: 对冲请求数占调用数的上限
+LLM_HEDGE_ENABLED = os.environ.get('LLM_HEDGE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+LLM_HEDGE_PERCENTILE = float(os.environ.get('LLM_HEDGE_PERCENTILE', 0.95))
+LLM_HEDGE_MIN_DELAY_MS = float(os.environ.get('LLM_HEDGE_MIN_DELAY_MS', 500))
+LLM_HEDGE_MAX_RATIO = float(os.environ.get('LLM_HEDGE_MAX_RATIO', 0.05))
+
+# 请求耗时分解：在响应头 Server-Timing 中列出提示词构建、模型调用、解析、降级等阶段的耗时
+SERVER_TIMING = os.environ.get('SERVER_TIMING', 'true').lower() in ('1', 'true', 'yes')
+
+# 采样分析（默认关闭）：请求期间每 PROFILE_INTERVAL_MS 毫秒采样一次调用栈，
+# 每 PROFILE_EVERY_N 个请求、或耗时超过 PROFILE_SLOW_MS 毫秒的请求，把折叠栈写入 PROFILE_DIR
+# 输出可直接交给 flamegraph.pl、speedscope 等工具生成火焰图；PROFILE_DIR 留空表示关闭
+PROFILE_DIR = os.environ.get('PROFILE_DIR', '')
+PROFILE_EVERY_N = int(os.environ.get('PROFILE_EVERY_N', 0))
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', 0))
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 10))
+
+# 前端静态文件：第一次请求时读入内存，预先生成 gzip / brotli 版本
+# STATIC_DIR: index.html 和 js/、css/ 所在目录，留空为项目根目录
+# STATIC_RELOAD: 每次请求检查文件是否修改并重新加载，本地调试前端时打开
+STATIC_DIR = os.environ.get('STATIC_DIR', '')
+STATIC_RELOAD = os.environ.get('STATIC_RELOAD', 'false').lower() in ('1', 'true', 'yes')
+
+# API 的 JSON 响应
+# JSON_ORJSON: 安装了 orjson 时用它序列化
+# COMPRESS_MIN_BYTES: 响应体超过该字节数且客户端接受时用 brotli / gzip 压缩，0 表示不压缩
+JSON_ORJSON = os.environ.get('JSON_ORJSON', 'true').lower() in ('1', 'true', 'yes')
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+
+# 异步模型调用：单进程同时在途的模型请求上限；请求线程数（GUNICORN_THREADS）限制的是在途请求数，
+# 对冲请求和后台继续的搜索也占用名额，这里应不小于请求线程数
+LLM_ASYNC_MAX_CONCURRENCY = int(os.environ.get('LLM_ASYNC_MAX_CONCURRENCY', 256))
+
+# 批量改写：进程内改写线程池大小、单次请求最大任务数（新闻 × 风格 × 格式）
+REWRITE_BATCH_WORKERS = int(os.environ.get('REWRITE_BATCH_WORKERS', 8))
+REWRITE_BATCH_MAX_TASKS = int(os.environ.get('REWRITE_BATCH_MAX_TASKS', 160))
+
+# 模拟文案有多个变体时的选择方式：first 固定用第一条；hash 按新闻标题固定选择（同一新闻结果稳定）；
+# round_robin 依次轮换
+TEMPLATE_VARIANT = os.environ.get('TEMPLATE_VARIANT', 'first').lower()
+
+# 改写结果缓存
+# REWRITE_CACHE_SIZE: 进程内 LRU 条目数
+# REWRITE_CACHE_TTL: 缓存有效期（秒）
+# REWRITE_CACHE_DB: SQLite 共享缓存文件路径，留空则只用进程内缓存
+# REWRITE_CACHE_DB_MAX_ENTRIES: SQLite 层最大条目数，超出按最近访问时间淘汰
+REWRITE_CACHE_SIZE = int(os.environ.get('REWRITE_CACHE_SIZE', 512))
+REWRITE_CACHE_TTL = int(os.environ.get('REWRITE_CACHE_TTL', 6 * 3600))
+REWRITE_CACHE_DB = os.environ.get('REWRITE_CACHE_DB', '')
+REWRITE_CACHE_DB_MAX_ENTRIES = int(os.environ.get('REWRITE_CACHE_DB_MAX_ENTRIES', 20000))
+
+# 新闻搜索结果缓存
+# NEWS_CACHE_FRESH: 新鲜期（秒），期内直接返回缓存
+# NEWS_CACHE_MAX_AGE: 最大期限（秒），超过新鲜期但未超过时先返回旧结果并后台刷新
+NEWS_CACHE_FRESH = int(os.environ.get('NEWS_CACHE_FRESH', 120))
+NEWS_CACHE_MAX_AGE = int(os.environ.get('NEWS_CACHE_MAX_AGE', 1800))
+NEWS_CACHE_SIZE = int(os.environ.get('NEWS_CACHE_SIZE', 128))
+
+# 本地数据目录（SQLite 存储、锁文件等）
+DATA_DIR = os.environ.get('DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+NEWS_STORE_DB = os.environ.get('NEWS_STORE_DB', os.path.join(DATA_DIR, 'news.db'))
+# NEWS_FEED_SIZE: 增量采集时每个新闻源保留的最新条目数
+NEWS_FEED_SIZE = int(os.environ.get('NEWS_FEED_SIZE', 50))
+
+# 后台新闻采集
+# INGEST_ENABLED: 是否在 Web 进程内启动采集调度（多进程时通过文件锁只由一个进程采集）
+# INGEST_INTERVAL: 每个新闻源的采集间隔（秒），INGEST_JITTER: 随机抖动（秒）
+# INGEST_MAX_AGE: 存储中的结果超过该时间（秒）未刷新时，/api/news 改为实时搜索
+INGEST_ENABLED = os.environ.get('INGEST_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+INGEST_INTERVAL = int(os.environ.get('INGEST_INTERVAL', 300))
+INGEST_JITTER = int(os.environ.get('INGEST_JITTER', 30))
+INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', 3))
+INGEST_MAX_AGE = int(os.environ.get('INGEST_MAX_AGE', 3 * INGEST_INTERVAL))
+INGEST_LOCK_FILE = os.environ.get('INGEST_LOCK_FILE', os.path.join(DATA_DIR, 'ingest.lock'))
+
+# 网页抓取
+# CRAWL_TIMEOUT: 单个页面请求超时（秒）
+# CRAWL_DEADLINE: 一次抓取所有新闻源的总时限（秒），超时返回已完成部分
+# CRAWL_MAX_CONCURRENCY: 同时抓取的页面数上限
+# CRAWL_PER_HOST_LIMIT: 同一主机的并发连接上限
+CRAWL_TIMEOUT = float(os.environ.get('CRAWL_TIMEOUT', 15))
+CRAWL_DEADLINE = float(os.environ.get('CRAWL_DEADLINE', 20))
+CRAWL_MAX_CONCURRENCY = int(os.environ.get('CRAWL_MAX_CONCURRENCY', 8))
+CRAWL_PER_HOST_LIMIT = int(os.environ.get('CRAWL_PER_HOST_LIMIT', 2))
+# CRAWL_CACHE_DIR: 页面缓存目录（校验头 + 压缩响应体），留空则每次完整下载
+CRAWL_CACHE_DIR = os.environ.get('CRAWL_CACHE_DIR', os.path.join(DATA_DIR, 'http_cache'))
+# CRAWL_SEEN_DIR: 已输出新闻链接的布隆过滤器目录，留空则每次输出页面上的全部新闻
+# CRAWL_SEEN_CAPACITY / CRAWL_SEEN_ERROR_RATE: 第一个分片的容量和总误判率（误判的新新闻会被当作已见过）
+CRAWL_SEEN_DIR = os.environ.get('CRAWL_SEEN_DIR', os.path.join(DATA_DIR, 'seen_urls'))
+CRAWL_SEEN_CAPACITY = int(os.environ.get('CRAWL_SEEN_CAPACITY', 100000))
+CRAWL_SEEN_ERROR_RATE = float(os.environ.get('CRAWL_SEEN_ERROR_RATE', 0.001))
+# CRAWL_ARTICLES: 采集时再抓取每条新闻的文章页，提取正文和真实发布时间
+# CRAWL_ARTICLE_MAX_BYTES: 每个文章页最多读取的字节数，同时抓取的页面数受 CRAWL_MAX_CONCURRENCY 限制，内存占用有上限
+# CRAWL_ARTICLE_MAX_CHARS: 保存的正文最大字数
+# CRAWL_ARTICLE_DEADLINE: 一批文章页的总时限（秒），超时的新闻保留列表页信息
+CRAWL_ARTICLES = os.environ.get('CRAWL_ARTICLES', 'false').lower() in ('1', 'true', 'yes')
+CRAWL_ARTICLE_MAX_BYTES = int(os.environ.get('CRAWL_ARTICLE_MAX_BYTES', 512 * 1024))
+CRAWL_ARTICLE_MAX_CHARS = int(os.environ.get('CRAWL_ARTICLE_MAX_CHARS', 3000))
+CRAWL_ARTICLE_DEADLINE = float(os.environ.get('CRAWL_ARTICLE_DEADLINE', 30))
+
+# 列表页解析进程池
+# PARSE_POOL_WORKERS: 解析子进程数，0 表示在抓取线程中直接解析
+# PARSE_POOL_MAX_TASKS_PER_CHILD: 子进程处理多少个页面后重启，回收 lxml 占用的内存
+# PARSE_POOL_MAX_PENDING: 排队等待解析的页面数上限，超过时抓取线程等待
+PARSE_POOL_WORKERS = int(os.environ.get('PARSE_POOL_WORKERS', min(4, os.cpu_count() or 1)))
+PARSE_POOL_MAX_TASKS_PER_CHILD = int(os.environ.get('PARSE_POOL_MAX_TASKS_PER_CHILD', 200))
+PARSE_POOL_MAX_PENDING = int(os.environ.get('PARSE_POOL_MAX_PENDING', 32))
+
+# 近似重复新闻检测
+# DEDUP_NGRAM: 字符 n-gram 长度
+# DEDUP_NUM_PERM / DEDUP_BANDS: MinHash 签名长度和 LSH 分段数，相似度约超过 (1/段数)^(1/每段行数) 才会成为候选
+# DEDUP_THRESHOLD: 估计的 Jaccard 相似度达到该值视为同一新闻
+# DEDUP_WINDOW / DEDUP_MAX_ENTRIES: 索引保留时间（秒）和条目上限
+DEDUP_NGRAM = int(os.environ.get('DEDUP_NGRAM', 2))
+DEDUP_NUM_PERM = int(os.environ.get('DEDUP_NUM_PERM', 64))
+DEDUP_BANDS = int(os.environ.get('DEDUP_BANDS', 16))
+DEDUP_THRESHOLD = float(os.environ.get('DEDUP_THRESHOLD', 0.5))
+DEDUP_WINDOW = int(os.environ.get('DEDUP_WINDOW', 72 * 3600))
+DEDUP_MAX_ENTRIES = int(os.environ.get('DEDUP_MAX_ENTRIES', 100000))
@@ -1,77 +1,367 @@
 # crawler.py - 直接抓取汽车新闻
 import requests
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+import contextvars
+import hashlib
+import threading
 import time
-import random
+
+from config import (
+    CRAWL_TIMEOUT, CRAWL_DEADLINE, CRAWL_MAX_CONCURRENCY, CRAWL_PER_HOST_LIMIT, CRAWL_CACHE_DIR,
+    CRAWL_SEEN_DIR, CRAWL_SEEN_CAPACITY, CRAWL_SEEN_ERROR_RATE,
+    CRAWL_ARTICLE_MAX_BYTES, CRAWL_ARTICLE_MAX_CHARS, CRAWL_ARTICLE_DEADLINE
+)
+from bloom import ScalableBloomFilter
+from deadline import remaining
+from http_cache import PageCache
+from extract import detect_encoding, extract_news_items, extract_article
+from parse_pool import parse_pool
+from metrics import CRAWL_FETCH_SECONDS, CRAWL_PARSE_SECONDS
+from timing import span
+
+# 直接抓取的URLs
+SOURCE_URLS = {
+    'autohome': ('https://www.autohome.com.cn/rank/0-0-0-0-0-0-0-0-1-0-1-0-0-1/', '汽车之家'),
+    'yiche': ('https://www.yiche.com/zixun/', '易车'),
+}
+
+# 解析逻辑变化时递增，缓存中旧版本的解析结果会被丢弃并从保存的响应体重新解析
+PARSER_VERSION = 5
+
+# 用正文开头作为摘要的字数
+ARTICLE_SUMMARY_CHARS = 120
+
 
 class NewsCrawler:
-    def __init__(self):
+    def __init__(self, max_concurrency=CRAWL_MAX_CONCURRENCY, per_host_limit=CRAWL_PER_HOST_LIMIT,
+                 deadline=CRAWL_DEADLINE, cache_dir=CRAWL_CACHE_DIR, seen_dir=CRAWL_SEEN_DIR):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
         }
-        self.timeout = 15
+        self.timeout = CRAWL_TIMEOUT
+        self.deadline = deadline
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.cache_dir = cache_dir
+        self.seen_dir = seen_dir
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=per_host_limit)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update(self.headers)
+        # 线程池、页面缓存和布隆过滤器第一次用到时才创建：导入本模块的进程（如解析子进程）不会用到它们
+        self._executor = None
+        self._page_cache = None
+        self._seen = None
+        # 新闻源 -> 上次命中的选择器下标；解析在子进程中执行，缓存只能放在本进程
+        self._winners = {}
+
+        self.article_max_bytes = CRAWL_ARTICLE_MAX_BYTES
+        self.article_max_chars = CRAWL_ARTICLE_MAX_CHARS
+        self.article_deadline = CRAWL_ARTICLE_DEADLINE
+
+        self._lock = threading.Lock()
+        self._host_slots = {}
+        self.source_stats = {}
+        self._article_stats = {'fetched': 0, 'failed': 0, 'skipped': 0, 'truncated': 0, 'bytes': 0}
+
+    @property
+    def executor(self):
+        # 所有抓取共用一个线程池和连接池；每个主机的并发由信号量限制
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='crawler')
+            return self._executor
+
+    @property
+    def page_cache(self):
+        with self._lock:
+            if self._page_cache is None and self.cache_dir:
+                self._page_cache = PageCache(self.cache_dir)
+            return self._page_cache
+
+    @property
+    def seen(self):
+        # 已输出过的新闻链接，重复抓取时只输出新出现的新闻
+        with self._lock:
+            if self._seen is None and self.seen_dir:
+                self._seen = ScalableBloomFilter(self.seen_dir, CRAWL_SEEN_CAPACITY, CRAWL_SEEN_ERROR_RATE)
+            return self._seen
+
+    def _host_slot(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return slot
+
+    def _record(self, source_id, outcome, duration, count=0):
+        """累计每个新闻源的抓取耗时和结果"""
+        with self._lock:
+            stats = self.source_stats.setdefault(source_id, {
+                'runs': 0, 'ok': 0, 'failed': 0, 'deadline': 0, 'maxMs': 0.0
+            })
+            stats['runs'] += 1
+            stats[outcome] = stats.get(outcome, 0) + 1
+            stats['lastOutcome'] = outcome
+            stats['lastMs'] = round(duration * 1000, 1)
+            stats['maxMs'] = max(stats['maxMs'], stats['lastMs'])
+            stats['lastCount'] = count
 
     def fetch_news(self, sources, hours=24):
         """获取新闻 - 直接抓取网页"""
         return self.fetch_direct(sources, hours)
 
-    def fetch_direct(self, sources, hours=24):
-        """直接抓取网页"""
-        all_news = []
+    def fetch_direct(self, sources, hours=24, deadline=None, incremental=True):
+        """并发抓取所有新闻源，超过总时限时返回已完成部分；incremental 时返回的新闻直接记为已输出"""
+        news, _ = self.fetch_with_report(sources, hours, deadline, incremental)
+        if incremental:
+            self.mark_seen(news)
+        return news
+
+    def is_new(self, items):
+        """只保留之前没有输出过的新闻（按规范化链接，没有有效链接时按 ID），同一批内重复的只留第一条。
+        这里只检查不记录：布隆过滤器无法删除，要等新闻写入存储后再调用 mark_seen，
+        否则写入失败的新闻以后再也不会输出"""
+        if self.seen is None:
+            return items
+        fresh, keys = [], set()
+        for item in items:
+            key = self._seen_key(item)
+            if key not in keys and key not in self.seen:
+                keys.add(key)
+                fresh.append(item)
+        return fresh
+
+    def mark_seen(self, items):
+        """把已经保存（或交给调用方）的新闻记为已输出"""
+        if self.seen is None:
+            return
+        for item in items:
+            self.seen.add(self._seen_key(item))
 
-        # 直接抓取的URLs
-        urls = {
-            'autohome': ('https://www.autohome.com.cn/rank/0-0-0-0-0-0-0-0-1-0-1-0-0-1/', '汽车之家'),
-            'yiche': ('https://www.yiche.com/zixun/', '易车'),
+    def _seen_key(self, item):
+        url = item.get('url') or ''
+        return url if url.startswith(('http://', 'https://')) else item['id']
+
+    def fetch_with_report(self, sources, hours=24, deadline=None, incremental=True):
+        """并发抓取，返回 (新闻列表, 每个源的耗时和结果)；incremental 时只返回新出现的新闻，
+        但不记为已输出，由调用方保存成功后调用 mark_seen。总时限不超过当前请求截止时间的剩余时间"""
+        deadline = remaining(deadline or self.deadline)
+        start = time.time()
+        expires_at = start + deadline
+
+        jobs = {
+            # 带上调用方的上下文，抓取线程里的计时能记到发起请求上
+            self.executor.submit(contextvars.copy_context().run, self._fetch_source, source_id, hours, expires_at):
+                source_id
+            for source_id in dict.fromkeys(sources) if source_id in SOURCE_URLS
         }
+        done, not_done = wait(jobs, timeout=deadline)
 
-        for source_id in sources:
-            if source_id in urls:
-                url, name = urls[source_id]
-                try:
-                    print(f"直接抓取 {name}...")
-                    resp = requests.get(url, headers=self.headers, timeout=self.timeout)
-                    resp.encoding = 'utf-8'
-
-                    soup = BeautifulSoup(resp.text, 'lxml')
-
-                    # 尝试多种选择器
-                    selectors = [
-                        '.article-item a',
-                        '.news-item a',
-                        '.list-item a',
-                        '.item a',
-                        'a[href*="article"]',
-                    ]
-
-                    links = []
-                    for sel in selectors:
-                        links = soup.select(sel)
-                        if links:
-                            break
-
-                    for idx, a in enumerate(links[:10]):
-                        title = a.get_text(strip=True)
-                        if title and len(title) > 10:
-                            all_news.append({
-                                'id': f'{source_id}_{idx}_{int(time.time())}',
-                                'title': title,
-                                'summary': f'{name}最新汽车资讯',
-                                'source': source_id,
-                                'source_name': name,
-                                'url': a.get('href', ''),
-                                'publishTime': (datetime.now() - timedelta(hours=random.randint(0, hours))).isoformat()
-                            })
-
-                    print(f"{name} 获取到 {len(all_news)} 条")
-                except Exception as e:
-                    print(f"{name} 抓取失败: {e}")
+        all_news = []
+        report = {}
+        for future in done:
+            items, entry = future.result()
+            if incremental:
+                items = self.is_new(items)
+                entry['new'] = len(items)
+            all_news.extend(items)
+            report[jobs[future]] = entry
+
+        for future in not_done:
+            # 超时的抓取仍在线程池中跑完，只是不再等待它的结果
+            source_id = jobs[future]
+            elapsed = time.time() - start
+            print(f"{SOURCE_URLS[source_id][1]} 超过总时限 {deadline}s，跳过")
+            self._record(source_id, 'deadline', elapsed)
+            report[source_id] = {'outcome': 'deadline', 'durationMs': round(elapsed * 1000, 1), 'count': 0}
 
         if all_news:
             all_news.sort(key=lambda x: x['publishTime'], reverse=True)
 
-        return all_news
+        return all_news, report
+
+    def _fetch_source(self, source_id, hours, expires_at):
+        """抓取并解析单个新闻源，返回 (新闻列表, 耗时和结果)"""
+        url, name = SOURCE_URLS[source_id]
+        start = time.time()
+        items = []
+        outcome = 'ok'
+        error = None
+        try:
+            print(f"直接抓取 {name}...")
+            slot = self._host_slot(url)
+            if not slot.acquire(timeout=max(expires_at - time.time(), 0)):
+                raise TimeoutError('等待主机连接超时')
+            try:
+                timeout = min(self.timeout, max(expires_at - time.time(), 0.1))
+                with span('crawl-fetch', source_id):
+                    items = self._load_page(url, source_id, name, hours, timeout)
+            finally:
+                slot.release()
+            print(f"{name} 获取到 {len(items)} 条")
+        except Exception as e:
+            outcome = 'failed'
+            error = str(e)
+            print(f"{name} 抓取失败: {e}")
+
+        duration = time.time() - start
+        self._record(source_id, outcome, duration, len(items))
+        CRAWL_FETCH_SECONDS.labels(source_id, outcome).observe(duration)
+        entry = {'outcome': outcome, 'durationMs': round(duration * 1000, 1), 'count': len(items)}
+        if error:
+            entry['error'] = error
+        return items, entry
+
+    def _load_page(self, url, source_id, name, hours, timeout):
+        """条件请求列表页；304 或内容哈希未变时直接复用上次的解析结果"""
+        if self.page_cache is None:
+            resp = self.session.get(url, timeout=timeout)
+            return self._parse(resp.content, url, source_id, name, hours, resp.headers.get('Content-Type'))
+
+        cached = self.page_cache.get(url)
+        headers = cached.conditional_headers() if cached else {}
+        resp = self.session.get(url, headers=headers, timeout=timeout)
+
+        if resp.status_code == 304 and cached is not None:
+            self.page_cache.record(0, saved=cached.size, not_modified=True)
+            if cached.items is not None and cached.parser == PARSER_VERSION:
+                return cached.items
+
+            # 解析逻辑更新过，用保存的响应体和当时的 Content-Type 重新解析
+            body = self.page_cache.load_body(url)
+            if body is not None:
+                items = self._parse(body, url, source_id, name, hours, cached.content_type)
+                self.page_cache.update(cached, parser=PARSER_VERSION, items=items)
+                return items
+            resp = self.session.get(url, timeout=timeout)
+
+        body = resp.content
+        content_type = resp.headers.get('Content-Type')
+        if resp.status_code != 200:
+            self.page_cache.record(len(body))
+            return self._parse(body, url, source_id, name, hours, content_type)
+
+        digest = hashlib.sha256(body).hexdigest()
+        if (cached is not None and cached.digest == digest
+                and cached.items is not None and cached.parser == PARSER_VERSION):
+            # 服务器不支持条件请求但内容没变，跳过解析
+            self.page_cache.record(len(body), unchanged=True)
+            self.page_cache.update(cached, headers=resp.headers)
+            return cached.items
+
+        self.page_cache.record(len(body))
+        items = self._parse(body, url, source_id, name, hours, content_type)
+        self.page_cache.put(url, resp.headers, body, digest, PARSER_VERSION, items)
+        return items
+
+    def fetch_articles(self, items, deadline=None):
+        """第二阶段：并发抓取新闻的文章页，写入正文、摘要和真实发布时间；超过时限的新闻保持原样"""
+        targets = [item for item in items if (item.get('url') or '').startswith(('http://', 'https://'))]
+        if not targets:
+            return items
+
+        deadline = remaining(deadline or self.article_deadline)
+        expires_at = time.time() + deadline
+        jobs = {
+            self.executor.submit(contextvars.copy_context().run, self._fetch_article, item['url'], expires_at): item
+            for item in targets
+        }
+        done, not_done = wait(jobs, timeout=deadline)
+
+        for future in done:
+            article = future.result()
+            if article is None:
+                continue
+            item = jobs[future]
+            if article['content']:
+                item['content'] = article['content']
+                item['summary'] = article['content'][:ARTICLE_SUMMARY_CHARS]
+            if article['publishTime']:
+                item['publishTime'] = article['publishTime']
+
+        if not_done:
+            print(f"{len(not_done)} 个文章页超过时限 {deadline}s，保留列表页信息")
+        return items
+
+    def _fetch_article(self, url, expires_at):
+        """抓取单个文章页，最多读取 article_max_bytes 字节；失败或超时返回 None"""
+        if time.time() >= expires_at:
+            # 批次已超时，排队中的任务直接放弃
+            self._count_article('skipped')
+            return None
+        try:
+            slot = self._host_slot(url)
+            if not slot.acquire(timeout=max(expires_at - time.time(), 0)):
+                self._count_article('skipped')
+                return None
+            try:
+                timeout = min(self.timeout, max(expires_at - time.time(), 0.1))
+                with span('article-fetch'), self.session.get(url, timeout=timeout, stream=True) as resp:
+                    content_type = resp.headers.get('Content-Type', 'text/html')
+                    if resp.status_code != 200 or 'html' not in content_type:
+                        self._count_article('failed')
+                        return None
+                    body = self._read_capped(resp)
+            finally:
+                slot.release()
+            # 解析放在释放主机连接之后
+            with span('article-parse'):
+                article = parse_pool.run(extract_article, body, self.article_max_chars,
+                                         detect_encoding(body, content_type))
+        except Exception as e:
+            print(f"文章页抓取失败 {url}: {e}")
+            self._count_article('failed')
+            return None
+
+        self._count_article('fetched', len(body))
+        return article
+
+    def _read_capped(self, resp):
+        """分块读取响应体，超过上限时截断并断开连接"""
+        chunks = []
+        size = 0
+        for chunk in resp.iter_content(chunk_size=16384):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= self.article_max_bytes:
+                self._count_article('truncated')
+                break
+        return b''.join(chunks)[:self.article_max_bytes]
+
+    def _count_article(self, outcome, size=0):
+        with self._lock:
+            self._article_stats[outcome] += 1
+            self._article_stats['bytes'] += size
+
+    def _parse(self, html, url, source_id, name, hours, content_type=None):
+        """从列表页提取新闻链接（交给解析进程池执行）；编码取自 Content-Type，没有时看 <meta charset>"""
+        start = time.time()
+        try:
+            with span('crawl-parse', source_id):
+                items, selector = parse_pool.run(extract_news_items, html, source_id, name, hours, url,
+                                                 self._winners.get(source_id), detect_encoding(html, content_type))
+            if selector is not None:
+                self._winners[source_id] = selector
+            return items
+        finally:
+            CRAWL_PARSE_SECONDS.labels(source_id).observe(time.time() - start)
+
+    def stats(self):
+        with self._lock:
+            return {source_id: dict(stats) for source_id, stats in self.source_stats.items()}
+
+    def article_stats(self):
+        with self._lock:
+            return dict(self._article_stats)
+
+    def seen_stats(self):
+        return self.seen.stats() if self.seen is not None else None
 
 # 创建全局实例
 crawler = NewsCrawler()
@@ -0,0 +1,60 @@
+# deadline.py - 请求截止时间：沿调用链传递剩余时间，模型调用和抓取按剩余时间设置超时
+import contextvars
+import time
+from contextlib import contextmanager
+
+_current = contextvars.ContextVar('deadline', default=None)
+
+
+class Deadline:
+    """从创建时起 seconds 秒后到期"""
+
+    def __init__(self, seconds):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def timeout(self, cap=None):
+        """剩余秒数，不超过 cap"""
+        remaining = self.remaining()
+        return remaining if cap is None else min(cap, remaining)
+
+
+def current_deadline():
+    return _current.get()
+
+
+def remaining(cap=None):
+    """当前截止时间的剩余秒数（不超过 cap）；没有截止时间时返回 cap"""
+    deadline = _current.get()
+    return cap if deadline is None else deadline.timeout(cap)
+
+
+@contextmanager
+def deadline_scope(deadline):
+    """在 with 块内设置截止时间（Deadline 或秒数，None 表示不限）；
+    外层已有更早的截止时间时沿用外层的。asyncio 任务和共享事件循环上的协程会继承该设置"""
+    if isinstance(deadline, (int, float)):
+        deadline = Deadline(deadline)
+    outer = _current.get()
+    if deadline is None or (outer is not None and outer.expires_at <= deadline.expires_at):
+        deadline = outer
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def request_deadline(value, default_ms):
+    """请求参数中的 deadlineMs（毫秒），没有时用默认值；返回 Deadline，0 或负数表示不限"""
+    try:
+        ms = float(value if value is not None else default_ms or 0)
+    except (TypeError, ValueError):
+        ms = float(default_ms or 0)
+    return Deadline(ms / 1000) if ms > 0 else None
@@ -0,0 +1,208 @@
+# dedup.py - 跨新闻源的近似重复新闻检测（字符 n-gram + MinHash + LSH 分桶）
+import hashlib
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from config import (
+    DEDUP_NGRAM, DEDUP_NUM_PERM, DEDUP_BANDS, DEDUP_THRESHOLD, DEDUP_WINDOW, DEDUP_MAX_ENTRIES
+)
+
+# 去掉标点、空白和下划线，只保留中文、字母和数字
+_NOISE = re.compile(r'[\W_]+')
+# 车型名、价格等关键词：字母数字串，带字母的连同紧挨着的前一个汉字（秦L、汉L），纯数字单独成词（7.98）
+_KEY_TOKEN = re.compile(r'([\u4e00-\u9fff]?)([a-z0-9](?:[a-z0-9.\-]*[a-z0-9])?)')
+_CJK_SPACE = re.compile(r'(?<=[\u4e00-\u9fff])\s+(?=[a-z0-9])')
+
+_PRIME = (1 << 61) - 1
+
+
+def normalize(text):
+    return _NOISE.sub('', (text or '').lower())
+
+
+def shingles(text, n=DEDUP_NGRAM):
+    """字符 n-gram 集合；中文没有空格分词，按字切分对改写过的标题最稳定"""
+    text = normalize(text)
+    if len(text) <= n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def key_tokens(text):
+    """标题中的车型名和数字；同一车系不同车型、不同售价的标题字面很像，只靠相似度会被误合并"""
+    text = _CJK_SPACE.sub('', (text or '').lower())
+    tokens = set()
+    for prefix, token in _KEY_TOKEN.findall(text):
+        has_letter = any('a' <= c <= 'z' for c in token)
+        tokens.add(prefix + token if has_letter else token)
+    return frozenset(tokens)
+
+
+def compatible(keys_a, keys_b):
+    """一方的关键词都出现在另一方中才算同一新闻：转载可以省略售价，但不能是另一个车型或另一个价格"""
+    return keys_a <= keys_b or keys_b <= keys_a
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class MinHasher:
+    """用 num_perm 个 (a*x+b) mod p 哈希函数模拟随机排列；种子固定，各进程签名一致"""
+
+    def __init__(self, num_perm=DEDUP_NUM_PERM, seed=1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.params = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+    def signature(self, tokens):
+        if not tokens:
+            return None
+        hashes = [_hash64(t) for t in tokens]
+        return tuple(
+            min((a * h + b) % _PRIME for h in hashes)
+            for a, b in self.params
+        )
+
+
+def similarity(sig_a, sig_b):
+    """两个签名相同位置相等的比例，即 Jaccard 相似度的估计值"""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+class StoryIndex:
+    """把近似重复的新闻归到同一个簇，簇 ID 为最先出现的那条新闻的 ID。
+    签名切成 bands 段分桶，只和同桶的候选比较，查询代价与索引规模无关；
+    相似度达到阈值后还要求两者的车型名和数字一致（见 compatible）"""
+
+    def __init__(self, num_perm=DEDUP_NUM_PERM, bands=DEDUP_BANDS, threshold=DEDUP_THRESHOLD,
+                 window=DEDUP_WINDOW, max_entries=DEDUP_MAX_ENTRIES):
+        if num_perm % bands:
+            raise ValueError('DEDUP_NUM_PERM 必须是 DEDUP_BANDS 的整数倍')
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.window = window
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # 簇 ID -> (签名, 最后出现时间, 关键词)，按最后出现时间排序
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self.lookups = 0
+        self.duplicates = 0
+        self.candidates = 0
+
+    def _text(self, item):
+        # 只比较标题：列表页抓到的新闻摘要是“{来源}最新汽车资讯”占位文字，和 AI 搜索的真实摘要放在一起
+        # 会拉低同一新闻的相似度，同一来源的不同新闻反而因为共同的占位文字变得相似
+        return item.get('title') or ''
+
+    def _band_keys(self, sig):
+        r = self.rows
+        return [(i, sig[i * r:(i + 1) * r]) for i in range(self.bands)]
+
+    def _evict(self, now):
+        while self._entries:
+            cluster, (sig, seen_at, _) = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_entries and now - seen_at < self.window:
+                break
+            del self._entries[cluster]
+            for key in self._band_keys(sig):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(cluster)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def assign(self, items):
+        """给每条新闻写入 cluster 字段并返回列表；没有近似重复的新闻自成一簇"""
+        now = time.time()
+        with self._lock:
+            for item in items:
+                text = self._text(item)
+                sig = self.hasher.signature(shingles(text))
+                self.lookups += 1
+                if sig is None:
+                    item['cluster'] = item.get('id')
+                    continue
+
+                keys = self._band_keys(sig)
+                candidates = set()
+                for key in keys:
+                    candidates.update(self._buckets.get(key, ()))
+                self.candidates += len(candidates)
+
+                names = key_tokens(text)
+                best, best_score = None, self.threshold
+                for cluster in candidates:
+                    entry_sig, _, entry_names = self._entries[cluster]
+                    score = similarity(sig, entry_sig)
+                    if score >= best_score and compatible(names, entry_names):
+                        best, best_score = cluster, score
+
+                if best is not None:
+                    self.duplicates += 1
+                    item['cluster'] = best
+                    entry_sig, _, entry_names = self._entries[best]
+                    self._entries[best] = (entry_sig, now, entry_names)
+                    self._entries.move_to_end(best)
+                    continue
+
+                cluster = item.get('id') or f'story_{sig[0]:x}'
+                item['cluster'] = cluster
+                self._entries[cluster] = (sig, now, names)
+                self._entries.move_to_end(cluster)
+                for key in keys:
+                    self._buckets.setdefault(key, set()).add(cluster)
+
+            self._evict(now)
+        return items
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'buckets': len(self._buckets),
+                'lookups': self.lookups,
+                'duplicates': self.duplicates,
+                'avgCandidates': round(self.candidates / self.lookups, 2) if self.lookups else 0,
+                'threshold': self.threshold,
+                'bands': self.bands,
+                'rows': self.rows
+            }
+
+
+def merge_clusters(items):
+    """同一簇只保留一条（优先簇 ID 对应的原始条目），其余来源放到 alternates 中；保持原有顺序"""
+    groups = OrderedDict()
+    for item in items:
+        groups.setdefault(item.get('cluster') or item.get('id'), []).append(item)
+
+    merged = []
+    for cluster, group in groups.items():
+        canonical = next((item for item in group if item.get('id') == cluster), group[0])
+        canonical = dict(canonical)
+        seen = {canonical.get('url')}
+        alternates = []
+        for item in group:
+            if item.get('url') not in seen:
+                seen.add(item.get('url'))
+                alternates.append({
+                    'id': item.get('id'),
+                    'source': item.get('source'),
+                    'source_name': item.get('source_name'),
+                    'title': item.get('title'),
+                    'url': item.get('url')
+                })
+        if alternates:
+            canonical['alternates'] = alternates
+        merged.append(canonical)
+    return merged
+
+
+# 创建全局实例
+story_index = StoryIndex()
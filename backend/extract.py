@@ -0,0 +1,291 @@
+# extract.py - 列表页链接提取（预编译 XPath + 只解析上次命中的选择器相关的片段）
+import codecs
+import hashlib
+import random
+import re
+import threading
+from datetime import datetime, timedelta
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+
+from lxml import etree
+
+
+_CHARSET = re.compile(rb'''<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)''', re.IGNORECASE)
+# 只在页面开头找 <meta charset>，与浏览器的预扫描一致（放宽到 4KB）
+CHARSET_SCAN_BYTES = 4096
+# GBK / GB2312 页面按 GB18030 解码：它是两者的超集，个别站点声明 gb2312 却用了 GBK 字符
+_CHARSET_ALIASES = {'gb2312': 'gb18030', 'gbk': 'gb18030', 'x-gbk': 'gb18030'}
+
+
+def _normalize_charset(name):
+    name = (name or '').strip().strip('"\'').lower()
+    if not name:
+        return None
+    name = _CHARSET_ALIASES.get(name, name)
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+
+def detect_encoding(html, content_type=None):
+    """页面编码：优先取 Content-Type 的 charset，其次是页面开头的 <meta charset>，都没有时按 UTF-8"""
+    if content_type:
+        for param in content_type.split(';')[1:]:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'charset':
+                encoding = _normalize_charset(value)
+                if encoding:
+                    return encoding
+    if isinstance(html, bytes):
+        match = _CHARSET.search(html, 0, CHARSET_SCAN_BYTES)
+        if match:
+            encoding = _normalize_charset(match.group(1).decode('ascii', 'ignore'))
+            if encoding:
+                return encoding
+    return 'utf-8'
+
+
+def _class_xpath(class_name):
+    return f"//*[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]//a"
+
+
+def _class_marker(class_name):
+    """匹配 class 属性中含有该类名（完整的一个类名）的开始标签，group(1) 为标签名"""
+    return re.compile(
+        rb'''<([a-zA-Z][\w-]*)[^>]*?\sclass\s*=\s*["'](?:[^"']*\s)?'''
+        + re.escape(class_name.encode('ascii')) + rb'''(?:\s[^"']*)?["']'''
+    )
+
+
+class Selector:
+    """一条候选选择器：原 CSS 写法、预编译 XPath，以及用于定位片段的类名和开始标签正则"""
+
+    def __init__(self, css, xpath, class_name=None):
+        self.css = css
+        self.xpath = etree.XPath(xpath)
+        self.class_name = class_name.encode('ascii') if class_name else None
+        self.marker = _class_marker(class_name) if class_name else None
+
+
+# 与原 BeautifulSoup 版本相同的候选顺序
+SELECTORS = [
+    Selector('.article-item a', _class_xpath('article-item'), 'article-item'),
+    Selector('.news-item a', _class_xpath('news-item'), 'news-item'),
+    Selector('.list-item a', _class_xpath('list-item'), 'list-item'),
+    Selector('.item a', _class_xpath('item'), 'item'),
+    Selector('a[href*="article"]', "//a[contains(@href, 'article')]"),
+]
+
+
+def _find_marked(html, selector, reverse=False):
+    """第一个（reverse 时最后一个）class 中含该类名的开始标签；先按字节查找类名，
+    再确认它在某个标签的 class 属性里（排除 news-item 之于 item、脚本里的同名字符串等）"""
+    name = selector.class_name
+    idx = html.rfind(name) if reverse else html.find(name)
+    while idx != -1:
+        start = html.rfind(b'<', 0, idx)
+        if start != -1:
+            match = selector.marker.match(html, start)
+            if match:
+                return match
+        idx = html.rfind(name, 0, idx) if reverse else html.find(name, idx + 1)
+    return None
+
+
+def _element_end(html, pos, tag):
+    """从开始标签之后的 pos 起找到与之配对的结束标签（计入同名标签的嵌套），返回结束标签之后的位置"""
+    depth = 1
+    pattern = re.compile(rb'<(/?)' + re.escape(tag) + rb'[\s/>]', re.IGNORECASE)
+    for match in pattern.finditer(html, pos):
+        depth += -1 if match.group(1) else 1
+        if depth == 0:
+            close = html.find(b'>', match.end() - 1)
+            return -1 if close == -1 else close + 1
+    return -1
+
+
+class LinkExtractor:
+    """按候选选择器提取链接。本身不保存状态：在解析子进程中执行时，各子进程（以及重启后的子进程）
+    无法共享缓存，所以由调用方记住每个源命中的选择器下标，下次作为 preferred 传入"""
+
+    def __init__(self, selectors=SELECTORS):
+        self.selectors = selectors
+        self._local = threading.local()
+
+    def _parser(self, encoding='utf-8'):
+        # lxml 解析器不能跨线程共用；每种编码一个
+        parsers = getattr(self._local, 'parsers', None)
+        if parsers is None:
+            parsers = self._local.parsers = {}
+        parser = parsers.get(encoding)
+        if parser is None:
+            parser = parsers[encoding] = etree.HTMLParser(
+                encoding=encoding, remove_comments=True, remove_pis=True, no_network=True
+            )
+        return parser
+
+    def _order(self, preferred):
+        if preferred is None or not 0 <= preferred < len(self.selectors):
+            return list(range(len(self.selectors)))
+        return [preferred] + [i for i in range(len(self.selectors)) if i != preferred]
+
+    def _fragment(self, html, selector):
+        """截取从第一个到最后一个带该类名的元素（含其结束标签）的片段，跳过页头、导航和脚本；
+        找不到最后一个元素的结束标签时返回 None，改为解析整个页面"""
+        first = _find_marked(html, selector)
+        if first is None:
+            return None
+        last = _find_marked(html, selector, reverse=True)
+        end = _element_end(html, last.end(), last.group(1))
+        if end == -1:
+            return None
+        return html[first.start():end]
+
+    def _select(self, html, selector, encoding):
+        root = etree.fromstring(html, self._parser(encoding))
+        if root is None:
+            return []
+        return selector.xpath(root)
+
+    def extract(self, html, preferred=None, limit=10, encoding=None):
+        """返回 ([(标题, 链接)], 命中的选择器下标)，标题为空白去除后的锚文本；都没命中时下标为 None。
+        encoding 为页面编码（见 detect_encoding），缺省时从 <meta charset> 判断"""
+        if isinstance(html, str):
+            html, encoding = html.encode('utf-8'), 'utf-8'
+        # 片段里没有 <meta charset>，编码必须显式传给解析器
+        encoding = encoding or detect_encoding(html)
+
+        full_root = None
+        for idx in self._order(preferred):
+            selector = self.selectors[idx]
+            links = []
+
+            # 上次命中的选择器先只解析相关片段
+            if selector.class_name and idx == preferred:
+                fragment = self._fragment(html, selector)
+                if fragment is not None:
+                    links = self._select(fragment, selector, encoding)
+
+            if not links:
+                if full_root is None:
+                    full_root = etree.fromstring(html, self._parser(encoding))
+                    if full_root is None:
+                        return [], None
+                links = selector.xpath(full_root)
+
+            if links:
+                return [
+                    (''.join(t.strip() for t in a.itertext()), a.get('href', ''))
+                    for a in links[:limit]
+                ], idx
+        return [], None
+
+
+# 创建全局实例
+link_extractor = LinkExtractor()
+
+# 不影响页面内容的跟踪参数
+TRACKING_PARAMS = {'spm', 'from', 'share', 'share_from', 'ref', 'timestamp', 'pvareaid'}
+
+
+def normalize_url(url, base_url=None):
+    """补全相对链接，协议和主机转小写，去掉锚点、跟踪参数并排序查询参数"""
+    if base_url:
+        url = urljoin(base_url, url)
+    parts = urlsplit(url.strip())
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith('utm_')
+    )
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', urlencode(query), ''))
+
+
+def news_id(source_id, key):
+    """由来源和规范化链接（没有链接时用标题）生成稳定 ID，重复抓取同一条新闻 ID 不变"""
+    return f"{source_id}_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}"
+
+
+def extract_news_items(html, source_id, name, hours, base_url=None, preferred=None, encoding=None):
+    """从列表页提取新闻条目（可在解析进程池中执行），返回 (条目字典列表, 命中的选择器下标)"""
+    news = []
+    links, selector = link_extractor.extract(html, preferred, encoding=encoding)
+    for title, href in links:
+        if title and len(title) > 10:
+            url = normalize_url(href, base_url) if href else ''
+            news.append({
+                'id': news_id(source_id, url or title),
+                'title': title,
+                'summary': f'{name}最新汽车资讯',
+                'source': source_id,
+                'source_name': name,
+                'url': url,
+                'publishTime': (datetime.now() - timedelta(hours=random.randint(0, hours))).isoformat()
+            })
+    return news, selector
+
+
+# 正文提取时整体跳过的标签
+_BOILERPLATE = ('script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside', 'form', 'iframe')
+_PARAGRAPHS = etree.XPath('//p')
+_PUBLISH_META = etree.XPath(
+    "//meta[@property='article:published_time' or @name='pubdate' or @name='publishdate'"
+    " or @itemprop='datePublished' or @name='weibo:article:create_at']/@content"
+    " | //time/@datetime"
+)
+_DATE_TEXT = re.compile(
+    r'(20\d{2})[-/年.](\d{1,2})[-/月.](\d{1,2})日?(?:\s*(\d{1,2}):(\d{2})(?::(\d{2}))?)?'
+)
+
+
+def _parse_publish_time(value):
+    value = (value or '').strip()
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None).isoformat()
+    except ValueError:
+        pass
+    match = _DATE_TEXT.search(value)
+    if not match:
+        return None
+    year, month, day, hour, minute, second = (int(g) if g else 0 for g in match.groups())
+    try:
+        return datetime(year, month, day, hour, minute, second).isoformat()
+    except ValueError:
+        return None
+
+
+def extract_article(html, max_chars=3000, encoding=None):
+    """从文章页提取正文和发布时间，返回 {'content': 正文, 'publishTime': ISO 时间或 None}。
+    正文取 <p> 文字最多的那个父节点下的段落，去掉导航、页脚、脚本等"""
+    if isinstance(html, str):
+        html, encoding = html.encode('utf-8'), 'utf-8'
+    root = etree.fromstring(html, link_extractor._parser(encoding or detect_encoding(html)))
+    if root is None:
+        return {'content': '', 'publishTime': None}
+
+    publish_time = None
+    for value in _PUBLISH_META(root):
+        publish_time = _parse_publish_time(value)
+        if publish_time:
+            break
+
+    # 删除导航、脚本等节点，保留节点后面的文字
+    etree.strip_elements(root, *_BOILERPLATE, with_tail=False)
+
+    scores = {}
+    for p in _PARAGRAPHS(root):
+        parent = p.getparent()
+        if parent is not None:
+            scores[parent] = scores.get(parent, 0) + len(''.join(p.itertext()).strip())
+
+    content = ''
+    if scores:
+        best = max(scores, key=scores.get)
+        paragraphs = (''.join(p.itertext()).strip() for p in best.iterfind('p'))
+        content = '\n'.join(text for text in paragraphs if len(text) >= 10)[:max_chars]
+
+    if publish_time is None:
+        # 没有元数据时从页面文字里找第一个日期，通常在标题下方
+        publish_time = _parse_publish_time(''.join(root.itertext())[:5000])
+
+    return {'content': content, 'publishTime': publish_time}
@@ -0,0 +1,29 @@
+# gunicorn.conf.py - gunicorn 部署配置（在 backend 目录启动时自动加载）
+import os
+
+# 异步部署模式：gthread 工作进程 + 进程内共享的 asyncio 模型调用循环
+# 每个在途请求占用一个线程阻塞等待共享事件循环上的结果，threads 即单进程的在途请求上限
+# 设置 GUNICORN_WORKER_CLASS=sync 可回到每进程一个请求的同步模式
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 128))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Prometheus 多进程模式：各 worker 把指标写到同一目录，/metrics 汇总后输出
+# 必须在 worker 导入 prometheus_client 之前设置，启动时清空上次运行留下的文件
+from config import DATA_DIR
+
+prometheus_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(DATA_DIR, 'prometheus'))
+
+
+def on_starting(server):
+    os.makedirs(prometheus_dir, exist_ok=True)
+    for name in os.listdir(prometheus_dir):
+        if name.endswith('.db'):
+            os.remove(os.path.join(prometheus_dir, name))
+
+
+def child_exit(server, worker):
+    from metrics import mark_process_dead
+    mark_process_dead(worker.pid)
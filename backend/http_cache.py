@@ -0,0 +1,140 @@
+# http_cache.py - 抓取页面缓存（ETag / Last-Modified 校验 + 压缩保存上次响应）
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+
+class CachedPage:
+    """某个URL上一次抓取的校验信息和解析结果"""
+
+    def __init__(self, url, etag=None, last_modified=None, digest=None, size=0,
+                 parser=None, items=None, content_type=None):
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.content_type = content_type
+        self.size = size
+        self.parser = parser
+        self.items = items
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def to_dict(self):
+        return {
+            'url': self.url,
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'digest': self.digest,
+            'content_type': self.content_type,
+            'size': self.size,
+            'parser': self.parser,
+            'items': self.items
+        }
+
+
+class PageCache:
+    """按URL保存校验头、内容类型、内容哈希、gzip 压缩的响应体和解析结果"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._pages = {}
+        self.requests = 0
+        self.not_modified = 0
+        self.unchanged = 0
+        self.bytes_downloaded = 0
+        self.bytes_saved = 0
+
+    def _path(self, url, suffix):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + suffix)
+
+    def get(self, url):
+        with self._lock:
+            page = self._pages.get(url)
+        if page is not None:
+            return page
+
+        try:
+            with open(self._path(url, '.json'), 'r', encoding='utf-8') as f:
+                page = CachedPage(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+        with self._lock:
+            self._pages[url] = page
+        return page
+
+    def load_body(self, url):
+        """读取上次保存的响应体"""
+        try:
+            with gzip.open(self._path(url, '.html.gz'), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, url, headers, body, digest, parser, items):
+        """保存新的响应"""
+        page = CachedPage(
+            url,
+            etag=headers.get('ETag'),
+            last_modified=headers.get('Last-Modified'),
+            digest=digest,
+            content_type=headers.get('Content-Type'),
+            size=len(body),
+            parser=parser,
+            items=items
+        )
+        os.makedirs(self.directory, exist_ok=True)
+        self._write(self._path(url, '.html.gz'), gzip.compress(body))
+        self._write(self._path(url, '.json'), json.dumps(page.to_dict(), ensure_ascii=False).encode('utf-8'))
+        with self._lock:
+            self._pages[url] = page
+        return page
+
+    def update(self, page, headers=None, parser=None, items=None):
+        """内容未变时更新校验头或解析结果"""
+        if headers is not None:
+            page.etag = headers.get('ETag') or page.etag
+            page.last_modified = headers.get('Last-Modified') or page.last_modified
+            page.content_type = headers.get('Content-Type') or page.content_type
+        if items is not None:
+            page.parser = parser
+            page.items = items
+        self._write(self._path(page.url, '.json'), json.dumps(page.to_dict(), ensure_ascii=False).encode('utf-8'))
+
+    def _write(self, path, data):
+        # 先写临时文件再替换，避免读到写了一半的文件
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def record(self, downloaded, saved=0, not_modified=False, unchanged=False):
+        with self._lock:
+            self.requests += 1
+            self.bytes_downloaded += downloaded
+            self.bytes_saved += saved
+            if not_modified:
+                self.not_modified += 1
+            if unchanged:
+                self.unchanged += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'notModified': self.not_modified,
+                'unchanged': self.unchanged,
+                'bytesDownloaded': self.bytes_downloaded,
+                'bytesSaved': self.bytes_saved
+            }
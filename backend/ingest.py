@@ -0,0 +1,15 @@
+# ingest.py - 独立的新闻采集进程入口
+# 用法: cd backend && python ingest.py          # 按 INGEST_INTERVAL 持续采集
+#       cd backend && python ingest.py --once   # 采集一轮后退出
+import sys
+
+if __name__ == '__main__':
+    # 放在入口判断里：解析子进程重新导入本脚本时不会加载 app
+    from app import ingest_scheduler
+
+    if '--once' in sys.argv:
+        # INGEST_ENABLED 时导入 app 已启动了本进程的调度线程，先停掉，采集锁由 run_once 持有
+        ingest_scheduler.stop(wait=True)
+        sys.exit(0 if ingest_scheduler.run_once() else 1)
+    else:
+        ingest_scheduler.run_forever()
@@ -0,0 +1,82 @@
+# json_response.py - API 的 JSON 响应：UTF-8 直出不转义中文，可选 orjson 序列化，超过阈值按 Accept-Encoding 压缩
+import json
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+from compression import choose_encoding, compress
+from config import JSON_ORJSON, COMPRESS_MIN_BYTES
+from timing import span
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 日期、dataclass 交给 Flask 的默认处理，输出与标准库编码一致
+_ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+                   | orjson.OPT_PASSTHROUGH_SUBCLASS) if orjson is not None else 0
+COMPRESS_MIMETYPES = ('application/json',)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify 使用的编码器：中文按 UTF-8 原样输出（\\uXXXX 转义会让中文体积变成约 2 倍），
+    安装了 orjson 时用它序列化"""
+
+    ensure_ascii = False
+
+    def __init__(self, app, use_orjson=JSON_ORJSON):
+        super().__init__(app)
+        self.use_orjson = use_orjson and orjson is not None
+        if self.use_orjson:
+            self._orjson_options = _ORJSON_OPTIONS | (orjson.OPT_SORT_KEYS if self.sort_keys else 0)
+
+    def _dumps_bytes(self, obj):
+        if self.use_orjson:
+            try:
+                return orjson.dumps(obj, default=self.default, option=self._orjson_options)
+            except TypeError:
+                # 超过 64 位的整数等 orjson 不支持的值，退回标准库
+                pass
+        return json.dumps(obj, default=self.default, ensure_ascii=False, sort_keys=self.sort_keys,
+                          separators=(',', ':')).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if kwargs or not self.use_orjson:
+            return super().dumps(obj, **kwargs)
+        return self._dumps_bytes(obj).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        """调试模式下保留 Flask 的缩进输出；否则直接生成 bytes，省去 str 的来回转换"""
+        if self._app.debug:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
+
+
+def install(app):
+    """替换 jsonify 的编码器，并压缩较大的 /api/* JSON 响应；流式响应（SSE、NDJSON）不处理"""
+    app.json = FastJSONProvider(app)
+
+    @app.after_request
+    def _compress_json(response):
+        if (COMPRESS_MIN_BYTES <= 0 or not request.path.startswith('/api/')
+                or response.direct_passthrough or response.is_streamed
+                or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESS_MIMETYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        body = response.get_data()
+        if len(body) < COMPRESS_MIN_BYTES:
+            return response
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+
+        with span('compress', encoding):
+            data = compress(body, encoding)
+        response.set_data(data)
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,350 @@
+# llm_client.py - 火山引擎LLM客户端（连接池 + keep-alive）
+import functools
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from config import (
+    VOLCENGINE_ACCESS_KEY, VOLCENGINE_ENDPOINT, VOLCENGINE_SCHEME,
+    VOLCENGINE_MODEL_SEARCH, VOLCENGINE_MODEL_DEEP,
+    LLM_POOL_CONNECTIONS, LLM_POOL_MAXSIZE, LLM_POOL_BLOCK, LLM_TIMEOUT, LLM_DEFAULT_MAX_TOKENS,
+    LLM_CONNECT_TIMEOUT, LLM_MAX_RETRIES, LLM_RATE_MAX_WAIT
+)
+from prompt_budget import output_budget
+from model_router import model_router
+from deadline import current_deadline
+from timing import span
+from resilience import CallRejected, RETRYABLE_STATUSES, get_breaker, rate_limiter, retry_delay
+
+
+class PoolStats:
+    """连接池统计：借出次数、新建连接数、等待时间"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.new_connections = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_checkout(self, wait):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            if wait > self.wait_max:
+                self.wait_max = wait
+
+    def record_new_connection(self):
+        with self._lock:
+            self.new_connections += 1
+
+    def snapshot(self):
+        with self._lock:
+            checkouts = self.checkouts
+            new_connections = self.new_connections
+            wait_total = self.wait_total
+            wait_max = self.wait_max
+
+        reused = max(checkouts - new_connections, 0)
+        return {
+            'requests': checkouts,
+            'new_connections': new_connections,
+            'reuse_ratio': round(reused / checkouts, 4) if checkouts else 0.0,
+            'wait_avg_ms': round(wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+            'wait_max_ms': round(wait_max * 1000, 3)
+        }
+
+
+class _TimedPoolMixin:
+    """记录连接借出等待时间和新建连接次数"""
+
+    def __init__(self, *args, stats=None, **kwargs):
+        self.stats = stats
+        super().__init__(*args, **kwargs)
+
+    def _get_conn(self, timeout=None):
+        start = time.perf_counter()
+        conn = super()._get_conn(timeout)
+        if self.stats:
+            self.stats.record_checkout(time.perf_counter() - start)
+        return conn
+
+    def _new_conn(self):
+        if self.stats:
+            self.stats.record_new_connection()
+        return super()._new_conn()
+
+
+class TimedHTTPConnectionPool(_TimedPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class TimedHTTPSConnectionPool(_TimedPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class PooledAdapter(HTTPAdapter):
+    """使用带统计的连接池类"""
+
+    def __init__(self, stats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': functools.partial(TimedHTTPConnectionPool, stats=self.stats),
+            'https': functools.partial(TimedHTTPSConnectionPool, stats=self.stats)
+        }
+
+
+class LLMClient:
+    """进程内共享的火山引擎客户端，复用TCP/TLS连接"""
+
+    def __init__(self, endpoint=VOLCENGINE_ENDPOINT, api_key=VOLCENGINE_ACCESS_KEY,
+                 pool_connections=LLM_POOL_CONNECTIONS, pool_maxsize=LLM_POOL_MAXSIZE,
+                 pool_block=LLM_POOL_BLOCK, timeout=LLM_TIMEOUT):
+        self.url = f"{VOLCENGINE_SCHEME}://{endpoint}/api/v3/chat/completions"
+        self.api_key = api_key
+        self.timeout = timeout
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.stats = PoolStats()
+        self.pid = os.getpid()
+
+        adapter = PooledAdapter(
+            self.stats,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=0
+        )
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'Authorization': f'Bearer {api_key}',
+            'Connection': 'keep-alive'
+        })
+
+    def chat(self, payload, timeout=None, stream=False):
+        """发送 chat/completions 请求，返回 requests.Response；连接超时单独设置，服务不可达时尽快失败"""
+        return self.session.post(
+            self.url, json=payload, timeout=(LLM_CONNECT_TIMEOUT, timeout or self.timeout), stream=stream
+        )
+
+    def pool_stats(self):
+        """连接池统计"""
+        stats = self.stats.snapshot()
+        stats.update({
+            'pid': self.pid,
+            'pool_connections': self.pool_connections,
+            'pool_maxsize': self.pool_maxsize,
+            'pool_block': self.pool_block
+        })
+        return stats
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """获取当前进程的共享客户端（gunicorn fork 后按 pid 重建）"""
+    global _client
+    client = _client
+    if client is not None and client.pid == os.getpid():
+        return client
+
+    with _client_lock:
+        if _client is None or _client.pid != os.getpid():
+            _client = LLMClient()
+        return _client
+
+
+def resolve_model(model):
+    """lite/deep 映射到具体模型名"""
+    if model == 'deep':
+        return VOLCENGINE_MODEL_DEEP
+    return VOLCENGINE_MODEL_SEARCH
+
+
+def build_payload(prompt, model_name, max_tokens=None):
+    """构建 chat/completions 请求体；输出上限不超过模型上下文扣掉提示词后剩余的部分"""
+    return {
+        'model': model_name,
+        'messages': [
+            {'role': 'user', 'content': prompt}
+        ],
+        'max_tokens': output_budget(prompt, model_name, max_tokens or LLM_DEFAULT_MAX_TOKENS),
+        'temperature': 0.8
+    }
+
+
+def extract_content(data):
+    """从响应JSON中取出生成文本"""
+    if 'choices' in data and len(data['choices']) > 0:
+        return data['choices'][0]['message']['content']
+    elif 'content' in data:
+        return data['content']
+    return None
+
+
+def send_with_retries(payload, model_name, stream=False, deadline=None):
+    """经过熔断器和限流发送请求，连接失败和可重试状态码按退避重试；有截止时间时按剩余时间设超时。
+    返回最后一次的响应（成功或不可重试的错误），熔断打开、超出配额或已到截止时间时抛出 CallRejected"""
+    breaker = get_breaker(model_name)
+    if deadline is not None and deadline.expired():
+        raise CallRejected('已到请求截止时间')
+    if not breaker.allow():
+        raise CallRejected(f'模型 {model_name} 熔断中')
+
+    client = get_llm_client()
+    response = None
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        max_wait = deadline.timeout(LLM_RATE_MAX_WAIT) if deadline else LLM_RATE_MAX_WAIT
+        delay = rate_limiter.reserve(max_wait)
+        if delay is None:
+            breaker.release()
+            raise CallRejected('超出模型调用配额')
+        if delay:
+            time.sleep(delay)
+
+        timeout = deadline.timeout(client.timeout) if deadline else client.timeout
+        try:
+            response = client.chat(payload, timeout=max(timeout, 0.01), stream=stream)
+        except requests.ReadTimeout:
+            if timeout < client.timeout:
+                # 截止时间缩短了超时，不代表服务故障
+                breaker.release()
+            else:
+                # 读超时说明请求已在处理，重试只会加倍等待
+                breaker.record_failure('读取超时')
+            raise
+        except requests.ConnectionError as e:
+            reason = f'连接失败: {type(e).__name__}'
+            response = None
+        except Exception as e:
+            breaker.record_failure(type(e).__name__)
+            raise
+        else:
+            if response.ok:
+                breaker.record_success()
+                return response
+            if response.status_code not in RETRYABLE_STATUSES:
+                # 请求本身有问题，不代表服务故障
+                breaker.release()
+                return response
+            reason = f'HTTP {response.status_code}'
+
+        if attempt < LLM_MAX_RETRIES:
+            wait = retry_delay(attempt, response.headers.get('Retry-After') if response is not None else None)
+            if deadline is not None and wait >= deadline.remaining():
+                break
+            if response is not None:
+                response.close()
+            print(f"火山引擎{reason}，{wait:.2f}s 后重试")
+            time.sleep(wait)
+
+    breaker.record_failure(reason)
+    if response is None:
+        raise requests.ConnectionError(reason)
+    return response
+
+
+def call_volcano_api(prompt, model='lite', max_tokens=None, deadline=None):
+    """调用火山引擎API；deadline 默认取当前请求的截止时间"""
+    if not VOLCENGINE_ACCESS_KEY:
+        print("错误: 未配置 VOLCENGINE_ACCESS_KEY 环境变量")
+        return None
+
+    model_name = resolve_model(model)
+
+    print(f"调用火山引擎 - 模型: {model_name}")
+
+    payload = build_payload(prompt, model_name, max_tokens)
+
+    with model_router.track(model_name) as call:
+        try:
+            with span('llm', model_name):
+                response = send_with_retries(payload, model_name, deadline=deadline or current_deadline())
+
+            if response.ok:
+                with span('llm-parse'):
+                    data = response.json()
+                    content = extract_content(data)
+                print("火山引擎响应成功")
+                call['ok'] = True
+                return content
+            else:
+                print(f"火山引擎API错误: {response.status_code} - {response.text}")
+                return None
+        except CallRejected as e:
+            # 没有发出请求，不计入模型延迟统计
+            call['skip'] = True
+            print(f"{e}，直接降级")
+            return None
+        except Exception as e:
+            print(f"调用火山引擎出错: {e}")
+            return None
+
+
+def stream_volcano_api(prompt, model='lite', max_tokens=None, deadline=None):
+    """流式调用火山引擎API，逐段产出生成文本；生成器被关闭时断开上游连接。
+    截止时间的剩余时间用作读取超时，限制的是首个响应和每两段输出之间的等待，不限制总时长"""
+    if not VOLCENGINE_ACCESS_KEY:
+        print("错误: 未配置 VOLCENGINE_ACCESS_KEY 环境变量")
+        return
+
+    model_name = resolve_model(model)
+
+    print(f"调用火山引擎(stream) - 模型: {model_name}")
+
+    payload = build_payload(prompt, model_name, max_tokens)
+    payload['stream'] = True
+
+    with model_router.track(model_name) as call:
+        try:
+            # 流式调用只计到收到响应头，生成过程由调用方计时
+            with span('llm-ttfb', model_name):
+                response = send_with_retries(payload, model_name, stream=True, deadline=deadline or current_deadline())
+        except CallRejected as e:
+            call['skip'] = True
+            print(f"{e}，直接降级")
+            return
+        try:
+            if not response.ok:
+                print(f"火山引擎API错误: {response.status_code} - {response.text}")
+                return
+
+            for line in response.iter_lines():
+                if not line.startswith(b'data:'):
+                    continue
+                chunk = line[5:].strip()
+                if chunk == b'[DONE]':
+                    break
+
+                data = json.loads(chunk)
+                choices = data.get('choices') or []
+                if choices:
+                    content = (choices[0].get('delta') or {}).get('content')
+                    if content:
+                        yield content
+            call['ok'] = True
+        except GeneratorExit:
+            # 客户端中途断开，不计入模型延迟统计
+            call['skip'] = True
+            raise
+        finally:
+            # 客户端断开时这里会被执行，关闭响应即中断上游生成
+            response.close()
@@ -0,0 +1,94 @@
+# metrics.py - Prometheus 指标；多个 gunicorn 进程通过 PROMETHEUS_MULTIPROC_DIR 目录汇总
+import os
+import time
+
+from flask import g, request
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+except ImportError:
+    prometheus_client = None
+
+
+class _NoopMetric:
+    """未安装 prometheus_client 时的占位，调用方不必判断"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def observe(self, value):
+        pass
+
+
+if prometheus_client is not None:
+    LLM_REQUEST_SECONDS = Histogram(
+        'llm_request_duration_seconds', '模型调用耗时（含重试），outcome 为 ok / error / skipped',
+        ['model', 'outcome'], buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+    )
+    # 多进程时各 worker 的在途数相加，已退出进程的值不计入
+    LLM_IN_FLIGHT = Gauge('llm_requests_in_flight', '在途模型调用数', ['model'], multiprocess_mode='livesum')
+    MOCK_FALLBACKS = Counter('mock_fallbacks_total', '降级为模拟数据的次数', ['kind'])
+    HTTP_REQUEST_SECONDS = Histogram(
+        'http_request_duration_seconds', '/api 请求耗时（流式响应只计到开始输出）',
+        ['method', 'route', 'status'], buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+    )
+    CRAWL_FETCH_SECONDS = Histogram(
+        'crawl_fetch_duration_seconds', '抓取单个新闻源列表页的总耗时（下载 + 解析）',
+        ['source', 'outcome'], buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20)
+    )
+    CRAWL_PARSE_SECONDS = Histogram(
+        'crawl_parse_duration_seconds', '解析单个列表页的耗时（含进程池排队）',
+        ['source'], buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+    )
+    CACHE_LOOKUPS = Counter('cache_lookups_total', '缓存查询次数，按结果分类', ['cache', 'result'])
+else:
+    LLM_REQUEST_SECONDS = LLM_IN_FLIGHT = MOCK_FALLBACKS = HTTP_REQUEST_SECONDS = _NoopMetric()
+    CRAWL_FETCH_SECONDS = CRAWL_PARSE_SECONDS = CACHE_LOOKUPS = _NoopMetric()
+
+
+def multiprocess_dir():
+    return os.environ.get('PROMETHEUS_MULTIPROC_DIR') or os.environ.get('prometheus_multiproc_dir')
+
+
+def render():
+    """返回 (响应体, Content-Type)；多进程模式下汇总目录中所有进程写入的指标"""
+    if prometheus_client is None:
+        return None, None
+    if multiprocess_dir():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    """gunicorn worker 退出后清理它的 gauge 文件"""
+    if prometheus_client is not None and multiprocess_dir():
+        multiprocess.mark_process_dead(pid)
+
+
+def install(app):
+    """为 /api/* 请求记录耗时"""
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        start = g.pop('metrics_start', None)
+        if start is not None and request.path.startswith('/api/'):
+            # 用路由模板而不是实际路径作标签，避免标签数无限增长
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            HTTP_REQUEST_SECONDS.labels(request.method, route, str(response.status_code)).observe(
+                time.perf_counter() - start
+            )
+        return response
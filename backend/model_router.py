@@ -0,0 +1,153 @@
+# model_router.py - 按延迟选择模型（滚动延迟分位数、错误率、在途请求数）
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from config import (
+    ROUTER_WINDOW, ROUTER_WINDOW_SECONDS, ROUTER_MIN_SAMPLES, ROUTER_MAX_ERROR_RATE, ROUTER_INFLIGHT_SCALE
+)
+from resilience import get_breaker
+from metrics import LLM_IN_FLIGHT, LLM_REQUEST_SECONDS
+
+
+class ModelStats:
+    """单个模型最近 window 次调用（且不超过 window_seconds 秒）的延迟和结果"""
+
+    def __init__(self, window=ROUTER_WINDOW, window_seconds=ROUTER_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self.samples = deque(maxlen=window)
+        self.in_flight = 0
+        self.calls = 0
+        self.errors = 0
+
+    def _recent(self, now):
+        while self.samples and now - self.samples[0][0] > self.window_seconds:
+            self.samples.popleft()
+        return self.samples
+
+    def record(self, latency_ms, ok, now):
+        self.samples.append((now, latency_ms, ok))
+        self.calls += 1
+        if not ok:
+            self.errors += 1
+
+    def snapshot(self, now):
+        samples = self._recent(now)
+        latencies = sorted(latency for _, latency, ok in samples if ok)
+        failed = sum(1 for _, _, ok in samples if not ok)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(int(len(latencies) * p), len(latencies) - 1)], 1)
+
+        return {
+            'samples': len(samples),
+            'p50Ms': percentile(0.5),
+            'p90Ms': percentile(0.9),
+            'p99Ms': percentile(0.99),
+            'errorRate': round(failed / len(samples), 3) if samples else 0.0,
+            'inFlight': self.in_flight,
+            'calls': self.calls,
+            'errors': self.errors
+        }
+
+
+class ModelRouter:
+    """记录每个模型的调用情况，按延迟目标选择模型：
+    预计延迟 = p90 ×（1 + 在途请求数 / inflight_scale），样本不足时视为能满足目标"""
+
+    def __init__(self, min_samples=ROUTER_MIN_SAMPLES, max_error_rate=ROUTER_MAX_ERROR_RATE,
+                 inflight_scale=ROUTER_INFLIGHT_SCALE):
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.inflight_scale = inflight_scale
+        self._lock = threading.Lock()
+        self._models = {}
+
+    def _stats(self, model_name):
+        stats = self._models.get(model_name)
+        if stats is None:
+            stats = self._models[model_name] = ModelStats()
+        return stats
+
+    @contextmanager
+    def track(self, model_name):
+        """包住一次模型调用；调用方成功时设置 call['ok'] = True，
+        调用被客户端中途取消时设置 call['skip'] = True（不计入延迟和错误率）"""
+        call = {'ok': False, 'skip': False}
+        with self._lock:
+            self._stats(model_name).in_flight += 1
+        LLM_IN_FLIGHT.labels(model_name).inc()
+        start = time.time()
+        try:
+            yield call
+        finally:
+            now = time.time()
+            with self._lock:
+                stats = self._stats(model_name)
+                stats.in_flight -= 1
+                if not call['skip']:
+                    stats.record((now - start) * 1000, call['ok'], now)
+            LLM_IN_FLIGHT.labels(model_name).dec()
+            outcome = 'skipped' if call['skip'] else 'ok' if call['ok'] else 'error'
+            LLM_REQUEST_SECONDS.labels(model_name, outcome).observe(now - start)
+
+    def estimate(self, model_name):
+        """返回 (预计延迟毫秒或 None, 是否健康)"""
+        if get_breaker(model_name).is_open():
+            return None, False
+        with self._lock:
+            snapshot = self._stats(model_name).snapshot(time.time())
+        if snapshot['samples'] < self.min_samples:
+            return None, True
+        healthy = snapshot['errorRate'] <= self.max_error_rate
+        if snapshot['p90Ms'] is None:
+            return None, healthy
+        return snapshot['p90Ms'] * (1 + snapshot['inFlight'] / self.inflight_scale), healthy
+
+    def latency_percentile(self, model_name, p):
+        """最近成功调用延迟的 p 分位数（毫秒），样本不足时返回 None"""
+        now = time.time()
+        with self._lock:
+            samples = self._stats(model_name)._recent(now)
+            latencies = sorted(latency for _, latency, ok in samples if ok)
+        if len(latencies) < self.min_samples:
+            return None
+        return latencies[min(int(len(latencies) * p), len(latencies) - 1)]
+
+    def choose(self, preferred, alternative, target_ms=None):
+        """在首选模型和备选模型（模型名）之间选择，返回 (模型名, 决策说明)"""
+        decision = {'requested': preferred, 'targetMs': target_ms}
+        estimate, healthy = self.estimate(preferred)
+        decision['estimatedMs'] = round(estimate, 1) if estimate is not None else None
+
+        if target_ms is None or preferred == alternative:
+            decision['reason'] = 'requested'
+            return preferred, decision
+        if healthy and (estimate is None or estimate <= target_ms):
+            decision['reason'] = 'within_target'
+            return preferred, decision
+
+        alt_estimate, alt_healthy = self.estimate(alternative)
+        alt_ok = alt_healthy and (alt_estimate is None or alt_estimate <= target_ms)
+        if alt_ok or (alt_healthy and not healthy) or (
+                alt_estimate is not None and estimate is not None and alt_estimate < estimate):
+            decision['reason'] = 'unhealthy' if not healthy else 'over_target'
+            decision['requestedEstimatedMs'] = decision['estimatedMs']
+            decision['estimatedMs'] = round(alt_estimate, 1) if alt_estimate is not None else None
+            return alternative, decision
+
+        # 两个模型都达不到目标，保留首选
+        decision['reason'] = 'best_effort'
+        return preferred, decision
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            return {name: stats.snapshot(now) for name, stats in self._models.items()}
+
+
+# 创建全局实例
+model_router = ModelRouter()
@@ -0,0 +1,135 @@
+# news_cache.py - 新闻搜索结果缓存（stale-while-revalidate + 合并并发请求）
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from config import NEWS_CACHE_FRESH, NEWS_CACHE_MAX_AGE, NEWS_CACHE_SIZE
+from metrics import CACHE_LOOKUPS
+
+
+def news_cache_key(sources, time_range):
+    """按去重排序后的新闻源和时间范围生成缓存键"""
+    return (tuple(sorted(set(sources))), int(time_range))
+
+
+class NewsCache:
+    """新鲜期内直接返回；过期未超过最大期限时先返回旧结果并后台刷新；
+    同一个键同时只有一个上游请求，其余请求等待同一个结果"""
+
+    def __init__(self, fresh_for=NEWS_CACHE_FRESH, max_age=NEWS_CACHE_MAX_AGE,
+                 max_entries=NEWS_CACHE_SIZE):
+        self.fresh_for = fresh_for
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._inflight = {}
+        # loader 返回的 Future 可能已经完成，回调会在持锁时同步执行，所以用可重入锁
+        self._lock = threading.RLock()
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.collapsed = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.timeouts = 0
+
+    def _start(self, key, loader):
+        """启动（或复用进行中的）上游请求，返回结果为 (value, fetched_at) 的 Future"""
+        future = self._inflight.get(key)
+        if future is not None:
+            self.collapsed += 1
+            return future
+
+        future = Future()
+        self._inflight[key] = future
+        self.refreshes += 1
+        try:
+            loader().add_done_callback(lambda f: self._on_done(key, future, f))
+        except Exception as e:
+            self._on_done_error(key, future, e)
+        return future
+
+    def _on_done(self, key, future, loader_future):
+        try:
+            value, cacheable = loader_future.result()
+        except Exception as e:
+            self._on_done_error(key, future, e)
+            return
+
+        fetched_at = time.time()
+        with self._lock:
+            self._inflight.pop(key, None)
+            if cacheable:
+                self._entries[key] = (value, fetched_at)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        future.set_result((value, fetched_at))
+
+    def _on_done_error(self, key, future, error):
+        print(f"新闻缓存刷新失败 {key}: {error}")
+        with self._lock:
+            self._inflight.pop(key, None)
+            self.refresh_errors += 1
+        future.set_exception(error)
+
+    def lookup(self, key, loader):
+        """返回 (Future, 状态)，状态为 fresh / stale / miss
+
+        loader 是无参函数，返回一个结果为 (value, cacheable) 的 concurrent.futures.Future。
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, fetched_at = entry
+                age = time.time() - fetched_at
+                if age < self.max_age:
+                    self._entries.move_to_end(key)
+                    if age < self.fresh_for:
+                        self.fresh_hits += 1
+                        state = 'fresh'
+                    else:
+                        self.stale_hits += 1
+                        state = 'stale'
+                        self._start(key, loader)
+                    CACHE_LOOKUPS.labels('news', state).inc()
+                    done = Future()
+                    done.set_result((value, fetched_at))
+                    return done, state
+
+            self.misses += 1
+            CACHE_LOOKUPS.labels('news', 'miss').inc()
+            return self._start(key, loader), 'miss'
+
+    def get(self, key, loader, timeout=None):
+        """获取缓存，返回 (value, 状态, fetched_at)；timeout 秒内没有结果时抛出 TimeoutError，
+        上游请求不会被取消，完成后照常写入缓存"""
+        future, state = self.lookup(key, loader)
+        try:
+            value, fetched_at = future.result(timeout)
+        except TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise
+        return value, state, fetched_at
+
+    def stats(self):
+        with self._lock:
+            return {
+                'fresh_hits': self.fresh_hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'collapsed': self.collapsed,
+                'refreshes': self.refreshes,
+                'refresh_errors': self.refresh_errors,
+                'timeouts': self.timeouts,
+                'entries': len(self._entries),
+                'inflight': len(self._inflight),
+                'fresh_for': self.fresh_for,
+                'max_age': self.max_age
+            }
+
+
+# 创建全局实例
+news_cache = NewsCache()
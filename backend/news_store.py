@@ -0,0 +1,253 @@
+# news_store.py - 本地新闻存储（SQLite，多进程共享）
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config import NEWS_STORE_DB, NEWS_FEED_SIZE
+
+
+# FTS5 trigram 分词按任意三个连续字符建索引，中文无需分词；更短的关键词退回 LIKE
+FTS_MIN_TERM = 3
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS feeds (
+        source TEXT PRIMARY KEY,
+        items TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        refreshed_at REAL NOT NULL
+    );
+    -- 显式整数主键作为全文索引的 rowid，VACUUM 后不会变化
+    CREATE TABLE IF NOT EXISTS items (
+        id INTEGER PRIMARY KEY,
+        key TEXT NOT NULL UNIQUE,
+        source TEXT NOT NULL,
+        title TEXT NOT NULL,
+        summary TEXT NOT NULL,
+        publish_time TEXT NOT NULL,
+        data TEXT NOT NULL,
+        ingested_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_items_time ON items (publish_time);
+    CREATE INDEX IF NOT EXISTS idx_items_source_time ON items (source, publish_time);
+'''
+
+# 外部内容表：全文索引只存分词，由触发器与 items 保持同步
+FTS_SCHEMA = (
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+        title, summary, content='items', content_rowid='id', tokenize='trigram'
+    )''',
+    '''CREATE TRIGGER IF NOT EXISTS items_ai AFTER INSERT ON items BEGIN
+        INSERT INTO items_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS items_ad AFTER DELETE ON items BEGIN
+        INSERT INTO items_fts (items_fts, rowid, title, summary)
+        VALUES ('delete', old.id, old.title, old.summary);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS items_au AFTER UPDATE OF title, summary ON items BEGIN
+        INSERT INTO items_fts (items_fts, rowid, title, summary)
+        VALUES ('delete', old.id, old.title, old.summary);
+        INSERT INTO items_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary);
+    END''',
+)
+FTS_TRIGGERS = ('items_ai', 'items_ad', 'items_au')
+
+
+def item_key(item):
+    """新闻的存储主键：有链接时按链接，否则按来源 + 标题"""
+    url = item.get('url')
+    if url and url != '#':
+        basis = url
+    else:
+        basis = f"{item.get('source')}|{item.get('title')}"
+    return hashlib.sha1(basis.encode('utf-8')).hexdigest()
+
+
+def encode_cursor(publish_time, rowid):
+    raw = json.dumps([publish_time, rowid], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        publish_time, rowid = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(publish_time), int(rowid)
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError('cursor 无效')
+
+
+class NewsStore:
+    """按新闻源保存最近一次采集结果，供 /api/news 直接读取；
+    所有采集过的新闻另存一份明细，带全文索引，供历史检索"""
+
+    def __init__(self, path=NEWS_STORE_DB):
+        self.path = path
+        self._local = threading.local()
+        # 建表每个进程只做一次；fts 为 False 时全文索引不可用，检索全部走 LIKE
+        self._migrate_lock = threading.Lock()
+        self._migrated = False
+        self.fts = False
+
+    def _conn(self):
+        # 每个线程一个连接；fork 后不能沿用父进程的连接
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        with self._migrate_lock:
+            if not self._migrated:
+                self._migrate(conn)
+                self._migrated = True
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _migrate(self, conn):
+        """建表；全文索引单独建，SQLite 没有 FTS5 或早于 3.34（不支持 trigram）时退回 LIKE 检索，
+        新闻列表的读写不受影响"""
+        conn.executescript(SCHEMA)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            synced = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'items_ai'"
+            ).fetchone()
+            for statement in FTS_SCHEMA:
+                conn.execute(statement)
+            # 表已存在时 CREATE 不会报错，查询一次确认本机的 SQLite 能打开它
+            conn.execute('SELECT rowid FROM items_fts LIMIT 0').fetchall()
+            if not synced:
+                # 新建或触发器曾被删除：按明细表重建索引
+                conn.execute("INSERT INTO items_fts (items_fts) VALUES ('rebuild')")
+            conn.execute('COMMIT')
+            self.fts = True
+        except sqlite3.OperationalError as e:
+            conn.execute('ROLLBACK')
+            print(f"全文索引不可用（SQLite {sqlite3.sqlite_version}）: {e}，历史检索改用 LIKE")
+            # 其他版本的 SQLite 建的触发器在这里无法执行，会让写入明细表失败；
+            # 删掉后由下次能建索引的进程重建
+            for trigger in FTS_TRIGGERS:
+                conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+            self.fts = False
+
+    def _upsert_items(self, conn, source, items, now):
+        """把新闻写入明细表；已存在的新闻只在标题或摘要变化时更新，首次入库的发布时间和 ID 保持不变"""
+        conn.executemany(
+            '''INSERT INTO items (key, source, title, summary, publish_time, data, ingested_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (key) DO UPDATE SET
+                   title = excluded.title, summary = excluded.summary, data = excluded.data
+               WHERE title != excluded.title OR summary != excluded.summary''',
+            [
+                (item_key(item), item.get('source') or source, item.get('title') or '',
+                 item.get('summary') or '', item.get('publishTime') or '',
+                 json.dumps(item, ensure_ascii=False), now)
+                for item in items
+            ]
+        )
+
+    def _write_feed(self, source, update):
+        """在一个写事务中读取旧列表、由 update 计算新列表并保存"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT items FROM feeds WHERE source = ?', (source,)).fetchone()
+            feed, new_items = update(json.loads(row[0]) if row else [])
+            conn.execute(
+                'INSERT OR REPLACE INTO feeds (source, items, count, refreshed_at) VALUES (?, ?, ?, ?)',
+                (source, json.dumps(feed, ensure_ascii=False), len(feed), now)
+            )
+            self._upsert_items(conn, source, new_items, now)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def save_feed(self, source, items):
+        """覆盖保存某个新闻源的最新列表，同时把每条新闻写入明细表"""
+        self._write_feed(source, lambda old: (items, items))
+
+    def append_feed(self, source, items, limit=NEWS_FEED_SIZE):
+        """增量采集：新条目放到列表前面，保留最新的 limit 条；没有新条目时只刷新时间"""
+        def update(old):
+            ids = {item.get('id') for item in items}
+            return (items + [item for item in old if item.get('id') not in ids])[:limit], items
+        self._write_feed(source, update)
+
+    def load_feeds(self, sources):
+        """读取多个新闻源的列表，返回 {source: (items, refreshed_at)}，没有数据的源不出现在结果中"""
+        if not sources:
+            return {}
+        placeholders = ','.join('?' * len(sources))
+        rows = self._conn().execute(
+            f'SELECT source, items, refreshed_at FROM feeds WHERE source IN ({placeholders})',
+            list(sources)
+        ).fetchall()
+        return {source: (json.loads(items), refreshed_at) for source, items, refreshed_at in rows}
+
+    def search(self, query=None, since=None, sources=None, limit=20, cursor=None):
+        """按关键词、起始时间和新闻源检索历史新闻，按发布时间倒序；
+        返回 (新闻列表, 下一页 cursor)，没有更多结果时 cursor 为 None"""
+        conn = self._conn()
+        where = []
+        params = []
+
+        terms = (query or '').split()
+        # 全文索引不可用时所有关键词都按 LIKE 匹配
+        long_terms = [t for t in terms if len(t) >= FTS_MIN_TERM] if self.fts else []
+        if long_terms:
+            match = ' '.join('"' + t.replace('"', '""') + '"' for t in long_terms)
+            where.append('id IN (SELECT rowid FROM items_fts WHERE items_fts MATCH ?)')
+            params.append(match)
+        for term in terms:
+            if term not in long_terms:
+                pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+                where.append("(title LIKE ? ESCAPE '\\' OR summary LIKE ? ESCAPE '\\')")
+                params.extend([pattern, pattern])
+
+        if since:
+            where.append('publish_time >= ?')
+            params.append(since)
+        if sources:
+            where.append(f"source IN ({','.join('?' * len(sources))})")
+            params.extend(sources)
+        if cursor:
+            # 键集分页：从上一页最后一条之后继续，翻页代价与页码无关
+            publish_time, rowid = decode_cursor(cursor)
+            where.append('(publish_time < ? OR (publish_time = ? AND id < ?))')
+            params.extend([publish_time, publish_time, rowid])
+
+        sql = 'SELECT id, publish_time, data FROM items'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY publish_time DESC, id DESC LIMIT ?'
+        params.append(limit + 1)
+
+        rows = conn.execute(sql, params).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+        return [json.loads(data) for _, _, data in rows], next_cursor
+
+    def item_count(self):
+        return self._conn().execute('SELECT COUNT(*) FROM items').fetchone()[0]
+
+    def feed_status(self):
+        """各新闻源的条目数和最后刷新时间"""
+        rows = self._conn().execute('SELECT source, count, refreshed_at FROM feeds').fetchall()
+        return {source: {'count': count, 'refreshedAt': refreshed_at} for source, count, refreshed_at in rows}
+
+
+# 创建全局实例
+news_store = NewsStore()
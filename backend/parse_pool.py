@@ -0,0 +1,97 @@
+# parse_pool.py - HTML 解析进程池（解析不占用 Web 进程的 GIL）
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config import PARSE_POOL_WORKERS, PARSE_POOL_MAX_TASKS_PER_CHILD, PARSE_POOL_MAX_PENDING
+
+
+class ParsePool:
+    """把页面字节交给子进程解析，只取回提取出的条目；排队任务数有上限，满了调用方等待"""
+
+    def __init__(self, workers=PARSE_POOL_WORKERS, max_tasks_per_child=PARSE_POOL_MAX_TASKS_PER_CHILD,
+                 max_pending=PARSE_POOL_MAX_PENDING):
+        self.workers = workers
+        self.max_tasks_per_child = max_tasks_per_child or None
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.submitted = 0
+        self.inline = 0
+        self.rejected = 0
+        self.restarts = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # max_tasks_per_child 不支持 fork，使用 spawn 启动子进程
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    max_tasks_per_child=self.max_tasks_per_child
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def _reset(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self.restarts += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, fn, *args, timeout=None):
+        """在子进程中执行 fn(*args)；未启用进程池或进程池损坏时在当前线程执行"""
+        if self.workers <= 0:
+            with self._lock:
+                self.inline += 1
+            return fn(*args)
+
+        # 背压：排队中的任务达到上限时等待空位
+        if not self._slots.acquire(timeout=timeout):
+            with self._lock:
+                self.rejected += 1
+            raise TimeoutError('解析队列已满')
+
+        executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except (BrokenProcessPool, RuntimeError):
+            self._slots.release()
+            self._reset(executor)
+            with self._lock:
+                self.inline += 1
+            return fn(*args)
+
+        future.add_done_callback(lambda f: self._slots.release())
+        with self._lock:
+            self.submitted += 1
+
+        try:
+            return future.result(timeout)
+        except BrokenProcessPool:
+            print("解析进程异常退出，改为本进程解析")
+            self._reset(executor)
+            with self._lock:
+                self.inline += 1
+            return fn(*args)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'maxTasksPerChild': self.max_tasks_per_child,
+                'maxPending': self.max_pending,
+                'submitted': self.submitted,
+                'inline': self.inline,
+                'rejected': self.rejected,
+                'restarts': self.restarts
+            }
+
+
+# 创建全局实例
+parse_pool = ParsePool()
@@ -0,0 +1,77 @@
+# prompt_budget.py - 提示词 token 预算（估算中文 token、按模型上下文截断素材、限制输出长度）
+import math
+import re
+
+from config import LLM_DEFAULT_CONTEXT, LLM_MODEL_CONTEXTS, LLM_TOKENS_PER_CJK, LLM_CONTEXT_RESERVE
+
+# 中日韩文字和全角标点
+_CJK = re.compile(r'[　-〿㐀-鿿豈-﫿＀-￯]')
+# 模型名中的上下文长度后缀，如 doubao-lite-4k、doubao-pro-32k
+_CONTEXT_SUFFIX = re.compile(r'-(\d+)k(?![a-z])', re.I)
+_SENTENCE_END = re.compile(r'[。！？!?；;\n]')
+_BLANK = re.compile(r'[ \t　]+')
+
+
+def estimate_tokens(text):
+    """估算 token 数：中文按每字 LLM_TOKENS_PER_CJK 个，其余字符按 4 个一个；宁多勿少"""
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    return math.ceil(cjk * LLM_TOKENS_PER_CJK + (len(text) - cjk) / 4)
+
+
+def model_context(model_name):
+    """模型上下文长度：LLM_MODEL_CONTEXTS 配置优先，其次取模型名后缀，都没有时用默认值"""
+    if model_name in LLM_MODEL_CONTEXTS:
+        return LLM_MODEL_CONTEXTS[model_name]
+    match = _CONTEXT_SUFFIX.search(model_name or '')
+    if match:
+        return int(match.group(1)) * 1024
+    return LLM_DEFAULT_CONTEXT
+
+
+def output_budget(prompt, model_name, requested):
+    """输出上限不超过 requested，也不超过上下文扣掉提示词后剩下的部分"""
+    room = model_context(model_name) - estimate_tokens(prompt) - LLM_CONTEXT_RESERVE
+    return max(min(requested, room), 1)
+
+
+def source_budget(model_name, overhead, max_tokens):
+    """给素材留的 token 数：上下文扣掉提示词其余部分和输出上限"""
+    return max(model_context(model_name) - overhead - max_tokens - LLM_CONTEXT_RESERVE, 0)
+
+
+def compress_text(text):
+    """压缩素材：合并空白、去掉空行和重复的行（正文里常见的重复图注、版权声明）"""
+    lines = []
+    seen = set()
+    for line in (text or '').splitlines():
+        line = _BLANK.sub(' ', line).strip()
+        if line and line not in seen:
+            seen.add(line)
+            lines.append(line)
+    return '\n'.join(lines)
+
+
+def truncate_to_tokens(text, budget):
+    """截断到 budget 个 token 以内，尽量在句末断开；未超出时原样返回"""
+    if estimate_tokens(text) <= budget:
+        return text
+    if budget <= 0:
+        return ''
+
+    # 二分查找能放下的最长前缀
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) + 1 <= budget:
+            low = mid
+        else:
+            high = mid - 1
+    cut = text[:low]
+
+    # 末尾 20% 内有句号就在句号处断开
+    ends = [m.end() for m in _SENTENCE_END.finditer(cut)]
+    if ends and ends[-1] >= len(cut) * 0.8:
+        cut = cut[:ends[-1]]
+    return cut.rstrip() + '…'
@@ -0,0 +1,216 @@
+# resilience.py - 模型调用保护：令牌桶限流、退避重试、熔断器
+import random
+import threading
+import time
+from collections import deque
+
+from config import (
+    LLM_RATE_LIMIT, LLM_RATE_BURST, LLM_RATE_MAX_WAIT, LLM_RETRY_BASE, LLM_RETRY_MAX_DELAY,
+    LLM_BREAKER_FAILURES, LLM_BREAKER_RESET, LLM_HEDGE_MAX_RATIO
+)
+
+
+class CallRejected(Exception):
+    """熔断打开或超出调用配额，本次调用没有发出"""
+
+
+# 只有这些状态码和网络错误值得重试，其余 4xx 重试也不会成功
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """令牌桶：每秒补充 rate 个令牌，最多积攒 burst 个；rate <= 0 表示不限流"""
+
+    def __init__(self, rate=LLM_RATE_LIMIT, burst=LLM_RATE_BURST):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.granted = 0
+        self.rejected = 0
+
+    def reserve(self, max_wait=LLM_RATE_MAX_WAIT):
+        """预订一个令牌，返回需要等待的秒数；需要等待超过 max_wait 时不预订，返回 None"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # 令牌可以预支为负数，排在后面的调用等待更久
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if wait > max_wait:
+                self.rejected += 1
+                return None
+            self._tokens -= 1
+            self.granted += 1
+            return wait
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rate': self.rate,
+                'burst': self.burst,
+                'tokens': round(self._tokens, 2),
+                'granted': self.granted,
+                'rejected': self.rejected
+            }
+
+
+def retry_delay(attempt, retry_after=None):
+    """第 attempt 次重试前的等待秒数：指数退避 + 全抖动；服务端给了 Retry-After 时以它为准"""
+    if retry_after:
+        try:
+            return min(float(retry_after), LLM_RETRY_MAX_DELAY)
+        except ValueError:
+            pass
+    return random.uniform(0, min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """连续失败 failure_threshold 次后打开，期间直接拒绝调用；
+    reset_timeout 秒后进入半开状态放行一个探测请求，成功则关闭，失败则重新打开"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=LLM_BREAKER_FAILURES, reset_timeout=LLM_BREAKER_RESET):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.rejected = 0
+        self.transitions = deque(maxlen=20)
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _transition(self, state, reason):
+        self.transitions.append({'at': time.time(), 'from': self.state, 'to': state, 'reason': reason})
+        print(f"熔断器 {self.name}: {self.state} -> {state} ({reason})")
+        self.state = state
+
+    def allow(self):
+        """是否放行本次调用；打开状态下直接返回 False"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self._transition(self.HALF_OPEN, '等待期结束，放行探测请求')
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    self.rejected += 1
+                    return False
+                self._probing = True
+            return True
+
+    def is_open(self):
+        """是否处于熔断等待期（不改变状态）"""
+        with self._lock:
+            return self.state == self.OPEN and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            if self.state != self.CLOSED:
+                self._transition(self.CLOSED, '探测请求成功')
+
+    def record_failure(self, reason):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or (
+                    self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self._transition(self.OPEN, reason)
+
+    def release(self):
+        """调用既没成功也不算失败（如被限流、客户端取消）时归还探测名额"""
+        with self._lock:
+            self._probing = False
+
+    def stats(self):
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = round(max(self.reset_timeout - (time.monotonic() - self.opened_at), 0), 1)
+            return {
+                'state': self.state,
+                'consecutiveFailures': self.failures,
+                'rejected': self.rejected,
+                'retryInSeconds': retry_in,
+                'transitions': list(self.transitions)
+            }
+
+
+class HedgeBudget:
+    """对冲请求配额：每次模型调用积攒 max_ratio 个额度（最多 burst 个），每个对冲请求消耗 1 个，
+    对冲请求数因此不超过调用数的 max_ratio，上游变慢时也不会把流量翻倍"""
+
+    def __init__(self, max_ratio=LLM_HEDGE_MAX_RATIO, burst=10):
+        self.max_ratio = max_ratio
+        self.burst = burst
+        self._credits = 0.0
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0
+        self.denied = 0
+        self.wins = 0
+
+    def record_call(self):
+        with self._lock:
+            self.calls += 1
+            self._credits = min(self.burst, self._credits + self.max_ratio)
+
+    def try_acquire(self):
+        with self._lock:
+            if self._credits < 1:
+                self.denied += 1
+                return False
+            self._credits -= 1
+            self.hedged += 1
+            return True
+
+    def record_win(self):
+        """对冲请求先于原请求返回"""
+        with self._lock:
+            self.wins += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'maxRatio': self.max_ratio,
+                'calls': self.calls,
+                'hedged': self.hedged,
+                'denied': self.denied,
+                'wins': self.wins
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(model_name):
+    """每个模型一个熔断器"""
+    with _breakers_lock:
+        breaker = _breakers.get(model_name)
+        if breaker is None:
+            breaker = _breakers[model_name] = CircuitBreaker(model_name)
+        return breaker
+
+
+def breaker_stats():
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
+
+
+# 创建全局实例（按 API 配额限流，每个进程一个）
+rate_limiter = TokenBucket()
+hedge_budget = HedgeBudget()
@@ -0,0 +1,200 @@
+# rewrite_cache.py - 改写结果缓存（进程内 LRU + TTL，可选 SQLite 共享层）
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import (
+    REWRITE_CACHE_SIZE, REWRITE_CACHE_TTL,
+    REWRITE_CACHE_DB, REWRITE_CACHE_DB_MAX_ENTRIES
+)
+from metrics import CACHE_LOOKUPS
+
+
+def rewrite_cache_key(title, summary, style_prompt, format_type, model_name):
+    """按改写输入内容计算缓存键"""
+    raw = json.dumps([title, summary, style_prompt, format_type, model_name], ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class LRUCache:
+    """线程安全的 LRU 缓存，条目带过期时间"""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.time() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    """SQLite(WAL) 缓存层，供同一台机器上的多个 gunicorn 进程共享"""
+
+    def __init__(self, path, max_entries, ttl):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        self.evictions = 0
+
+    def _conn(self):
+        # 每个线程一个连接；fork 后不能沿用父进程的连接
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('''CREATE TABLE IF NOT EXISTS rewrite_cache (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        )''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_rewrite_cache_accessed ON rewrite_cache(accessed_at)')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute(
+            'SELECT value, expires_at FROM rewrite_cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at < now:
+            conn.execute('DELETE FROM rewrite_cache WHERE key = ?', (key,))
+            return None
+        conn.execute('UPDATE rewrite_cache SET accessed_at = ? WHERE key = ?', (now, key))
+        return value
+
+    def set(self, key, value):
+        conn = self._conn()
+        now = time.time()
+        conn.execute(
+            'INSERT OR REPLACE INTO rewrite_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+            (key, value, now + self.ttl, now)
+        )
+        self._trim(conn, now)
+
+    def _trim(self, conn, now):
+        """删除过期条目，超出容量时按最近访问时间淘汰"""
+        conn.execute('DELETE FROM rewrite_cache WHERE expires_at < ?', (now,))
+        count = conn.execute('SELECT COUNT(*) FROM rewrite_cache').fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                'DELETE FROM rewrite_cache WHERE key IN '
+                '(SELECT key FROM rewrite_cache ORDER BY accessed_at LIMIT ?)',
+                (overflow,)
+            )
+            self.evictions += overflow
+
+    def __len__(self):
+        return self._conn().execute('SELECT COUNT(*) FROM rewrite_cache').fetchone()[0]
+
+
+class RewriteCache:
+    """两级改写缓存：先查进程内 LRU，再查 SQLite 共享层"""
+
+    def __init__(self, max_entries=REWRITE_CACHE_SIZE, ttl=REWRITE_CACHE_TTL,
+                 db_path=REWRITE_CACHE_DB, db_max_entries=REWRITE_CACHE_DB_MAX_ENTRIES):
+        self.memory = LRUCache(max_entries, ttl)
+        self.shared = SQLiteCache(db_path, db_max_entries, ttl) if db_path else None
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.sets = 0
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self._count('memory_hits')
+            CACHE_LOOKUPS.labels('rewrite', 'memory_hit').inc()
+            return value
+
+        if self.shared is not None:
+            try:
+                value = self.shared.get(key)
+            except sqlite3.Error as e:
+                print(f"改写缓存读取失败: {e}")
+                value = None
+            if value is not None:
+                self.memory.set(key, value)
+                self._count('shared_hits')
+                CACHE_LOOKUPS.labels('rewrite', 'shared_hit').inc()
+                return value
+
+        self._count('misses')
+        CACHE_LOOKUPS.labels('rewrite', 'miss').inc()
+        return None
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value)
+            except sqlite3.Error as e:
+                print(f"改写缓存写入失败: {e}")
+        self._count('sets')
+
+    def stats(self):
+        hits = self.memory_hits + self.shared_hits
+        lookups = hits + self.misses
+        stats = {
+            'memory_hits': self.memory_hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'sets': self.sets,
+            'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+            'memory_entries': len(self.memory),
+            'memory_evictions': self.memory.evictions,
+            'shared_enabled': self.shared is not None
+        }
+        if self.shared is not None:
+            try:
+                stats['shared_entries'] = len(self.shared)
+            except sqlite3.Error:
+                stats['shared_entries'] = None
+            stats['shared_evictions'] = self.shared.evictions
+        return stats
+
+
+# 创建全局实例
+rewrite_cache = RewriteCache()
@@ -0,0 +1,181 @@
+# scheduler.py - 后台新闻采集调度（定时抓取 + AI搜索，结果写入本地存储）
+import fcntl
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import INGEST_INTERVAL, INGEST_JITTER, INGEST_WORKERS, INGEST_LOCK_FILE
+
+
+class IngestScheduler:
+    """按新闻源定时采集：每个源独立计时并带随机抖动，同一个源上一次没跑完不会重复启动；
+    多个 gunicorn 进程通过文件锁选出一个负责采集"""
+
+    def __init__(self, source_ids, ingest_fn, store, interval=INGEST_INTERVAL,
+                 jitter=INGEST_JITTER, workers=INGEST_WORKERS, lock_file=INGEST_LOCK_FILE, on_stored=None):
+        self.source_ids = list(source_ids)
+        self.ingest_fn = ingest_fn
+        self.store = store
+        # 结果写入存储成功后调用（如把新闻记为已抓取过），写入失败的新闻下一轮仍会采集到
+        self.on_stored = on_stored
+        self.interval = interval
+        self.jitter = jitter
+        self.workers = workers
+        self.lock_file = lock_file
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._lock_fd = None
+        self._running = set()
+        self._next_run = {}
+        self._status = {source_id: {} for source_id in self.source_ids}
+        self.is_leader = False
+
+    def _acquire_leader_lock(self):
+        """非阻塞获取文件锁，拿到锁的进程负责采集"""
+        directory = os.path.dirname(self.lock_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(self.lock_file, os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._lock_fd = fd
+        return True
+
+    def _release_leader_lock(self):
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+        self.is_leader = False
+
+    def _jittered(self, base):
+        return max(base + random.uniform(-self.jitter, self.jitter), 0)
+
+    def ingest(self, source_id):
+        """采集单个新闻源并写入存储"""
+        with self._lock:
+            if source_id in self._running:
+                return False
+            self._running.add(source_id)
+
+        start = time.time()
+        status = {'lastRun': start}
+        try:
+            items = self.ingest_fn(source_id)
+            # 采集结果只含新出现的新闻，追加到该源的列表；没有新闻时也刷新时间
+            self.store.append_feed(source_id, items)
+            if self.on_stored is not None:
+                self.on_stored(items)
+            status.update({'ok': True, 'count': len(items)})
+        except Exception as e:
+            print(f"采集 {source_id} 失败: {e}")
+            status.update({'ok': False, 'error': str(e)})
+        finally:
+            status['durationMs'] = round((time.time() - start) * 1000, 1)
+            with self._lock:
+                self._running.discard(source_id)
+                self._next_run[source_id] = time.time() + self._jittered(self.interval)
+                status['nextRun'] = self._next_run[source_id]
+                self._status[source_id] = status
+            self._wakeup.set()
+        return True
+
+    def run_once(self):
+        """立即采集所有新闻源（命令行 --once 使用）；与定时采集共用文件锁，
+        其他进程正在负责采集时不运行，避免同一批新闻重复写入。返回是否执行了采集"""
+        holds_lock = self.is_leader
+        if not holds_lock and not self._acquire_leader_lock():
+            print("其他进程正在采集（已持有采集锁），跳过本次采集")
+            return False
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                list(executor.map(self.ingest, self.source_ids))
+        finally:
+            if not holds_lock:
+                self._release_leader_lock()
+        return True
+
+    def _run(self):
+        # 没拿到锁的进程定期重试，负责采集的进程退出后由其他进程接替
+        while not self._stop.is_set() and not self._acquire_leader_lock():
+            self._stop.wait(self.interval)
+        if self._stop.is_set():
+            self._release_leader_lock()
+            return
+
+        self.is_leader = True
+        try:
+            self._loop()
+        finally:
+            # 停止后释放锁，由其他进程（或本进程的 run_once）接替
+            self._release_leader_lock()
+
+    def _loop(self):
+        print(f"新闻采集调度已启动 (pid={os.getpid()}, 间隔={self.interval}s)")
+
+        now = time.time()
+        with self._lock:
+            for source_id in self.source_ids:
+                # 首轮也加抖动，避免所有源同时请求
+                self._next_run[source_id] = now + random.uniform(0, self.jitter)
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ingest') as executor:
+            while not self._stop.is_set():
+                now = time.time()
+                with self._lock:
+                    due = [s for s in self.source_ids
+                           if s not in self._running and self._next_run.get(s, 0) <= now]
+                    for source_id in due:
+                        # 运行期间不再触发，完成后重新计算下次时间
+                        self._next_run[source_id] = float('inf')
+                    pending = [t for s, t in self._next_run.items() if s not in self._running]
+
+                for source_id in due:
+                    executor.submit(self.ingest, source_id)
+
+                wait = min(pending) - time.time() if pending else self.interval
+                self._wakeup.clear()
+                self._wakeup.wait(min(max(wait, 0.1), self.interval))
+
+    def start(self):
+        """启动后台调度线程（重复调用无副作用）"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='ingest-scheduler', daemon=True)
+            self._thread.start()
+
+    def run_forever(self):
+        self.start()
+        try:
+            while self._thread.is_alive():
+                self._thread.join(1)
+        except KeyboardInterrupt:
+            self.stop()
+
+    def stop(self, wait=False):
+        """停止调度；wait 为 True 时等待调度线程退出（进行中的采集会先完成）"""
+        self._stop.set()
+        self._wakeup.set()
+        thread = self._thread
+        if wait and thread is not None:
+            thread.join()
+
+    def status(self):
+        with self._lock:
+            return {
+                'leader': self.is_leader,
+                'pid': os.getpid(),
+                'interval': self.interval,
+                'jitter': self.jitter,
+                'running': sorted(self._running),
+                'sources': {s: dict(self._status.get(s, {})) for s in self.source_ids}
+            }
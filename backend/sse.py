@@ -0,0 +1,32 @@
+# sse.py - Server-Sent Events 编码
+import json
+
+
+def sse_event(event, data):
+    """编码一条 SSE 消息"""
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def sse_rewrite_stream(deltas, meta):
+    """把改写文本片段转成 SSE：delta 事件逐段推送，done 事件带完整文本
+
+    客户端断开时 werkzeug 会关闭本生成器，finally 中关闭上游生成器以取消模型调用。
+    """
+    parts = []
+    try:
+        for delta in deltas:
+            parts.append(delta)
+            yield sse_event('delta', {'content': delta})
+
+        yield sse_event('done', {
+            'content': ''.join(parts),
+            'fallback': meta.get('fallback', False),
+            'cached': meta.get('cached', False),
+            'routing': meta.get('routing')
+        })
+    except Exception as e:
+        print(f"流式改写出错: {e}")
+        yield sse_event('error', {'error': str(e), 'content': ''.join(parts)})
+    finally:
+        deltas.close()
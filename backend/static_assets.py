@@ -0,0 +1,162 @@
+# static_assets.py - 前端静态文件：第一次请求时读入内存并预压缩，强 ETag + 304，js/css 使用带内容哈希的长缓存地址
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+from flask import Response, abort, request
+
+from compression import ENCODINGS, MAX_LEVEL, choose_encoding, compress
+from config import STATIC_DIR, STATIC_RELOAD
+
+# 前端目录：index.html 与 js/、css/、assets/ 所在的项目根目录
+DEFAULT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ASSET_DIRS = ('js', 'css', 'assets')
+# 这些目录下的文件在 index.html 中改写为带哈希的地址
+HASHED_DIRS = ('js', 'css')
+COMPRESSIBLE = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# 未带哈希的地址（包括 index.html）每次都向服务端校验，内容不变时只返回 304
+REVALIDATE = 'no-cache'
+
+_REF_PATTERN = re.compile(r'''((?:src|href)=["'])((?:%s)/[^"'?#]+)(["'])''' % '|'.join(HASHED_DIRS))
+
+
+class Asset:
+    """一个文件的原始内容和各压缩版本；每个版本有自己的强 ETag"""
+
+    def __init__(self, path, body):
+        self.path = path
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if mimetype.startswith('text/') or mimetype == 'application/javascript':
+            mimetype += '; charset=utf-8'
+        self.mimetype = mimetype
+        self.digest = hashlib.sha256(body).hexdigest()
+        # 编码 -> (内容, ETag)；None 为未压缩版本
+        self.variants = {None: (body, f'"{self.digest[:32]}"')}
+        if mimetype.startswith(COMPRESSIBLE):
+            for encoding in ENCODINGS:
+                data = compress(body, encoding, MAX_LEVEL[encoding])
+                # 压缩后没有变小的文件不保存压缩版本
+                if len(data) < len(body):
+                    self.variants[encoding] = (data, f'"{self.digest[:32]}-{encoding}"')
+
+    @property
+    def size(self):
+        return len(self.variants[None][0])
+
+    def hashed_path(self):
+        """js/app.js -> js/app.3f2a9c1b0d.js"""
+        base, ext = os.path.splitext(self.path)
+        return f'{base}.{self.digest[:10]}{ext}'
+
+
+def _etag_matches(header, etag):
+    """If-None-Match 使用弱比较：代理可能把强 ETag 改为 W/ 开头"""
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    return etag in (tag.strip().removeprefix('W/') for tag in header.split(','))
+
+
+class StaticAssets:
+    """路径 -> (Asset, 是否可长期缓存)；整个前端只有几十 KB，全部放在内存里"""
+
+    def __init__(self, root=None, reload=STATIC_RELOAD):
+        self.root = root or STATIC_DIR or DEFAULT_ROOT
+        self.reload = reload
+        # 第一次请求时才加载：解析子进程等只导入 app 模块的进程不做预压缩
+        self._routes = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _scan(self):
+        """返回 [(相对路径, 绝对路径)]，以及最新的修改时间"""
+        files = []
+        index = os.path.join(self.root, 'index.html')
+        if os.path.isfile(index):
+            files.append(('index.html', index))
+        for directory in ASSET_DIRS:
+            for dirpath, _, filenames in os.walk(os.path.join(self.root, directory)):
+                for filename in filenames:
+                    full = os.path.join(dirpath, filename)
+                    files.append((os.path.relpath(full, self.root).replace(os.sep, '/'), full))
+        mtime = max((os.path.getmtime(full) for _, full in files), default=0)
+        return files, mtime
+
+    def load(self):
+        files, mtime = self._scan()
+        assets = {}
+        for path, full in files:
+            with open(full, 'rb') as f:
+                assets[path] = Asset(path, f.read())
+
+        routes = {}
+        hashed = {}
+        for path, asset in assets.items():
+            routes[path] = (asset, False)
+            if path.split('/', 1)[0] in HASHED_DIRS:
+                hashed[path] = asset.hashed_path()
+                routes[hashed[path]] = (asset, True)
+
+        index = assets.get('index.html')
+        if index is not None:
+            # 页面中引用的 js/css 换成带哈希的地址：内容变了地址随之改变，浏览器可以永久缓存
+            html = index.variants[None][0].decode('utf-8')
+            html = _REF_PATTERN.sub(
+                lambda m: m.group(1) + hashed.get(m.group(2), m.group(2)) + m.group(3), html
+            )
+            routes['index.html'] = (Asset('index.html', html.encode('utf-8')), False)
+
+        self._routes = routes
+        self._mtime = mtime
+
+        raw = sum(asset.size for asset in assets.values())
+        compressed = {
+            encoding: sum(len(a.variants.get(encoding, a.variants[None])[0]) for a in assets.values())
+            for encoding in ENCODINGS
+        }
+        sizes = '，'.join(f'{encoding} {size / 1024:.1f}KB' for encoding, size in compressed.items())
+        print(f"已加载前端静态文件 {len(assets)} 个，共 {raw / 1024:.1f}KB（{sizes}）")
+
+    def _ensure_loaded(self):
+        # 多个请求同时到来（或同时发现文件变化）时只加载一次
+        if self._routes is not None and not self.reload:
+            return
+        with self._lock:
+            if self._routes is None:
+                self.load()
+            elif self.reload:
+                _, mtime = self._scan()
+                if mtime != self._mtime:
+                    self.load()
+
+    def response(self, path):
+        """按 Accept-Encoding 返回预压缩的版本；If-None-Match 命中时返回 304"""
+        self._ensure_loaded()
+        entry = self._routes.get(path)
+        if entry is None:
+            abort(404)
+        asset, immutable = entry
+
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'),
+                                   [e for e in ENCODINGS if e in asset.variants])
+        body, etag = asset.variants[encoding]
+        headers = {
+            'ETag': etag,
+            'Cache-Control': IMMUTABLE if immutable else REVALIDATE,
+        }
+        if len(asset.variants) > 1:
+            headers['Vary'] = 'Accept-Encoding'
+
+        if _etag_matches(request.headers.get('If-None-Match'), etag):
+            return Response(status=304, headers=headers)
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return Response(body, headers=headers, content_type=asset.mimetype)
+
+
+# 创建全局实例
+static_assets = StaticAssets()
@@ -0,0 +1,33 @@
+# test_async_llm.py - 对冲请求等待期间被取消时不留下在途请求
+import asyncio
+
+import async_llm
+
+
+def test_cancel_during_hedge_wait_cancels_primary(monkeypatch):
+    started = []
+    cancelled = []
+
+    async def slow_attempt(client, payload, model_name, deadline):
+        started.append(model_name)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(model_name)
+            raise
+
+    monkeypatch.setattr(async_llm, '_attempt', slow_attempt)
+    monkeypatch.setattr(async_llm, 'hedge_delay', lambda model_name: 5)
+    monkeypatch.setattr(async_llm, 'get_llm_loop', lambda: type('Loop', (), {'client': None})())
+
+    async def run():
+        call = asyncio.ensure_future(async_llm._call_volcano_api('你好', 'lite'))
+        await asyncio.sleep(0.05)
+        call.cancel()
+        await asyncio.gather(call, return_exceptions=True)
+        await asyncio.sleep(0)
+        # 在事件循环关闭（会取消所有剩余任务）之前检查
+        assert len(started) == 1
+        assert cancelled == started
+
+    asyncio.run(run())
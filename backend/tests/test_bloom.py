@@ -0,0 +1,29 @@
+# test_bloom.py - 只读查询不初始化其他进程正在创建的分片
+import os
+
+from bloom import ScalableBloomFilter
+
+
+def test_contains_skips_slice_being_created(tmp_path):
+    seen = ScalableBloomFilter(str(tmp_path), 4, 0.01)
+    seen.add('a')
+    # 其他进程刚创建出 seen.1.bloom，还没写入文件头
+    partial = tmp_path / 'seen.1.bloom'
+    partial.write_bytes(b'')
+
+    assert 'a' in seen
+    assert 'b' not in seen
+    assert os.path.getsize(partial) == 0
+    assert seen.stats()['slices'] == 1
+
+
+def test_add_initializes_unfinished_slice_under_lock(tmp_path):
+    seen = ScalableBloomFilter(str(tmp_path), 2, 0.01)
+    seen.add('a')
+    seen.add('b')
+    (tmp_path / 'seen.1.bloom').write_bytes(bytes(64))
+
+    assert seen.add('c')
+    assert 'c' in seen
+    assert seen.stats()['slices'] == 2
+    assert ScalableBloomFilter(str(tmp_path), 2, 0.01).stats()['count'] == 3
@@ -0,0 +1,40 @@
+# test_crawler.py - 304 后按新解析逻辑重新解析缓存的响应体
+import crawler
+from crawler import NewsCrawler
+from http_cache import PageCache
+
+URL = 'https://news.example.com/list'
+CONTENT_TYPE = 'text/html; charset=gbk'
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b'', headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+class FakeSession:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+
+    def get(self, url, headers=None, timeout=None):
+        return self.responses.pop(0)
+
+
+def test_reparse_after_304_uses_cached_content_type(tmp_path, monkeypatch):
+    news = NewsCrawler(cache_dir=str(tmp_path))
+    parsed = []
+    monkeypatch.setattr(news, '_parse', lambda html, url, source_id, name, hours, content_type=None:
+                        parsed.append(content_type) or [{'id': len(parsed)}])
+    news.session = FakeSession(
+        FakeResponse(200, '<html>新闻</html>'.encode('gbk'), {'ETag': '"v1"', 'Content-Type': CONTENT_TYPE}),
+        FakeResponse(304)
+    )
+    news._load_page(URL, 'example', '示例', 24, 5)
+
+    # 解析逻辑升级，换一个进程（从磁盘读缓存）收到 304
+    monkeypatch.setattr(crawler, 'PARSER_VERSION', crawler.PARSER_VERSION + 1)
+    news._page_cache = PageCache(str(tmp_path))
+    assert news._load_page(URL, 'example', '示例', 24, 5) == [{'id': 2}]
+    assert parsed == [CONTENT_TYPE, CONTENT_TYPE]
@@ -0,0 +1,54 @@
+# test_dedup.py - 近似重复检测
+from dedup import StoryIndex
+
+
+def test_placeholder_summary_does_not_split_same_story():
+    """列表页的占位摘要和 AI 搜索的真实摘要不影响同一新闻的归并"""
+    index = StoryIndex()
+    crawled = {'id': 'autohome_1', 'title': '比亚迪秦L DM-i正式上市 售价7.98万起', 'summary': '汽车之家最新汽车资讯'}
+    searched = {'id': 'ai_1', 'title': '比亚迪秦L DM-i正式上市 售价7.98万起',
+                'summary': '比亚迪官方宣布，秦L DM-i正式上市，共推出5款车型，售价区间7.98-12.98万元。'}
+    index.assign([crawled, searched])
+    assert searched['cluster'] == 'autohome_1'
+
+
+def test_placeholder_summary_does_not_merge_different_stories():
+    """不同新闻不会因为相同的占位摘要被归为一簇"""
+    index = StoryIndex()
+    first = {'id': 'autohome_1', 'title': '理想L6上市', 'summary': '汽车之家最新汽车资讯'}
+    second = {'id': 'autohome_2', 'title': '小鹏G6上市', 'summary': '汽车之家最新汽车资讯'}
+    index.assign([first, second])
+    assert second['cluster'] == 'autohome_2'
+
+
+def test_reworded_title_is_clustered():
+    index = StoryIndex()
+    items = [
+        {'id': 'a', 'title': '比亚迪秦L DM-i正式上市 售价7.98万起'},
+        {'id': 'b', 'title': '比亚迪秦L DM-i上市，售价7.98万起（组图）'},
+    ]
+    index.assign(items)
+    assert items[1]['cluster'] == 'a'
+
+
+def test_different_models_and_prices_are_not_merged():
+    """同一车系不同车型、不同售价的上市新闻字面相似度超过阈值，但不是同一新闻"""
+    index = StoryIndex()
+    items = [
+        {'id': 'qin', 'title': '比亚迪秦L DM-i正式上市 售价7.98万起'},
+        {'id': 'han', 'title': '比亚迪汉L DM-i正式上市 售价16.98万起'},
+        {'id': 'song', 'title': '比亚迪宋L DM-i正式上市 售价7.98万起'},
+    ]
+    index.assign(items)
+    assert [item['cluster'] for item in items] == ['qin', 'han', 'song']
+
+
+def test_reprint_without_price_is_clustered():
+    """转载省略了售价仍归为同一新闻"""
+    index = StoryIndex()
+    items = [
+        {'id': 'a', 'title': '比亚迪秦L DM-i正式上市 售价7.98万起'},
+        {'id': 'b', 'title': '比亚迪秦L DM-i正式上市'},
+    ]
+    index.assign(items)
+    assert items[1]['cluster'] == 'a'
@@ -0,0 +1,48 @@
+# test_extract.py - 页面编码识别
+from extract import LinkExtractor, detect_encoding, extract_article
+
+TITLE = '比亚迪秦L DM-i正式上市 售价7.98万起'
+LIST_PAGE = (
+    '<html><head><meta charset="gbk"><title>新闻</title></head><body>'
+    '<ul><li class="news-item"><a href="/news/1.html">' + TITLE + '</a></li></ul>'
+    '</body></html>'
+).encode('gbk')
+
+
+def test_detect_encoding_prefers_content_type():
+    assert detect_encoding(LIST_PAGE, 'text/html; charset=GB2312') == 'gb18030'
+    assert detect_encoding(LIST_PAGE, 'text/html') == 'gb18030'
+    assert detect_encoding(b'<html></html>', None) == 'utf-8'
+
+
+def test_gbk_list_page():
+    """GBK 页面按 <meta charset> 解码，命中的选择器再次解析片段时也不乱码"""
+    extractor = LinkExtractor()
+    links, selector = extractor.extract(LIST_PAGE)
+    assert links == [(TITLE, '/news/1.html')]
+    assert extractor.extract(LIST_PAGE, selector) == (links, selector)
+
+
+def test_gbk_article_from_content_type():
+    """Content-Type 声明的编码在页面没有 <meta charset> 时生效"""
+    body = ('<html><body><article><p>' + TITLE + '，新车搭载第五代混动系统。</p></article></body></html>').encode('gbk')
+    article = extract_article(body, encoding=detect_encoding(body, 'text/html; charset=gbk'))
+    assert article['content'].startswith(TITLE)
+
+
+def test_fragment_keeps_trailing_anchors_of_last_item():
+    """再次解析片段时，最后一条新闻里排在后面的链接不会被截掉；其他类名中的 item 不算标记"""
+    items = ''.join(
+        f'<li class="item"><a href="/news/{i}.html"><img src="/{i}.jpg"></a>'
+        f'<a href="/news/{i}.html">比亚迪新车第{i}条正式上市发布</a></li>'
+        for i in range(3)
+    )
+    html = (
+        '<html><head><script>var item = 1;</script></head><body>'
+        '<div class="item-nav"><a href="/nav">导航</a></div>'
+        f'<ul class="list">{items}</ul><div class="footer">页脚</div></body></html>'
+    ).encode('utf-8')
+    extractor = LinkExtractor()
+    links, selector = extractor.extract(html)
+    assert len(links) == 6
+    assert extractor.extract(html, selector) == (links, selector)
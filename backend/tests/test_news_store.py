@@ -0,0 +1,44 @@
+# test_news_store.py - 全文索引建不起来时退回 LIKE 检索
+import news_store
+from news_store import NewsStore
+
+ITEMS = [
+    {'id': 'autohome_1', 'title': '比亚迪秦L DM-i正式上市', 'summary': '售价7.98万起', 'url': 'https://a.com/1',
+     'source': 'autohome', 'publishTime': '2026-10-18T08:00:00'},
+    {'id': 'autohome_2', 'title': '小米SU7订单突破10万', 'summary': '创最快交付纪录', 'url': 'https://a.com/2',
+     'source': 'autohome', 'publishTime': '2026-10-18T09:00:00'},
+]
+
+
+def without_trigram(monkeypatch):
+    """模拟不支持 trigram 分词的 SQLite"""
+    schema = (news_store.FTS_SCHEMA[0].replace("tokenize='trigram'", "tokenize='no_such_tokenizer'"),)
+    monkeypatch.setattr(news_store, 'FTS_SCHEMA', schema + news_store.FTS_SCHEMA[1:])
+
+
+def test_search_uses_fts(tmp_path):
+    store = NewsStore(str(tmp_path / 'news.db'))
+    store.save_feed('autohome', ITEMS)
+    assert store.fts
+    assert [item['id'] for item in store.search('正式上市')[0]] == ['autohome_1']
+
+
+def test_feed_and_search_without_fts(tmp_path, monkeypatch):
+    without_trigram(monkeypatch)
+    store = NewsStore(str(tmp_path / 'news.db'))
+    store.save_feed('autohome', ITEMS)
+    assert not store.fts
+    assert len(store.load_feeds(['autohome'])['autohome'][0]) == 2
+    assert [item['id'] for item in store.search('正式上市')[0]] == ['autohome_1']
+
+
+def test_index_rebuilt_when_fts_becomes_available(tmp_path, monkeypatch):
+    """没有索引时写入的新闻，换到支持 trigram 的 SQLite 后补进索引"""
+    path = str(tmp_path / 'news.db')
+    with monkeypatch.context() as patch:
+        without_trigram(patch)
+        NewsStore(path).save_feed('autohome', ITEMS)
+
+    store = NewsStore(path)
+    assert [item['id'] for item in store.search('订单突破')[0]] == ['autohome_2']
+    assert store.fts
@@ -0,0 +1,35 @@
+# test_scheduler.py - 手动采集与定时采集共用文件锁
+from scheduler import IngestScheduler
+
+
+class FakeStore:
+    def __init__(self):
+        self.feeds = []
+
+    def append_feed(self, source_id, items):
+        self.feeds.append((source_id, items))
+
+
+def make_scheduler(tmp_path, store):
+    return IngestScheduler(['autohome'], lambda source_id: [{'id': source_id}], store,
+                           lock_file=str(tmp_path / 'ingest.lock'))
+
+
+def test_run_once_skips_while_another_process_holds_the_lock(tmp_path):
+    leader, manual = FakeStore(), FakeStore()
+    scheduler = make_scheduler(tmp_path, leader)
+    assert scheduler._acquire_leader_lock()
+
+    assert not make_scheduler(tmp_path, manual).run_once()
+    assert manual.feeds == []
+
+    scheduler._release_leader_lock()
+    assert make_scheduler(tmp_path, manual).run_once()
+    assert manual.feeds == [('autohome', [{'id': 'autohome'}])]
+
+
+def test_run_once_releases_the_lock(tmp_path):
+    store = FakeStore()
+    assert make_scheduler(tmp_path, store).run_once()
+    assert make_scheduler(tmp_path, store).run_once()
+    assert len(store.feeds) == 2
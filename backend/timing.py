@@ -0,0 +1,216 @@
+# timing.py - 请求内分阶段计时（Server-Timing 响应头）和可选的采样分析
+import contextvars
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, request
+
+from config import SERVER_TIMING, PROFILE_DIR, PROFILE_EVERY_N, PROFILE_SLOW_MS, PROFILE_INTERVAL_MS
+
+_current = contextvars.ContextVar('timeline', default=None)
+
+
+class Timeline:
+    """一个请求内各阶段的耗时；共享事件循环和请求线程上的代码通过 contextvars 拿到同一个对象，所以要加锁"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans = {}
+        # 线程 id -> 正在执行的本请求阶段数，采样分析只采这些线程
+        self.threads = Counter()
+        self.samples = None
+        self.sampled_nth = False
+        self._lock = threading.Lock()
+
+    def enter(self, thread_id):
+        with self._lock:
+            self.threads[thread_id] += 1
+
+    def exit(self, thread_id):
+        with self._lock:
+            self.threads[thread_id] -= 1
+            if self.threads[thread_id] <= 0:
+                del self.threads[thread_id]
+
+    def active_threads(self):
+        with self._lock:
+            return list(self.threads)
+
+    def add(self, name, duration_ms, desc=None):
+        with self._lock:
+            entry = self.spans.get(name)
+            if entry is None:
+                self.spans[name] = [duration_ms, 1, desc]
+            else:
+                entry[0] += duration_ms
+                entry[1] += 1
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+    def header(self):
+        """Server-Timing 头：同名阶段合并（耗时相加，desc 注明次数），最后附上总耗时"""
+        with self._lock:
+            spans = list(self.spans.items())
+        parts = []
+        for name, (duration_ms, count, desc) in spans:
+            if count > 1:
+                desc = f'{desc} x{count}' if desc else f'x{count}'
+            part = f'{name};dur={duration_ms:.1f}'
+            if desc:
+                part += ';desc="%s"' % str(desc).replace('"', '')
+            parts.append(part)
+        parts.append(f'total;dur={self.elapsed_ms():.1f}')
+        return ', '.join(parts)
+
+
+@contextmanager
+def span(name, desc=None):
+    """记录一个阶段的耗时；不在请求内（如后台采集）时什么也不做"""
+    timeline = _current.get()
+    if timeline is None:
+        yield
+        return
+
+    thread_id = threading.get_ident()
+    timeline.enter(thread_id)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timeline.exit(thread_id)
+        timeline.add(name, (time.perf_counter() - start) * 1000, desc)
+
+
+def _fold(frame, thread_name):
+    """把调用栈折叠成 flamegraph.pl 的格式：线程名;最外层;...;最内层"""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    # 线程名里的编号去掉，同类线程的栈才能合并
+    stack.append(re.sub(r'\d+', 'N', thread_name))
+    return ';'.join(reversed(stack))
+
+
+class StackSampler:
+    """后台线程每 interval 秒采样一次被分析请求所在线程的调用栈。
+    共享事件循环线程同时处理多个请求，它的样本里可能混有其他请求的协程"""
+
+    def __init__(self, interval=PROFILE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self._timelines = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def watch(self, timeline):
+        timeline.samples = Counter()
+        with self._lock:
+            self._timelines.add(timeline)
+            # gunicorn fork 后父进程的采样线程不存在，按需重新启动
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                self._thread.start()
+
+    def unwatch(self, timeline):
+        with self._lock:
+            self._timelines.discard(timeline)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._timelines:
+                    continue
+                frames = sys._current_frames()
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for timeline in self._timelines:
+                    for thread_id in timeline.active_threads():
+                        frame = frames.get(thread_id)
+                        if frame is not None:
+                            timeline.samples[_fold(frame, names.get(thread_id, 'thread'))] += 1
+
+
+class Profiler:
+    """按 every_n / slow_ms 决定采样哪些请求、保存哪些结果"""
+
+    def __init__(self, directory=PROFILE_DIR, every_n=PROFILE_EVERY_N, slow_ms=PROFILE_SLOW_MS):
+        self.directory = directory
+        self.every_n = every_n
+        self.slow_ms = slow_ms
+        self.enabled = bool(directory) and (every_n > 0 or slow_ms > 0)
+        self.sampler = StackSampler()
+        self._requests = itertools.count(1)
+        self.saved = 0
+
+    def begin(self, timeline):
+        """设置了耗时阈值时每个请求都要采样，结束时才知道是否保存；否则只采样第 N 个请求"""
+        if not self.enabled:
+            return
+        timeline.sampled_nth = self.every_n > 0 and next(self._requests) % self.every_n == 0
+        if timeline.sampled_nth or self.slow_ms > 0:
+            self.sampler.watch(timeline)
+
+    def finish(self, timeline, label):
+        if timeline.samples is None:
+            return
+        self.sampler.unwatch(timeline)
+        elapsed_ms = timeline.elapsed_ms()
+        if not timeline.samples or not (timeline.sampled_nth or (self.slow_ms > 0 and elapsed_ms >= self.slow_ms)):
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{label}-{elapsed_ms:.0f}ms.folded"
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in timeline.samples.most_common():
+                f.write(f'{stack} {count}\n')
+        self.saved += 1
+        print(f"已保存采样分析: {path}")
+
+
+def install(app):
+    """为 /api/* 请求建立计时上下文，响应时写入 Server-Timing 头，请求结束时交给采样分析"""
+
+    @app.before_request
+    def _begin_timeline():
+        if not request.path.startswith('/api/'):
+            return
+        timeline = Timeline()
+        g.timeline = timeline
+        g.timeline_token = _current.set(timeline)
+        timeline.enter(threading.get_ident())
+        profiler.begin(timeline)
+
+    @app.after_request
+    def _server_timing(response):
+        timeline = g.get('timeline')
+        if timeline is not None and SERVER_TIMING:
+            response.headers['Server-Timing'] = timeline.header()
+        return response
+
+    @app.teardown_request
+    def _finish_timeline(exc):
+        timeline = g.pop('timeline', None)
+        token = g.pop('timeline_token', None)
+        if timeline is None:
+            return
+        timeline.exit(threading.get_ident())
+        rule = request.url_rule.rule if request.url_rule else 'unmatched'
+        profiler.finish(timeline, re.sub(r'[^A-Za-z0-9]+', '_', rule).strip('_'))
+        try:
+            _current.reset(token)
+        except ValueError:
+            # 流式响应结束时可能已不在原来的上下文中
+            pass
+
+
+# 创建全局实例
+profiler = Profiler()
@@ -1,53 +1,42 @@
 # writer.py - AI改写模块（模拟）
+from templates import registry
 
-def generate_content(news, format_type, style):
-    """生成改写内容"""
-    title = news.get('title', '')
-    summary = news.get('summary', '')
-    source = news.get('source_name', '')
+# 字段: title 标题、summary 摘要、source 来源；{summary:.60} 表示摘要前 60 个字
+SHORT_TEMPLATES = {
+    'vlog': [
+        """哇塞！兄弟们，最新消息来了！{title}，这波真的有点东西！
 
-    if format_type == 'short':
-        return generate_short_content(title, summary, source, style)
-    else:
-        return generate_long_content(title, summary, source, style)
-
-def generate_short_content(title, summary, source, style):
-    """生成短文案"""
-    templates = {
-        'vlog': [
-            f"""哇塞！兄弟们，最新消息来了！{title}，这波真的有点东西！
-
-讲真，看完这个我整个人都激动了。{summary[:60]}...
+讲真，看完这个我整个人都激动了。{summary:.60}...
 
 兄弟们，你们觉得这车怎么样？评论区聊聊！🚗💨""",
 
-            f"""家人们！重大新闻！{title}！
+        """家人们！重大新闻！{title}！
 
-{summary[:80]}
+{summary:.80}
 
 说实话，这波真的很香！我已经迫不及待想试驾了！感兴趣的兄弟萌赶紧关注起来！冲！🚀""",
 
-            f"""最新消息！刚刚收到的猛料——{title}！
+        """最新消息！刚刚收到的猛料——{title}！
 
-{summary[:70]}
+{summary:.70}
 
 讲道理，这配置、这价格，还要什么自行车？感兴趣的评论区扣1！"""
-        ],
-        'review': [
-            f"""【新车快讯】{title}
+    ],
+    'review': [
+        """【新车快讯】{title}
 
 {summary}
 
 从专业角度来看，这次更新确实很有诚意。产品力提升明显，无论是配置还是价格都很有竞争力。建议感兴趣的朋友可以关注一下实车表现。""",
 
-            f"""今日关注：{title}
+        """今日关注：{title}
 
 客观分析：{summary}
 
 总的来说，这是一款值得关注的产品。具体表现如何，建议到店体验后再做判断。"""
-        ],
-        'push': [
-            f"""🔥重磅推荐！{title}！
+    ],
+    'push': [
+        """🔥重磅推荐！{title}！
 
 {summary}
 
@@ -55,7 +44,7 @@ def generate_short_content(title, summary, source, style):
 
 私我了解详情，还有额外福利！先到先得！冲鸭！🎉""",
 
-            f"""❤️‍🔥强烈种草！{title}
+        """❤️‍🔥强烈种草！{title}
 
 {summary}
 
@@ -64,30 +53,25 @@ def generate_short_content(title, summary, source, style):
 想入手的宝子们，抓紧时间！名额有限！
 
 评论区扣"1"安排！"""
-        ],
-        'news': [
-            f"""【汽车资讯】{title}
+    ],
+    'news': [
+        """【汽车资讯】{title}
 
 {summary}
 
 记者了解到，该车型/技术的推出将进一步丰富消费者的选择空间。具体售价及配置信息，请关注官方后续报道。""",
 
-            f"""汽车圈又有新动静！{title}
+        """汽车圈又有新动静！{title}
 
 {summary}
 
 业内人士分析认为，的相关布局将对行业格局产生一定影响。更多详情，我们将持续关注。"""
-        ]
-    }
+    ]
+}
 
-    options = templates.get(style, templates['vlog'])
-    return options[0]
-
-def generate_long_content(title, summary, source, style):
-    """生成长文章"""
-    templates = {
-        'vlog': [
-            f"""🚗 {title}
+LONG_TEMPLATES = {
+    'vlog': [
+        """🚗 {title}
 
 ——我是分割线——
 
@@ -107,7 +91,7 @@ def generate_long_content(title, summary, source, style):
 
 好了，今天的分享就到这里。兄弟们有什么看法，欢迎评论区聊聊！咱们下期再见！👋
 """,
-            f"""🎬 {title}
+        """🎬 {title}
 
 hello大家好，我是你们的汽车博主！今天带来一个超级重磅的消息！
 
@@ -128,9 +112,9 @@ hello大家好，我是你们的汽车博主！今天带来一个超级重磅的
 当然，具体表现如何，我建议大家还是去4S店实地体验一下。毕竟网上说的再香，不如自己坐上去感受一下。
 
 ok，今天的分享就到这里。如果觉得有用，记得一键三连！我是你们的老朋友，下期再会！"""
-        ],
-        'review': [
-            f"""【深度解析】{title}
+    ],
+    'review': [
+        """【深度解析】{title}
 
 一、事件背景
 
@@ -162,9 +146,9 @@ ok，今天的分享就到这里。如果觉得有用，记得一键三连！我
 3. 对比竞品，综合考虑性价比
 
 本文将持续关注该车型的后续报道。"""
-        ],
-        'push': [
-            f"""❤️ 强烈推荐！{title}
+    ],
+    'push': [
+        """❤️ 强烈推荐！{title}
 
 家人们！今天必须给大家安利一波！
 
@@ -187,9 +171,9 @@ ok，今天的分享就到这里。如果觉得有用，记得一键三连！我
 数量有限，先到先得！冲鸭！🎉
 
 #汽车 #新车 #种草"""
-        ],
-        'news': [
-            f"""【汽车之家】{title}
+    ],
+    'news': [
+        """【汽车之家】{title}
 
 [新闻背景]
 
@@ -218,8 +202,28 @@ ok，今天的分享就到这里。如果觉得有用，记得一键三连！我
 [后续报道]
 
 我们将持续关注该车型的最新进展，并为您带来更多详细报道。"""
-        ]
-    }
+    ]
+}
+
+registry.register('short', SHORT_TEMPLATES, default='vlog')
+registry.register('long', LONG_TEMPLATES, default='vlog')
 
-    options = templates.get(style, templates['vlog'])
-    return options[0]
+
+def generate_content(news, format_type, style):
+    """生成改写内容"""
+    title = news.get('title', '')
+    summary = news.get('summary', '')
+    source = news.get('source_name', '')
+
+    if format_type == 'short':
+        return generate_short_content(title, summary, source, style)
+    else:
+        return generate_long_content(title, summary, source, style)
+
+def generate_short_content(title, summary, source, style):
+    """生成短文案"""
+    return registry.render('short', style, {'title': title, 'summary': summary, 'source': source}, key=title)
+
+def generate_long_content(title, summary, source, style):
+    """生成长文章"""
+    return registry.render('long', style, {'title': title, 'summary': summary, 'source': source}, key=title)
@@ -206,7 +206,9 @@ class App {
     const style = styleSelect ? styleSelect.value : 'vlog';
 
     try {
-      const result = await newsWriter.rewrite(this.selectedNews, format, style);
+      const result = await newsWriter.rewriteStream(this.selectedNews, format, style, (partial) => {
+        this.displayResult(partial, false);
+      });
       this.displayResult(result);
 
       // 保存到历史
@@ -225,15 +227,20 @@ class App {
   }
 
   // 显示结果
-  displayResult(content) {
+  displayResult(content, scroll = true) {
     const container = document.getElementById('resultContent');
     const section = document.getElementById('resultSection');
 
     container.textContent = content;
-    section.style.display = 'block';
+    if (section.style.display !== 'block') {
+      section.style.display = 'block';
+      scroll = true;
+    }
 
     // 滚动到结果区域
-    section.scrollIntoView({ behavior: 'smooth' });
+    if (scroll) {
+      section.scrollIntoView({ behavior: 'smooth' });
+    }
   }
 
   // 复制结果
@@ -278,7 +285,9 @@ class App {
   // 重新生成
   async regenerateResult() {
     try {
-      const result = await newsWriter.regenerate();
+      const result = await newsWriter.regenerate((partial) => {
+        this.displayResult(partial, false);
+      });
       this.displayResult(result);
       this.showToast('重新生成完成！', 'success');
     } catch (error) {
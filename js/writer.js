@@ -10,8 +10,8 @@ class NewsWriter {
     this.apiBase = 'https://auto-news-writer-1.onrender.com';
   }
 
-  // 改写新闻
-  async rewrite(news, format = 'short', style = 'vlog') {
+  // 改写新闻；fresh 为 true 时后端跳过缓存重新生成（新结果仍会写入缓存）
+  async rewrite(news, format = 'short', style = 'vlog', fresh = false) {
     this.currentNews = news;
     this.currentFormat = format;
     this.currentStyle = style;
@@ -25,7 +25,8 @@ class NewsWriter {
         body: JSON.stringify({
           news: news,
           format: format,
-          style: style
+          style: style,
+          fresh: fresh
         })
       });
 
@@ -48,6 +49,70 @@ class NewsWriter {
     }
   }
 
+  // 流式改写：通过 SSE 逐段接收生成内容，onDelta 收到目前为止的完整文本
+  async rewriteStream(news, format = 'short', style = 'vlog', onDelta = () => {}, fresh = false) {
+    this.currentNews = news;
+    this.currentFormat = format;
+    this.currentStyle = style;
+
+    try {
+      const response = await fetch(`${this.apiBase}/api/rewrite/stream`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({
+          news: news,
+          format: format,
+          style: style,
+          fresh: fresh
+        })
+      });
+
+      if (!response.ok || !response.body) {
+        throw new Error('API请求失败');
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder('utf-8');
+      let buffer = '';
+      let content = '';
+
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // SSE 消息以空行分隔
+        let sep;
+        while ((sep = buffer.indexOf('\n\n')) !== -1) {
+          const message = buffer.slice(0, sep);
+          buffer = buffer.slice(sep + 2);
+
+          const event = (message.match(/^event: (.*)$/m) || [])[1];
+          const data = (message.match(/^data: (.*)$/m) || [])[1];
+          if (!data) continue;
+          const payload = JSON.parse(data);
+
+          if (event === 'delta') {
+            content += payload.content;
+            onDelta(content);
+          } else if (event === 'done') {
+            content = payload.content;
+          } else if (event === 'error') {
+            throw new Error(payload.error || '改写失败');
+          }
+        }
+      }
+
+      this.currentResult = content;
+      return content;
+    } catch (e) {
+      console.log('流式改写失败，使用普通接口:', e);
+      return this.rewrite(news, format, style, fresh);
+    }
+  }
+
   // 生成内容（本地备用）
   generateContent(news, format, style) {
     if (format === 'short') {
@@ -75,11 +140,12 @@ class NewsWriter {
   }
 
   // 重新生成
-  async regenerate() {
+  async regenerate(onDelta) {
     if (!this.currentNews) {
       throw new Error('没有可重新生成的内容');
     }
-    return this.rewrite(this.currentNews, this.currentFormat, this.currentStyle);
+    // 重新生成要拿到新版本，不能返回缓存中的上一次结果
+    return this.rewriteStream(this.currentNews, this.currentFormat, this.currentStyle, onDelta, true);
   }
 
   // 获取当前结果